@@ -11,7 +11,6 @@ from appium.options.android import UiAutomator2Options
 from appium.webdriver import WebElement
 from appium.webdriver.common.appiumby import AppiumBy
 from appium.webdriver.extensions.android.nativekey import AndroidKey
-from appium.webdriver.webdriver import WebDriver
 from selenium.common import NoSuchElementException
 from typing_extensions import deprecated
 
@@ -20,7 +19,6 @@ from puma.computer_vision import ocr
 from puma.state_graph.puma_driver import _get_appium_driver
 from puma.utils.video_utils import CACHE_FOLDER, log_error_and_raise_exception
 
-__drivers: dict[str, WebDriver] = {}
 
 def _get_android_default_options():
     options = UiAutomator2Options()
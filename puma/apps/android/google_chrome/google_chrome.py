@@ -1,5 +1,3 @@
-from time import sleep
-
 from puma.apps.android.appium_actions import supported_version
 from puma.apps.android.google_chrome import logger
 from puma.apps.android.google_chrome.states import BookmarksFolder, CurrentTab
@@ -80,7 +78,8 @@ class GoogleChrome(StateGraph):
         Creates a new tab and visits the url.
         :param url_string: Url to visit
         """
-        self.driver.send_keys(SEARCH_BOX, url_string)
+        # autocompletion changes the text in the address bar, so it cannot be verified
+        self.driver.send_keys(SEARCH_BOX, url_string, verify=False)
         self.driver.press_enter()
 
     @action(new_incognito_tab_state)
@@ -134,12 +133,13 @@ class GoogleChrome(StateGraph):
 
     def _open_settings_pane(self):
         """
-        Opens the settings pane. Add a short sleep to ensure the page is actually opened.
+        Opens the settings pane, and waits until it is actually opened.
         """
         self.driver.click(THREE_DOTS)
-        sleep(1)
+        self.driver.wait_until(NEW_INCOGNITO_TAB_BUTTON, timeout=2)
 
 
     def _enter_url(self, url_string: str, url_bar_xpath):
-        self.driver.send_keys(url_bar_xpath, url_string)
+        # autocompletion changes the text in the address bar, so it cannot be verified
+        self.driver.send_keys(url_bar_xpath, url_string, verify=False)
         self.driver.press_enter()
@@ -50,17 +50,15 @@ class CurrentTab(SimpleState, ContextualState):
             xpaths=[URL_BAR, NEW_TAB_FROM_CURRENT_TAB],
             parent_state=parent_state,
             parent_state_transition=compose_clicks([TAB_SWITCH_BUTTON]))
-        # Keep a dict that tracks which tab indices were opened last on which device. See validate_context()
-        self.last_opened = {}
-
+        # The tab index that was opened last is kept in the context store of the driver. See validate_context()
 
     def validate_context(self, driver: PumaDriver, tab_index: int = None) -> bool:
         """
         We can not validate if we are in the nth tab from the tab overview, while in the tab contextual state, as this
         index is not available in the state.
-        Therefore, we opted to store the last opened tab index for each device in this state. This means that the
-        contextual state is not actually verified against the UI, but against the tab index saved in the last opened
-        dict. When switching between two tabs, this works as long as the user does not interrupt Puma during these UI
+        Therefore, we opted to store the last opened tab index for each device in the context store of the driver. This
+        means that the contextual state is not actually verified against the UI, but against the stored tab index.
+        When switching between two tabs, this works as long as the user does not interrupt Puma during these UI
         actions.
         #TODO document this situation in the CONTRIBUTING
         :param driver: Puma driver
@@ -69,10 +67,7 @@ class CurrentTab(SimpleState, ContextualState):
         """
         if not tab_index:
             return True
-        try:
-            return self.last_opened[driver.udid] == tab_index
-        except KeyError:
-            return False
+        return driver.context.of(self).get('last_opened') == tab_index
 
     def switch_to_tab(self, driver: PumaDriver, tab_index: int):
         """
@@ -90,4 +85,4 @@ class CurrentTab(SimpleState, ContextualState):
                          f"instead.")
             raise TransitionError()
         driver.click(tab_content_view)
-        self.last_opened[driver.udid] = tab_index
+        driver.context.of(self)['last_opened'] = tab_index
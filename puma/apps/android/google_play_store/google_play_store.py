@@ -72,17 +72,16 @@ class AppPage(SimpleState, ContextualState):
             xpaths=[HOME_SCREEN_TABS, APP_PAGE_THREE_DOTS],
             parent_state=parent_state,
             parent_state_transition=compose_clicks([APP_PAGE_NAVIGATE_UP], "navigate_up"))
-        # keep a dict that tracks which app pages were opened last on which device. See validate_context()
-        self.last_opened = {}
+        # The app page that was opened last is kept in the context store of the driver. See validate_context()
 
     def validate_context(self, driver: PumaDriver, package_name: str = None) -> bool:
         """
         The package name cannot be found in the UI, except by opening the share menu and checking the URL that can be
         shared. We do not want to use this, because that would mean triggering UI actions every time this contextual
         state is verified.
-        Therefore, we opted to store the last opened package name for each device in this State. This means that the
-        contextual state is not actually verified against the UI, but against the package name that was opened with the
-        open_app_page method. When switching between two app pages, this works as long as the user does not interrupt
+        Therefore, we opted to store the last opened package name for each device in the context store of the driver.
+        This means that the contextual state is not actually verified against the UI, but against the package name that
+        was opened with the open_app_page method. When switching between two app pages, this works as long as the user does not interrupt
         Puma during these UI actions.
 
         :param driver: Puma driver
@@ -91,7 +90,7 @@ class AppPage(SimpleState, ContextualState):
         """
         if not package_name:
             return True
-        return self.last_opened[driver.udid] == package_name
+        return driver.context.of(self).get('last_opened') == package_name
 
     def open_app_page(self, driver: PumaDriver, package_name: str = None):
         """
@@ -106,7 +105,7 @@ class AppPage(SimpleState, ContextualState):
         if not is_valid_package_name(package_name):
             raise ValueError(f'Invalid package name: {package_name}')
         driver.open_url(f'https://play.google.com/store/apps/details?id={package_name}')
-        self.last_opened[driver.udid] = package_name
+        driver.context.of(self)['last_opened'] = package_name
 
 
 @supported_version("48.3.25-31")
@@ -145,14 +144,16 @@ class GooglePlayStore(StateGraph):
         Util method for @action methods on the app_page_state.
         :return the AppState of the application page, based on found UI elements.
         """
-        if self.driver.is_present(APP_PAGE_INSTALL_BUTTON):
+        present = self.driver.present_many([APP_PAGE_INSTALL_BUTTON, APP_PAGE_UPDATE_BUTTON, APP_PAGE_UNINSTALL_BUTTON,
+                                            APP_PAGE_CANCEL_INSTALL_BUTTON])
+        if present[APP_PAGE_INSTALL_BUTTON]:
             return AppState.NOT_INSTALLED
-        if self.driver.is_present(APP_PAGE_UPDATE_BUTTON):
+        if present[APP_PAGE_UPDATE_BUTTON]:
             return AppState.UPDATE_AVAILABLE
-        if self.driver.is_present(APP_PAGE_UNINSTALL_BUTTON):
+        if present[APP_PAGE_UNINSTALL_BUTTON]:
             return AppState.INSTALLED
-        if self.driver.is_present(APP_PAGE_CANCEL_INSTALL_BUTTON):
-            if self.driver.is_present(APP_PAGE_UNINSTALL_BUTTON):
+        if present[APP_PAGE_CANCEL_INSTALL_BUTTON]:
+            if present[APP_PAGE_UNINSTALL_BUTTON]:
                 return AppState.INSTALLING_UPDATE
             else:
                 return AppState.INSTALLING
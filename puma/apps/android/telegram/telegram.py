@@ -69,6 +69,9 @@ class Telegram(StateGraph):
     of the Telegram user interface. It provides methods to navigate between states, validate states,
     and handle unexpected states or errors.
     """
+    # replacing the text in a single request is much faster for long messages, sending keys is the fallback
+    text_entry_strategies = ['set_value', 'send_keys']
+
     conversations_state = SimpleState(
         [CHAT_OVERVIEW_NEW_MESSAGE_BUTTON, CHAT_OVERVIEW_SEARCH_BUTTON, CHAT_OVERVIEW_NAV_MENU_BUTTON],
         initial_state=True)
@@ -306,7 +309,7 @@ class Telegram(StateGraph):
             self.driver.click(NEW_GROUP_MEMBER.format(member=member))
         self.driver.click(NEW_GROUP_NEXT)
         self.gtl_logger.info(f'Entering group name "{group_name}" and setting auto-delete option')
-        self.driver.send_keys(NEW_GROUP_NAME_INPUT, group_name)
+        self.driver.send_keys(NEW_GROUP_NAME_INPUT, group_name, verify=True)
         if auto_delete:
             self.driver.click(NEW_GROUP_AUTO_DELETE_OPTION)
             self.driver.click(f'//android.widget.LinearLayout/android.widget.FrameLayout[{auto_delete}]')
@@ -367,7 +370,7 @@ class Telegram(StateGraph):
             raise PumaClickException(f"Cannot rename conversation {conversation}. "
                                      f"Check whether it is a group and whether permissions are setup correctly.")
         self.driver.click(CHAT_SETTINGS_EDIT_GROUP_BUTTON)
-        self.driver.send_keys(EDIT_GROUP_NAME, new_group_name)
+        self.driver.send_keys(EDIT_GROUP_NAME, new_group_name, verify=True)
         self.driver.click(EDIT_GROUP_DONE)
 
     @action(chat_settings_state)
@@ -384,7 +387,7 @@ class Telegram(StateGraph):
             raise PumaClickException(f"Cannot rename conversation {conversation}. "
                                      f"Check whether it is a group and whether permissions are setup correctly.")
         self.driver.click(CHAT_SETTINGS_EDIT_GROUP_BUTTON)
-        self.driver.send_keys(EDIT_GROUP_DESCRIPTION, description)
+        self.driver.send_keys(EDIT_GROUP_DESCRIPTION, description, verify=True)
         self.driver.click(EDIT_GROUP_DONE)
 
     @action(chat_state)
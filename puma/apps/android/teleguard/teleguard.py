@@ -1,8 +1,5 @@
 from typing import List
 
-from appium.webdriver import WebElement
-from appium.webdriver.common.appiumby import AppiumBy
-
 from puma.apps.android.teleguard.xpaths import *
 from puma.state_graph.action import action
 from puma.state_graph.puma_driver import PumaDriver, supported_version, PumaClickException
@@ -25,7 +22,7 @@ def go_to_chat(driver: PumaDriver, conversation: str):
     """
     xpath = f'//android.widget.ImageView[contains(lower-case(@content-desc), "{conversation.lower()}")] | ' \
             f'//android.view.View[contains(lower-case(@content-desc), "{conversation.lower()}")]'
-    driver.driver.find_elements(by=AppiumBy.XPATH, value=xpath)[-1].click()
+    driver.get_elements(xpath)[-1].click()
 
 
 class TeleGuardChatState(SimpleState, ContextualState):
@@ -72,6 +69,9 @@ class TeleGuard(StateGraph):
     and handle unexpected states or errors.
     """
 
+    # replacing the text in a single request is much faster for long messages, sending keys is the fallback
+    text_entry_strategies = ['set_value', 'send_keys']
+
     conversations_state = SimpleState( [CONVERSATION_STATE_TELEGUARD_HEADER, CONVERSATION_STATE_HAMBURGER_MENU, CONVERSATION_STATE_TELEGUARD_STATUS], initial_state=True)
     chat_state = TeleGuardChatState(parent_state=conversations_state)
     chat_options_state = SimpleState(
@@ -140,16 +140,15 @@ class TeleGuard(StateGraph):
         self.driver.click(CONVERSATION_STATE_INVITATION_ACCEPT)
         return name
 
-    def _extract_name(self, conversation_row: WebElement) -> str:
+    def _extract_name(self, content_description: str) -> str:
         """
-        Given a conversation row, extracts the name of the conversation.
+        Given the content description of a conversation row, extracts the name of the conversation.
         For users with an avatar, the first line of the content description is the conversation name.
         For users without an avatar, there is an extra first line with just the first letter of the name.
         We try to detect this pattern and return the first or second line based on this.
 
-        :param conversation_row: The conversation row to extract a name from.
+        :param content_description: The content description of the conversation row to extract a name from.
         """
-        content_description = conversation_row.get_attribute('content-desc')
         lines = content_description.split('\n')[:2]
         if len(lines[0])>1:
             return lines[0]
@@ -163,12 +162,10 @@ class TeleGuard(StateGraph):
         """
         Returns a list of names of conversations that have unread messages.
         """
-        try:
-            elements = self.driver.get_elements(CONVERSATION_STATE_UNREAD_MESSAGES)
-            names = [self._extract_name(e) for e in elements]
-            return names
-        except PumaClickException:
-            return []
+        # wait for the conversation list to load, like get_elements did
+        rows = self.driver.extract(CONVERSATION_STATE_UNREAD_MESSAGES, ['content-desc'],
+                                   timeout=self.driver.implicit_wait)
+        return [self._extract_name(row.content_desc) for row in rows if row.content_desc]
 
     @action(chat_state)
     def send_message(self, message: str, conversation: str = None):
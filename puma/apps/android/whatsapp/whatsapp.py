@@ -9,6 +9,7 @@ from puma.state_graph.popup_handler import simple_popup_handler, PopUpHandler
 from puma.state_graph.puma_driver import PumaDriver, PumaClickException, supported_version
 from puma.state_graph.state import SimpleState, compose_clicks
 from puma.state_graph.state_graph import StateGraph
+from puma.state_graph.waits import PollStrategy
 from puma.utils.xpath_utils import build_content_desc_xpath_widget
 
 
@@ -60,6 +61,9 @@ class WhatsApp(StateGraph):
     and handle unexpected states or errors.
     """
 
+    # replacing the text in a single request is much faster for long messages, sending keys is the fallback
+    text_entry_strategies = ['set_value', 'send_keys']
+
     conversations_state = SimpleState([CONVERSATIONS_WHATSAPP_LOGO,
                                        CONVERSATIONS_HOME_ROOT_FRAME,
                                        CONVERSATIONS_NEW_CHAT_OR_SEND_MESSAGE,
@@ -119,9 +123,9 @@ class WhatsApp(StateGraph):
             f"//*[@text='{message_text}']"  # Text field element containing message text
             f"/.."  # Parent of the message (i.e. conversation text row)
             f"//*[@resource-id='com.whatsapp:id/status']")  # Status element
-        while message_status_el.tag_name == "Pending":
+        while not self.driver.wait_until(lambda: message_status_el.tag_name != "Pending", timeout=10,
+                                         poll_strategy=PollStrategy(initial_interval=0.5, max_interval=2)):
             self.gtl_logger.info("Message pending, waiting for the message to be sent.")
-            sleep(10)
         return message_status_el
 
     @action(chat_state)
@@ -179,7 +183,7 @@ class WhatsApp(StateGraph):
     @action(profile_state)
     def set_about(self, about_text: str):
         self.driver.click(PROFILE_INFO_STATUS_CARD)
-        self.driver.send_keys(EDIT_TEXT2, about_text)
+        self.driver.send_keys(EDIT_TEXT2, about_text, verify=True)
         self.driver.click(PROFILE_SAVE_BUTTON)
         # This action ends in a screen that isn't a state, so move back one screen.
         self.driver.back()
@@ -246,15 +250,15 @@ class WhatsApp(StateGraph):
 
         members = [members] if not isinstance(members, list) else members
         for member in members:
-            contacts = self.driver.get_elements(TEXT_VIEWS)
-            member_to_add = [contact for contact in contacts if contact.text.lower() == member.lower()][0]
-            member_to_add.click()
+            contacts = self.driver.extract(TEXT_VIEWS, ['text', 'bounds'], timeout=self.driver.implicit_wait)
+            member_to_add = [contact for contact in contacts if (contact.text or '').lower() == member.lower()][0]
+            self.driver.tap(member_to_add.bounds.point())
 
         self.driver.click(NEXT_BUTTON)
-        self.driver.send_keys(CONVERSATIONS_GROUP_NAME, conversation)
+        self.driver.send_keys(CONVERSATIONS_GROUP_NAME, conversation, verify=True)
         self.driver.click(OK_BUTTON)
-        # Creating a group takes a few seconds
-        sleep(2)
+        # Creating a group takes a few seconds, after which the new group is opened
+        self.driver.wait_until(lambda: self.chat_state.validate(self.driver), timeout=5)
 
     @action(conversations_state)
     def archive_conversation(self, conversation: str):
@@ -265,15 +269,13 @@ class WhatsApp(StateGraph):
         self.driver.long_click_element(
             f'//*[contains(@resource-id,"{WHATSAPP_PACKAGE}:id/conversations_row_contact_name") and @text="{conversation}"]')
         self.driver.click(CONVERSATIONS_MENUITEM_ARCHIVE)
-        # Wait until the archive popup disappeared
-        archived_popup_present = True
-        tries = 0
-        while archived_popup_present and tries < 5:
-            logger.info("Waiting for archived popup to disappear")
-            sleep(5)
-            tries += 1
-            archived_popup_present = 'archived' in self.driver.get_elements(CONVERSATIONS_ARCHIVED)[0].text
-        logger.info("Archive pop-up gone!")
+        # Wait until the archive popup appeared and disappeared again
+        self.driver.wait_until(CONVERSATIONS_ARCHIVED_POPUP, timeout=2)
+        logger.info("Waiting for archived popup to disappear")
+        if self.driver.wait_until(lambda: not self.driver.is_present(CONVERSATIONS_ARCHIVED_POPUP), timeout=25):
+            logger.info("Archive pop-up gone!")
+        else:
+            logger.warning("Archive pop-up still present, continuing anyway")
 
     @action(chat_state)
     def open_view_once_photo(self, conversation: str):
@@ -293,7 +295,7 @@ class WhatsApp(StateGraph):
         """
         self.driver.swipe_to_click_element(
             f'{build_wa_resource_id_xpath("no_description_view")} | {build_wa_resource_id_xpath("has_description_view")}')
-        self.driver.send_keys(EDIT_TEXT, description)
+        self.driver.send_keys(EDIT_TEXT, description, verify=True)
         self.driver.click(OK_BUTTON)
 
     @action(chat_settings_state)
@@ -329,7 +331,7 @@ class WhatsApp(StateGraph):
         :param conversation: The chat conversation in which to send this sticker.
         """
         self.driver.click(CHAT_EMOJI_PICKER)
-        sleep(1)
+        self.driver.wait_until_stable(timeout=1)
         self.driver.click(CHAT_EMOJIS)
         self.driver.click(CHAT_EMOJI)
         self.driver.click(SEND)
@@ -341,7 +343,7 @@ class WhatsApp(StateGraph):
         :param conversation: The chat conversation in which to send this sticker.
         """
         self.driver.click(CHAT_EMOJI_PICKER)
-        sleep(1)
+        self.driver.wait_until_stable(timeout=1)
         self.driver.click(CHAT_STICKERS)
         self.driver.click(CHAT_STICKER)
 
@@ -621,8 +623,9 @@ class WhatsApp(StateGraph):
         else:
             WhatsAppChatState.open_chat_settings(self.driver, conversation)
 
-            found_member_elements = self.driver.swipe_to_find_elements(CHAT_SETTINGS_ANY_MEMBER, max_swipes=4)
-            found_member_names = [member.text for member in found_member_elements]
+            found_members = self.driver.swipe_to_find_records(CHAT_SETTINGS_ANY_MEMBER, num_swipes=4,
+                                                               attributes=['text'])
+            found_member_names = [member.text for member in found_members]
 
             if set(found_member_names) != set(expected_member_names):
                 self.gtl_logger.warning(f"Group with name '{conversation}' does not contain expected members:"
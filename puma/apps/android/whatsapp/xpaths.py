@@ -26,6 +26,7 @@ CONVERSATIONS_NEW_CHAT_OR_SEND_MESSAGE = f'{build_content_desc_xpath_widget("Ima
 CONVERSATIONS_HOME_ROOT_FRAME = build_wa_resource_id_xpath_widget('FrameLayout', 'root_view')
 CONVERSATIONS_MENUITEM_ARCHIVE = build_wa_resource_id_xpath('menuitem_conversations_archive')
 CONVERSATIONS_ARCHIVED = f'//*[contains(@text,"archived") or @resource-id="{WHATSAPP_PACKAGE}:id/fab"]'
+CONVERSATIONS_ARCHIVED_POPUP = '//*[contains(@text,"archived")]'
 CONVERSATIONS_GROUP_NAME = build_wa_resource_id_xpath('group_name')
 CONVERSATIONS_NEW_GROUP = build_text_xpath('New group')
 CONVERSATIONS_CHAT_ABLE_CONTACT = build_wa_resource_id_text_xpath('chat_able_contacts_row_name', '{receiver}')
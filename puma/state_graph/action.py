@@ -1,6 +1,9 @@
+import functools
 import inspect
+from contextlib import nullcontext
 from typing import Callable, OrderedDict, Any
 
+from puma.state_graph import logger
 from puma.state_graph.puma_driver import PumaClickException
 from puma.state_graph.state import State
 from puma.state_graph.state_graph import StateGraph
@@ -76,6 +79,7 @@ def action(state: State, end_state: State = None):
     """
 
     def decorator(func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             """
             Wrapper function that ensures the correct state and handles exception recovery.
@@ -101,37 +105,52 @@ def action(state: State, end_state: State = None):
             puma_ui_graph = args[0]
             # get the ground truth logger to log these actions
             gtl_logger = puma_ui_graph.gtl_logger
-            try:
-                puma_ui_graph.try_restart = True
-                puma_ui_graph.go_to_state(state, **arguments)
+            # the current state and try_restart of the graph belong to this action until it is done
+            with puma_ui_graph._action_lock or nullcontext():
                 try:
-                    gtl_logger.info(
-                        f"Executing action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
-                    result = func(*args, **kwargs)
-                except:
-                    gtl_logger.info(f"Failed to execute action '{func.__name__}'.")
-                    puma_ui_graph.recover_state(state)
+                    puma_ui_graph.try_restart = True
+                    puma_ui_graph.driver.ensure_session()
+                    stats_before = puma_ui_graph.driver.copy_stats()
                     puma_ui_graph.go_to_state(state, **arguments)
-                    gtl_logger.info(f"Retrying action '{func.__name__}'")
-                    result = func(*args, **kwargs)
+                    try:
+                        gtl_logger.info(
+                            f"Executing action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+                        result = func(*args, **kwargs)
+                    except:
+                        gtl_logger.info(f"Failed to execute action '{func.__name__}'.")
+                        puma_ui_graph.recover_state(state)
+                        puma_ui_graph.go_to_state(state, **arguments)
+                        gtl_logger.info(f"Retrying action '{func.__name__}'")
+                        result = func(*args, **kwargs)
+                    # actions can change the UI without going through the PumaDriver, e.g. by clicking a WebElement
+                    puma_ui_graph.driver.invalidate_snapshot()
+                    logger.debug(f"Driver statistics during action '{func.__name__}': {puma_ui_graph.driver.stats_since(stats_before)}")
 
-                gtl_logger.info(
-                        f"Executed action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+                    gtl_logger.info(
+                            f"Executed action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
 
-                if verify_with is not None:
-                    gtl_logger.info(f"Verifying action with '{verify_with.__name__}' using arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
-                    _execute_post_action_verification(puma_ui_graph, func, verify_with, arguments)
+                    if verify_with is not None:
+                        gtl_logger.info(f"Verifying action with '{verify_with.__name__}' using arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+                        _execute_post_action_verification(puma_ui_graph, func, verify_with, arguments)
 
-                puma_ui_graph.try_restart = True
+                    puma_ui_graph.try_restart = True
 
-                if end_state:
-                    puma_ui_graph.current_state = end_state
-                return result
-            except Exception as e:
-                gtl_logger.exception("Unexpected exception while executing an action")
-                raise e
+                    if end_state:
+                        puma_ui_graph.current_state = end_state
+                    return result
+                except Exception as e:
+                    gtl_logger.exception("Unexpected exception while executing an action")
+                    raise e
 
 
         return wrapper
 
     return decorator
+
+
+def __getattr__(name: str):
+    # async_action lives with the AsyncStateGraph, so sync actions do not import asyncio and the async driver
+    if name == 'async_action':
+        from puma.state_graph.async_state_graph import async_action
+        return async_action
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
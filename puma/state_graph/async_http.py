@@ -0,0 +1,175 @@
+import asyncio
+import json
+import ssl
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+# The time in seconds after which a request to the Appium server is abandoned. Creating a session can take a while.
+DEFAULT_REQUEST_TIMEOUT = 120.0
+# The maximum number of connections kept open to one server. Devices behind one server share these connections.
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 32
+# The methods that may be sent again when a pooled connection fails, as sending them twice has the same effect as once
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+
+class HttpError(OSError):
+    """
+    Raised when an HTTP response cannot be read, for example because the server closed the connection.
+    """
+    pass
+
+
+@dataclass
+class HttpResponse:
+    """
+    A response of an HTTP server. The body is decoded from JSON, or None if the response had no body.
+    """
+    status: int
+    body: Any
+
+
+@dataclass
+class _Connection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncHttpClient:
+    """
+    A minimal asynchronous HTTP/1.1 client for JSON requests, such as the W3C WebDriver commands sent to an Appium
+    server. It only needs the standard library. Connections are kept alive and pooled per server, so one event loop
+    can send commands for many devices on many Appium servers without opening a connection per command, and without a
+    thread per device. Share one client between all AsyncPumaDrivers to share the pool.
+
+    When a pooled connection turns out to be closed by the server, only requests with an idempotent method are sent
+    again on another connection. Other requests, such as clicks, are never sent twice: the error is raised instead.
+
+    The client belongs to the event loop it is first used in.
+    """
+
+    def __init__(self, max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        """
+        :param max_connections_per_host: Optional. The maximum number of simultaneous connections to one server. More
+        simultaneous requests wait for a connection to become available.
+        :param timeout: Optional. The maximum time in seconds a request may take.
+        """
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: dict[tuple[str, str, int], list[_Connection]] = defaultdict(list)
+        self._limits: dict[tuple[str, str, int], asyncio.Semaphore] = {}
+        self._closed = False
+
+    async def request(self, method: str, url: str, payload: Any = None) -> HttpResponse:
+        """
+        Sends a request and reads its response.
+
+        :param method: The HTTP method, such as 'GET' or 'POST'.
+        :param url: The URL to send the request to.
+        :param payload: Optional. The body of the request, encoded as JSON. When None, no body is sent.
+        :return: The response.
+        :raises HttpError: If the response could not be read.
+        :raises OSError: If no connection could be made to the server.
+        :raises TimeoutError: If the request took longer than the timeout of this client.
+        """
+        if self._closed:
+            raise RuntimeError('Cannot send requests with a closed client')
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.max_connections_per_host))
+        async with limit:
+            return await asyncio.wait_for(self._send(key, method, path, body), self.timeout)
+
+    async def _send(self, key: tuple[str, str, int], method: str, path: str, body: bytes) -> HttpResponse:
+        idle = self._idle[key]
+        while idle:
+            connection = idle.pop()
+            if connection.reader.at_eof():
+                # the server closed the idle connection in the meantime, nothing was sent on it yet
+                connection.close()
+                continue
+            if method not in IDEMPOTENT_METHODS:
+                # the server may have acted on the request before the connection failed, so it is never sent twice
+                return await self._exchange(key, connection, method, path, body)
+            try:
+                return await self._exchange(key, connection, method, path, body)
+            except (HttpError, ConnectionError):
+                # the server closed the idle connection while the request was sent, try the next one
+                connection.close()
+        return await self._exchange(key, await self._connect(key), method, path, body)
+
+    async def _connect(self, key: tuple[str, str, int]) -> _Connection:
+        scheme, host, port = key
+        ssl_context = ssl.create_default_context() if scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def _exchange(self, key: tuple[str, str, int], connection: _Connection, method: str, path: str,
+                        body: bytes) -> HttpResponse:
+        host = key[1] if key[2] in (80, 443) else f'{key[1]}:{key[2]}'
+        head = (f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n'
+                f'Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n\r\n')
+        try:
+            connection.writer.write(head.encode('latin-1') + body)
+            await connection.writer.drain()
+            status, headers, content = await self._read_response(connection.reader)
+        except BaseException:
+            connection.close()
+            raise
+        if headers.get('connection', '').lower() == 'close' or connection.reader.at_eof():
+            connection.close()
+        else:
+            self._idle[key].append(connection)
+        return HttpResponse(status, json.loads(content) if content else None)
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], bytes]:
+        try:
+            status_line = await reader.readline()
+            if not status_line:
+                raise HttpError('The server closed the connection')
+            status = int(status_line.split()[1])
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                content = b''
+                while (size := int((await reader.readline()).split(b';')[0], 16)) > 0:
+                    content += await reader.readexactly(size)
+                    await reader.readexactly(2)
+                # the chunked body ends with optional trailers and an empty line
+                while await reader.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+            elif 'content-length' in headers:
+                content = await reader.readexactly(int(headers['content-length']))
+            else:
+                content = await reader.read()
+        except (asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            raise HttpError(f'Could not read the response of the server: {e}') from e
+        return status, headers, content
+
+    async def close(self):
+        """
+        Closes all pooled connections. The client cannot be used afterwards.
+        """
+        self._closed = True
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
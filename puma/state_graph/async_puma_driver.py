@@ -0,0 +1,357 @@
+import time
+from typing import Any, Dict, Iterable
+
+from selenium.common.exceptions import (WebDriverException, NoSuchElementException, StaleElementReferenceException,
+                                        InvalidSessionIdException, ElementNotInteractableException,
+                                        InvalidSelectorException, TimeoutException)
+
+from puma.state_graph import logger
+from puma.state_graph.async_http import AsyncHttpClient
+from puma.state_graph.locator import Locator, to_locator
+from puma.state_graph.puma_driver import PumaClickException, DEFAULT_SNAPSHOT_MAX_AGE, _get_options
+from puma.state_graph.session_registry import AppiumConnectionError
+from puma.state_graph.ui_snapshot import UiSnapshot, UnsupportedXPathError
+from puma.state_graph.waits import async_poll
+from puma.utils.gtl_logging import create_gtl_logger
+
+# The key of an element reference in W3C WebDriver responses
+W3C_ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+# Android key codes, see AndroidKey
+_KEYCODE_HOME = 3
+_KEYCODE_ENTER = 66
+
+# The W3C error codes for which Selenium has a more specific exception than WebDriverException
+_W3C_ERRORS: dict[str, type[WebDriverException]] = {
+    'no such element': NoSuchElementException,
+    'stale element reference': StaleElementReferenceException,
+    'invalid session id': InvalidSessionIdException,
+    'element not interactable': ElementNotInteractableException,
+    'invalid selector': InvalidSelectorException,
+    'timeout': TimeoutException,
+}
+
+
+def _w3c_error(status: int, value: Any) -> WebDriverException:
+    if not isinstance(value, dict):
+        return WebDriverException(f'Unexpected response with status {status}: {value}')
+    error = value.get('error', 'unknown error')
+    return _W3C_ERRORS.get(error, WebDriverException)(f'{error}: {value.get("message", "")}',
+                                                      stacktrace=value.get('stacktrace'))
+
+
+class AsyncPumaDriver:
+    """
+    An asyncio counterpart of PumaDriver. It sends the same W3C WebDriver and Appium commands to the Appium server, but
+    over an asynchronous HTTP client, so a single event loop can drive many devices on many Appium servers at once,
+    without a thread per device:
+
+        async with AsyncHttpClient() as client:
+            drivers = [AsyncPumaDriver(udid, 'com.whatsapp', client=client) for udid in udids]
+            await asyncio.gather(*(driver.connect() for driver in drivers))
+            await asyncio.gather(*(driver.click(xpath) for driver in drivers))
+
+    It covers the core of the PumaDriver API: presence checks against cached UI snapshots, clicks, text entry,
+    navigation and app management. Elements are referred to by their XPath only; there are no WebElements. For the
+    full API, use PumaDriver.
+
+    Unlike PumaDriver, an AsyncPumaDriver does not share its session with other drivers: each driver creates its own
+    session on connect() and deletes it on close().
+    """
+
+    def __init__(self, udid: str, app_package: str, implicit_wait: float = 1, appium_server: str = 'http://localhost:4723',
+                 desired_capabilities: Dict[str, str] = None, client: AsyncHttpClient = None):
+        """
+        :param udid: The unique device identifier for the Android device.
+        :param app_package: The package name of the application to interact with.
+        :param implicit_wait: The time to wait for elements to appear when searching for them, defaults to 1 second.
+        :param appium_server: The address of the Appium server, defaults to 'http://localhost:4723'.
+        :param desired_capabilities: Optional. Desired capabilities as passed to the Appium webdriver.
+        :param client: Optional. The HTTP client to send commands with. Share a client between drivers to share its
+        connection pool. By default, the driver creates a client of its own, which it closes on close().
+        """
+        self.udid = udid
+        self.app_package = app_package
+        self.implicit_wait = implicit_wait
+        self.appium_server = appium_server.rstrip('/')
+        self.options = _get_options(udid, desired_capabilities)
+        self.client = client if client is not None else AsyncHttpClient()
+        self._owns_client = client is None
+        self.session_id: str | None = None
+        self.use_native_locators = True
+        self.snapshot_max_age = DEFAULT_SNAPSHOT_MAX_AGE
+        self._snapshot_cache: UiSnapshot | None = None
+        self._snapshot_taken_at = 0.0
+        # the state the StateGraph believes the app is in, set by the StateGraph
+        self.ui_state: str | None = None
+        self.gtl_logger = create_gtl_logger(udid)
+
+    async def connect(self):
+        """
+        Creates the Appium session of this driver, if it was not created yet.
+
+        :raises AppiumConnectionError: If the Appium server cannot be reached.
+        :raises WebDriverException: If the Appium server could not create the session.
+        """
+        if self.session_id is not None:
+            return
+        logger.info(f'Creating Appium session for device {self.udid} on {self.appium_server}')
+        payload = {'capabilities': {'firstMatch': [{}], 'alwaysMatch': self.options.to_capabilities()}}
+        try:
+            response = await self.client.request('POST', f'{self.appium_server}/session', payload)
+        except OSError as e:
+            raise AppiumConnectionError("Connecting to the Appium server has failed.\n"
+                                        "Make sure that the appium server is running!\n"
+                                        "This can be done by running the `appium` command from the command line.") from e
+        value = self._value(response.status, response.body)
+        self.session_id = value['sessionId']
+
+    async def close(self):
+        """
+        Deletes the Appium session of this driver, and closes the HTTP client if the driver created it.
+        """
+        session_id, self.session_id = self.session_id, None
+        try:
+            if session_id is not None:
+                await self.client.request('DELETE', f'{self.appium_server}/session/{session_id}')
+        except OSError as e:
+            logger.debug(f'Could not delete Appium session for device {self.udid}: {e}')
+        finally:
+            if self._owns_client:
+                await self.client.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @staticmethod
+    def _value(status: int, body: Any) -> Any:
+        value = body.get('value') if isinstance(body, dict) else body
+        if status >= 400 or (isinstance(value, dict) and 'error' in value):
+            raise _w3c_error(status, value)
+        return value
+
+    async def command(self, method: str, path: str, payload: Any = None) -> Any:
+        """
+        Sends a W3C WebDriver or Appium command for the session of this driver.
+
+        :param method: The HTTP method of the command.
+        :param path: The path of the command, relative to the session, e.g. '/source'.
+        :param payload: Optional. The parameters of the command.
+        :return: The value returned by the command.
+        :raises ConnectionError: If the driver is not connected.
+        :raises WebDriverException: If the command failed.
+        """
+        if self.session_id is None:
+            raise ConnectionError(f'{self} is not connected')
+        response = await self.client.request(method, f'{self.appium_server}/session/{self.session_id}{path}', payload)
+        return self._value(response.status, response.body)
+
+    async def execute_script(self, script: str, *args) -> Any:
+        """
+        Executes a script, such as an Appium 'mobile:' command.
+
+        :param script: The script to execute.
+        :param args: The arguments of the script.
+        :return: The result of the script.
+        """
+        return await self.command('POST', '/execute/sync', {'script': script, 'args': list(args)})
+
+    def locator(self, xpath: str) -> Locator:
+        """
+        Returns the locator used to find the elements selected by an XPath on the device, see PumaDriver.locator().
+        """
+        return to_locator(xpath) if self.use_native_locators else Locator('xpath', xpath)
+
+    async def _find_elements(self, xpath: str) -> list[str]:
+        locator = self.locator(xpath)
+        elements = await self.command('POST', '/elements', {'using': locator.by, 'value': locator.value})
+        return [element.get(W3C_ELEMENT_KEY, element.get('ELEMENT')) for element in elements]
+
+    async def _wait_for_elements(self, xpath: str, timeout: float) -> list[str]:
+        found = []
+
+        async def any_found() -> bool:
+            nonlocal found
+            found = await self._find_elements(xpath)
+            return len(found) > 0
+
+        await async_poll(any_found, timeout)
+        return found
+
+    async def snapshot(self) -> UiSnapshot:
+        """
+        Returns a snapshot of the current UI hierarchy, see PumaDriver.snapshot(). XPaths that cannot be evaluated
+        against the snapshot must be checked with is_present() or present_many(), which check them on the device.
+
+        :return: A snapshot of the current UI.
+        """
+        if self._snapshot_cache is not None and time.monotonic() - self._snapshot_taken_at <= self.snapshot_max_age:
+            return self._snapshot_cache
+        self._snapshot_cache = UiSnapshot(await self.command('GET', '/source'))
+        self._snapshot_taken_at = time.monotonic()
+        return self._snapshot_cache
+
+    def invalidate_snapshot(self):
+        """
+        Discards the cached UI snapshot, so the next read requests the page source again.
+        """
+        self._snapshot_cache = None
+
+    async def is_present(self, xpath: str, implicit_wait: float = 0) -> bool:
+        """
+        Checks if an element is present on the screen. Checks without a wait are evaluated against the cached UI
+        snapshot, see snapshot().
+
+        :param xpath: The XPath of the element to check.
+        :param implicit_wait: The time to wait for the element to be present.
+        :return: True if the element is present, False otherwise.
+        """
+        if implicit_wait == 0:
+            try:
+                return (await self.snapshot()).is_present(xpath)
+            except UnsupportedXPathError:
+                pass
+        return len(await self._wait_for_elements(xpath, implicit_wait)) > 0
+
+    async def present_many(self, xpaths: Iterable[str]) -> dict[str, bool]:
+        """
+        Checks for a number of XPaths which of them are present on the screen, using one UI snapshot. XPaths that cannot
+        be evaluated locally are checked on the device.
+
+        :param xpaths: The XPaths of the elements to check.
+        :return: A dict from each XPath to True if the element is present, False otherwise.
+        """
+        snapshot = await self.snapshot()
+        presence = {}
+        for xpath in xpaths:
+            if xpath in presence:
+                continue
+            try:
+                presence[xpath] = snapshot.is_present(xpath)
+            except UnsupportedXPathError:
+                presence[xpath] = len(await self._find_elements(xpath)) > 0
+        return presence
+
+    async def _find_element(self, xpath: str) -> str | None:
+        for attempt in range(3):
+            found = await self._wait_for_elements(xpath, self.implicit_wait)
+            if found:
+                return found[0]
+        return None
+
+    async def click(self, xpath: str):
+        """
+        Clicks in the center of an element specified by its XPath.
+
+        :param xpath: The XPath of the element to click.
+        :raises PumaClickException: If the element cannot be found after multiple attempts.
+        """
+        element = await self._find_element(xpath)
+        if element is None:
+            raise PumaClickException(f'Could not click on non present element with xpath {xpath}')
+        try:
+            await self.command('POST', f'/element/{element}/click', {})
+        finally:
+            self.invalidate_snapshot()
+
+    async def click_chain(self, xpaths: list[str]):
+        """
+        Clicks on a series of elements, waiting for each element to appear before clicking it.
+
+        :param xpaths: The XPaths of the elements to click, in order.
+        :raises PumaClickException: If one of the elements cannot be clicked. The message names the failing XPath.
+        """
+        for step, xpath in enumerate(xpaths):
+            try:
+                await self.click(xpath)
+            except PumaClickException as e:
+                raise PumaClickException(f'Could not click on element {step + 1} of {len(xpaths)} with xpath {xpath}: '
+                                         f'{e}') from e
+
+    async def send_keys(self, xpath: str, text: str):
+        """
+        Sends keys to an element specified by its XPath, replacing its current text.
+
+        :param xpath: The XPath of the element to send keys to.
+        :param text: The text to send to the element.
+        :raises PumaClickException: If the element cannot be found.
+        """
+        self.gtl_logger.info(f'Entering text "{text}" in text box')
+        element = await self._find_element(xpath)
+        if element is None:
+            raise PumaClickException(f'Could not enter text in non present element with xpath {xpath}')
+        try:
+            await self.command('POST', f'/element/{element}/clear', {})
+            await self.command('POST', f'/element/{element}/value', {'text': text, 'value': list(text)})
+        finally:
+            self.invalidate_snapshot()
+
+    async def _press_key(self, keycode: int):
+        try:
+            await self.execute_script('mobile: pressKey', {'keycode': keycode})
+        finally:
+            self.invalidate_snapshot()
+
+    async def back(self):
+        """
+        Simulates pressing the back button on the device.
+        """
+        self.gtl_logger.info(f'Pressing back button')
+        try:
+            await self.command('POST', '/back', {})
+        finally:
+            self.invalidate_snapshot()
+
+    async def home(self):
+        """
+        Simulates pressing the home button on the device.
+        """
+        self.gtl_logger.info(f'Pressing home button')
+        await self._press_key(_KEYCODE_HOME)
+
+    async def press_enter(self):
+        """
+        Presses the enter key.
+        """
+        await self._press_key(_KEYCODE_ENTER)
+
+    async def activate_app(self):
+        """
+        Activates the application on the device.
+        """
+        self.gtl_logger.info(f'Activating app {self.app_package}')
+        try:
+            await self.execute_script('mobile: activateApp', {'appId': self.app_package})
+        finally:
+            self.invalidate_snapshot()
+
+    async def terminate_app(self):
+        """
+        Terminates the application on the device.
+        """
+        self.gtl_logger.info(f'Terminating app {self.app_package}')
+        try:
+            await self.execute_script('mobile: terminateApp', {'appId': self.app_package})
+        finally:
+            self.invalidate_snapshot()
+
+    async def restart_app(self):
+        """
+        Restarts the application by terminating and then activating it.
+        """
+        await self.terminate_app()
+        await self.activate_app()
+
+    async def app_open(self) -> bool:
+        """
+        Checks if the application is currently open.
+
+        :return: True if the application is open, False otherwise.
+        """
+        return str(await self.execute_script('mobile: getCurrentPackage')) == self.app_package
+
+    def __repr__(self):
+        return f"Async Puma Driver {self.udid} for app package {self.app_package}"
@@ -0,0 +1,358 @@
+import asyncio
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Any, Callable, Dict, OrderedDict
+
+from puma.state_graph import logger
+from puma.state_graph.action import _assert_verify_with_function_is_valid
+from puma.state_graph.async_http import AsyncHttpClient
+from puma.state_graph.async_puma_driver import AsyncPumaDriver
+from puma.state_graph.popup_handler import known_popups
+from puma.state_graph.puma_driver import PumaClickException
+from puma.state_graph.state import State, ContextualState, compose_clicks
+from puma.state_graph.state_graph import StateGraph
+from puma.state_graph.state_index import _is_indexable
+from puma.state_graph.utils import async_safe_func_call, filter_arguments, is_valid_package_name
+from puma.state_graph.waits import async_poll
+
+
+class AsyncStateGraph(StateGraph):
+    """
+    An asyncio counterpart of StateGraph, driving the app through an AsyncPumaDriver. States and transitions are
+    defined in the same way as for a StateGraph, and actions are decorated with @async_action instead of @action.
+
+    Transitions, custom state validations and context validations may be coroutine functions, which are awaited.
+    Transitions made with compose_clicks() and back() work for both kinds of graphs. SimpleStates are validated
+    against a single UI snapshot, like in a StateGraph.
+
+        class AsyncWhatsApp(AsyncStateGraph):
+            conversations_state = SimpleState([CONVERSATIONS_XPATH], initial_state=True)
+            ...
+
+        async with AsyncWhatsApp('emulator-5554', 'com.whatsapp', client=client) as app:
+            await app.send_message('Hello!', conversation='Alice')
+
+    The graph connects in connect(), which is called by the async context manager. Navigation routes on the number of
+    transitions: transition costs are not measured, and optimistic navigation is not used.
+    """
+    _async_action_lock: asyncio.Lock = None
+    _action_owner: asyncio.Task = None
+
+    def __init__(self, device_udid: str, app_package: str, appium_server: str = 'http://localhost:4723',
+                 desired_capabilities: Dict[str, str] = None, client: AsyncHttpClient = None):
+        """
+        Initializes the AsyncStateGraph with a device and application package. Call connect() before use.
+
+        :param device_udid: The unique device identifier.
+        :param app_package: The package name of the application.
+        :param appium_server: Optional. The address of the Appium server, defaults to 'http://localhost:4723'.
+        :param desired_capabilities: Optional. Desired capabilities as passed to the Appium webdriver.
+        :param client: Optional. The HTTP client to send commands with, see AsyncPumaDriver.
+        """
+        if not is_valid_package_name(app_package):
+            raise ValueError(f'The provided package name is invalid: {app_package}')
+        self._connection = {'udid': device_udid, 'app_package': app_package, 'appium_server': appium_server,
+                            'desired_capabilities': desired_capabilities, 'client': client}
+        self.current_state = self.initial_state
+        self.app_popups = []
+        self.try_restart = True
+        self._async_action_lock = asyncio.Lock()
+
+    async def connect(self):
+        """
+        Connects to the device by creating the AsyncPumaDriver of this graph and its Appium session, if that was not
+        done yet.
+
+        :raises AppiumConnectionError: If the Appium server cannot be reached.
+        """
+        if self._driver is not None:
+            return
+        connection = self._connection
+        driver = AsyncPumaDriver(connection['udid'], connection['app_package'],
+                                 appium_server=connection['appium_server'],
+                                 desired_capabilities=connection['desired_capabilities'], client=connection['client'])
+        await driver.connect()
+        driver.ui_state = self.current_state.id
+        self._driver = driver
+
+    @property
+    def driver(self) -> AsyncPumaDriver:
+        """
+        The AsyncPumaDriver of this graph.
+
+        :raises ConnectionError: If the graph is not connected, see connect().
+        """
+        if self._driver is None:
+            raise ConnectionError(f'{self.__class__.__name__} is not connected, call connect() first')
+        return self._driver
+
+    @driver.setter
+    def driver(self, driver: AsyncPumaDriver):
+        self._driver = driver
+
+    async def close(self):
+        """
+        Deletes the Appium session of this graph, see AsyncPumaDriver.close(). Does nothing if it never connected.
+        """
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            await driver.close()
+
+    def __enter__(self):
+        raise TypeError(f'Use "async with" for an {self.__class__.__name__}')
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @asynccontextmanager
+    async def action_context(self):
+        """
+        Async context manager held while an action runs, so concurrent actions on one graph do not mix their state.
+        It can be re-entered by the task holding it, for example by an action calling another action.
+        """
+        task = asyncio.current_task()
+        if self._action_owner is task:
+            yield
+            return
+        async with self._async_action_lock:
+            self._action_owner = task
+            try:
+                yield
+            finally:
+                self._action_owner = None
+
+    async def validate(self, state: State) -> bool:
+        """
+        Validates whether the app is in a state, without its context.
+
+        :param state: The state to validate.
+        :return: True if the app is in the state.
+        """
+        if _is_indexable(state):
+            presence = await self.driver.present_many(state.present_xpaths + state.invalid_xpaths)
+            return (all(presence[xpath] for xpath in state.present_xpaths)
+                    and not any(presence[xpath] for xpath in state.invalid_xpaths))
+        result = state.validate(self.driver)
+        return await result if inspect.isawaitable(result) else result
+
+    async def go_to_state(self, to_state: State | str, **kwargs) -> bool:
+        """
+        Navigates to a specified state from the current state, see StateGraph.go_to_state().
+
+        :param to_state: The destination state or destination state name.
+        :param kwargs: Additional keyword arguments to pass to state validation and transition functions.
+        :return: True if the transition to the desired state is successful.
+        """
+        max_transitions = len(self.states) * 2 + 5
+        counter = 0
+        if to_state not in self.states:
+            raise ValueError(f"{to_state.id} is not a known state in this PumaUiGraph")
+        kwargs['driver'] = self.driver
+        try:
+            await self._validate_state(self.current_state, **kwargs)
+        except PumaClickException as pce:
+            logger.warning(f"Initial state validation encountered a problem {pce}")
+        routing_table = self._get_routing_table()
+        while self.current_state != to_state and counter < max_transitions:
+            counter += 1
+            try:
+                transition = routing_table.next_hop(self.current_state, to_state)
+                if transition is None:
+                    raise ValueError(f"There is no path from state '{self.current_state}' to '{to_state}'")
+
+                self.gtl_logger.info(f"Going from state '{self.current_state}' to '{to_state}', calling transition '{transition.ui_actions.__name__}'")
+                start = perf_counter()
+                await async_safe_func_call(transition.ui_actions, **kwargs)
+                duration = perf_counter() - start
+                self.driver.invalidate_snapshot()
+
+                await self._validate_state(transition.to_state, **kwargs)
+                self._record_transition(transition, duration, success=self.current_state == transition.to_state)
+            except PumaClickException as pce:
+                logger.warning(f"Transition or state validation failed, recover? {pce}")
+        if counter >= max_transitions:
+            raise ValueError(f"Too many transitions, state is unrecoverable")
+        return True
+
+    async def _validate_state(self, expected_state: State, **kwargs):
+        valid = await self.validate(expected_state)
+        context_valid = True
+        if isinstance(expected_state, ContextualState):
+            context_valid = await async_safe_func_call(expected_state.validate_context, **kwargs)
+
+        if not valid:
+            self.gtl_logger.error(f"Expected to be in state '{expected_state}', but the validation failed")
+            await self.recover_state(expected_state)
+            await self._validate_state(self.current_state, **kwargs)
+        elif not context_valid:
+            relevant_kwargs = filter_arguments(expected_state.validate_context, **kwargs)
+            self.gtl_logger.error(f"Was in the expected state '{expected_state}', but context '{relevant_kwargs}' did not match")
+            # go to the first non-contextual parent state, context is lost when recovering from a contextual state
+            go_to_state = expected_state.parent_state
+            while isinstance(go_to_state, ContextualState):
+                go_to_state = go_to_state.parent_state
+            await self.go_to_state(go_to_state)
+        else:
+            self.gtl_logger.info(f"Validated that current state is the expected state '{expected_state}'")
+            self.current_state = expected_state
+
+    async def recover_state(self, expected_state: State):
+        """
+        Attempts to recover the expected state if the current state is not the expected state, see
+        StateGraph.recover_state().
+
+        :param expected_state: The state that is expected to be the current state.
+        """
+        current_state = self.current_state if self.current_state != expected_state else 'unknown'
+        self.gtl_logger.info(f"Recovering state to '{expected_state}', current state is '{current_state}'")
+        if not await self.driver.app_open():
+            await self.driver.activate_app()
+
+        if await self.validate(self.current_state):
+            return
+
+        await self._handle_popups()
+
+        if await self.validate(self.current_state):
+            return
+
+        await self._search_state(expected_state)
+
+    async def _handle_popups(self):
+        while True:
+            popup_handlers = known_popups + self.app_popups
+            presence = await self.driver.present_many(xpath for p in popup_handlers for xpath in p.recognize_xpaths)
+            popup_handler = next((p for p in popup_handlers if p.is_recognized_by(presence)), None)
+            if popup_handler is None:
+                return
+            self.gtl_logger.info('Dismissing pop-up')
+            await compose_clicks(popup_handler.dismiss_xpaths)(self.driver)
+
+    async def _identify(self):
+        presence = await self.driver.present_many(self.state_index.xpaths)
+        validity = {state: await self.validate(state) for state in self.state_index.unindexed_states}
+        return self.state_index.identify_from(presence, validity)
+
+    async def _search_state(self, expected_state: State):
+        identification = await self._identify()
+        current_states = identification.matches
+        if len(current_states) != 1:
+            if not self.try_restart:
+                if identification.ambiguous:
+                    raise ValueError(identification.describe())
+                else:
+                    raise ValueError(f"Unknown state, cannot recover. {identification.describe()}")
+            logger.warning(f'Not in a known state. {identification.describe()}')
+            logger.warning(f'Restarting app {self.driver.app_package} once')
+            await self.driver.restart_app()
+
+            async def known_state() -> bool:
+                self.driver.invalidate_snapshot()
+                return (await self._identify()).state is not None
+
+            # wait for the app to show a known state, but no longer than the app needs to start
+            await async_poll(known_state, timeout=3)
+            self.try_restart = False
+            return
+        self.gtl_logger.info(
+            f"Was in unknown state, expected '{expected_state}'. Recognized state, setting current state to '{current_states[0]}'")
+        self.current_state = current_states[0]
+
+
+async def _execute_async_post_action_verification(puma_ui_graph: AsyncStateGraph, action: Callable,
+                                                  verify_with: Callable, arguments: OrderedDict[str, Any]):
+    """
+    Like _execute_post_action_verification, for an AsyncStateGraph. The 'verify_with' function may be a coroutine
+    function.
+    """
+    gtl_logger = puma_ui_graph.gtl_logger
+    state_before_verify_with = puma_ui_graph.current_state
+
+    bound_args = filter_arguments(verify_with, app=puma_ui_graph, **arguments)
+    try:
+        success = verify_with(**bound_args.arguments)
+        if inspect.isawaitable(success):
+            success = await success
+    except PumaClickException as e:
+        gtl_logger.warn(f"Verifying with '{verify_with.__name__}' failed due to exception: {str(e)}")
+    else:
+        if not isinstance(success, bool):
+            raise ValueError(f"result of 'verify_with' should be a bool, instead is: {type(success)}, with value: {success}")
+
+        gtl_logger.info(f"Action '{action.__name__}' {'succeeded' if success else 'failed'}")
+
+    await puma_ui_graph.go_to_state(state_before_verify_with, **arguments)
+
+
+def async_action(state: State, end_state: State = None):
+    """
+    Decorator for the coroutine function actions of an AsyncStateGraph. It behaves like @action: it ensures the
+    specified state before executing the action, retries the action once after recovering the state if it fails, and
+    supports verification with 'verify_with', which may be a coroutine function.
+
+    :param state: The target state to ensure before executing the decorated function.
+    :param end_state: Defines if this action ends in a different state (Optional)
+    :return: A decorator function that wraps the provided coroutine function with state assurance logic.
+    """
+
+    def decorator(func):
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"the action '{func.__name__}' must be a coroutine function to use @async_action")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            verify_with = None
+            if 'verify_with' in kwargs.keys():
+                verify_with = kwargs.pop('verify_with')
+                _assert_verify_with_function_is_valid(verify_with)
+
+            action_signature = inspect.signature(func)
+            if 'verify_with' in action_signature.parameters:
+                raise ValueError(f"the action '{func.__name__}' can't contain a parameter named 'verify_with'")
+
+            bound_args = action_signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            arguments = bound_args.arguments
+            arguments.pop('self')
+            puma_ui_graph = args[0]
+            gtl_logger = puma_ui_graph.gtl_logger
+            async with puma_ui_graph.action_context():
+                try:
+                    puma_ui_graph.try_restart = True
+                    await puma_ui_graph.go_to_state(state, **arguments)
+                    try:
+                        gtl_logger.info(
+                            f"Executing action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+                        result = await func(*args, **kwargs)
+                    except Exception:
+                        gtl_logger.info(f"Failed to execute action '{func.__name__}'.")
+                        await puma_ui_graph.recover_state(state)
+                        await puma_ui_graph.go_to_state(state, **arguments)
+                        gtl_logger.info(f"Retrying action '{func.__name__}'")
+                        result = await func(*args, **kwargs)
+                    puma_ui_graph.driver.invalidate_snapshot()
+                    gtl_logger.info(
+                        f"Executed action '{func.__name__}' with arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+
+                    if verify_with is not None:
+                        gtl_logger.info(f"Verifying action with '{verify_with.__name__}' using arguments: {args[1:]} and keyword arguments: {kwargs} for application: {puma_ui_graph.__class__.__name__}")
+                        await _execute_async_post_action_verification(puma_ui_graph, func, verify_with, arguments)
+
+                    puma_ui_graph.try_restart = True
+
+                    if end_state:
+                        puma_ui_graph.current_state = end_state
+                    return result
+                except Exception as e:
+                    gtl_logger.exception("Unexpected exception while executing an action")
+                    raise e
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,289 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, TypeVar
+
+from puma.state_graph import logger
+
+T = TypeVar('T')
+
+# Command priorities, from high to low. Foreground commands are the commands of actions, which a user waits for.
+FOREGROUND = 0
+# Commands that have to be sent at a steady rate, such as location updates
+PERIODIC = 1
+# Commands that can wait until the session is idle, such as checks of a notification watcher
+BACKGROUND = 2
+
+# The attribute of an Appium driver holding its scheduler
+_SCHEDULER_ATTRIBUTE = '_puma_command_scheduler'
+# Guards attaching schedulers, so two threads sharing a driver never both wrap its execute method
+_attach_lock = threading.Lock()
+
+
+@dataclass
+class SchedulerStats:
+    """
+    Statistics of a command scheduler.
+
+    :param foreground: The number of foreground commands executed.
+    :param queued: The number of queued (periodic and background) commands executed.
+    :param coalesced: The number of queued commands dropped because a newer command with the same key was queued.
+    :param max_queue_delay: The longest time in seconds a queued command waited before it was executed.
+    """
+    foreground: int = 0
+    queued: int = 0
+    coalesced: int = 0
+    max_queue_delay: float = 0.0
+
+
+class _QueuedCommand:
+    __slots__ = ('command', 'priority', 'coalesce_key', 'deadline', 'queued_at', 'future')
+
+    def __init__(self, command: Callable[[], Any], priority: int, coalesce_key: Hashable | None,
+                 max_delay: float | None):
+        self.command = command
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.queued_at = time.monotonic()
+        self.deadline = self.queued_at + max_delay if max_delay is not None else None
+        self.future = Future()
+
+    def overdue(self, now: float) -> bool:
+        return self.deadline is not None and now >= self.deadline
+
+
+class CommandScheduler:
+    """
+    Serializes the commands sent to one Appium session, so threads sharing the session, such as the thread running
+    actions and the threads of a RouteSimulator, never send commands at the same time.
+
+    Foreground commands are executed by the calling thread, as soon as the session is free. Other commands are queued
+    with submit() and executed one by one by a dispatcher thread of the scheduler, whenever no foreground command is
+    waiting. A queued command with a maximum delay is guaranteed to be executed within that delay (plus the duration of
+    a single command), even when foreground commands keep coming: once it is overdue, it goes first. Queued commands
+    with the same coalesce key replace each other, so a producer that is faster than the session, like a location
+    update loop, never builds up a backlog of stale commands.
+
+    Every command of an Appium driver goes through its scheduler once attached, see command_scheduler(). Commands
+    executed by a command, like the requests of driver.set_location() in a queued command, run right away.
+    """
+
+    def __init__(self, name: str = 'device'):
+        """
+        :param name: The name of the scheduler, used for its dispatcher thread. Typically the udid of the device.
+        """
+        self.name = name
+        self.stats = SchedulerStats()
+        self._condition = threading.Condition()
+        self._owner: threading.Thread | None = None
+        self._foreground_waiting = 0
+        self._queues: dict[int, deque[_QueuedCommand]] = {PERIODIC: deque(), BACKGROUND: deque()}
+        self._coalescing: dict[Hashable, _QueuedCommand] = {}
+        self._dispatcher: threading.Thread | None = None
+        self._shut_down = False
+
+    def run(self, command: Callable[[], T], priority: int = FOREGROUND) -> T:
+        """
+        Executes a command on the calling thread, as soon as no other command is executing. Commands with the
+        FOREGROUND priority go before queued commands, unless a queued command is overdue. Other priorities wait until
+        the queued commands of the same or a higher priority are done.
+
+        :param command: The command to execute.
+        :param priority: Optional. The priority of the command, FOREGROUND by default.
+        :return: The result of the command.
+        """
+        current = threading.current_thread()
+        if self._owner is current:
+            # a command executed by a command
+            return command()
+        if priority != FOREGROUND:
+            return self.submit(command, priority).result()
+        with self._condition:
+            self._foreground_waiting += 1
+            try:
+                self._condition.wait_for(lambda: self._owner is None and self._overdue_command() is None)
+            finally:
+                self._foreground_waiting -= 1
+            self._owner = current
+            self.stats.foreground += 1
+        try:
+            return command()
+        finally:
+            with self._condition:
+                self._owner = None
+                self._condition.notify_all()
+
+    def submit(self, command: Callable[[], T], priority: int = BACKGROUND, coalesce_key: Hashable = None,
+               max_delay: float = None) -> Future:
+        """
+        Queues a command, to be executed by the dispatcher thread of this scheduler. This does not block.
+
+        :param command: The command to execute.
+        :param priority: Optional. PERIODIC or BACKGROUND, BACKGROUND by default.
+        :param coalesce_key: Optional. When a command with the same key is still queued, that command is dropped (its
+        future is cancelled) in favour of this one.
+        :param max_delay: Optional. The maximum time in seconds the command may wait before it is executed. By default
+        the command waits as long as commands of a higher priority are waiting.
+        :return: A future for the result of the command.
+        :raises ValueError: If the priority is not PERIODIC or BACKGROUND.
+        :raises RuntimeError: If the scheduler was shut down.
+        """
+        if priority not in self._queues:
+            raise ValueError(f'Queued commands must have priority PERIODIC or BACKGROUND, not {priority}')
+        queued = _QueuedCommand(command, priority, coalesce_key, max_delay)
+        with self._condition:
+            if self._shut_down:
+                raise RuntimeError(f'Command scheduler {self.name} was shut down')
+            stale = self._coalescing.pop(coalesce_key, None) if coalesce_key is not None else None
+            if stale is not None and stale.priority == priority:
+                # the new command takes the place of the stale one, so replacing commands never delays them
+                queue = self._queues[priority]
+                queue[queue.index(stale)] = queued
+                queued.queued_at = stale.queued_at
+                if stale.deadline is not None:
+                    queued.deadline = min(stale.deadline, queued.deadline or stale.deadline)
+            else:
+                if stale is not None:
+                    self._queues[stale.priority].remove(stale)
+                self._queues[priority].append(queued)
+            if stale is not None:
+                stale.future.cancel()
+                self.stats.coalesced += 1
+            if coalesce_key is not None:
+                self._coalescing[coalesce_key] = queued
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name=f'puma-scheduler-{self.name}',
+                                                    daemon=True)
+                self._dispatcher.start()
+            self._condition.notify_all()
+        return queued.future
+
+    def _overdue_command(self) -> _QueuedCommand | None:
+        now = time.monotonic()
+        overdue = [queue[0] for queue in self._queues.values() if queue and queue[0].overdue(now)]
+        return min(overdue, key=lambda command: command.deadline, default=None)
+
+    def _next_command(self) -> _QueuedCommand | None:
+        """
+        The queued command to execute next, if any may be executed now. Called with the lock held.
+        """
+        overdue = self._overdue_command()
+        if overdue is not None:
+            return overdue
+        if self._foreground_waiting:
+            return None
+        return next((queue[0] for queue in self._queues.values() if queue), None)
+
+    def _next_deadline(self) -> float | None:
+        deadlines = [queue[0].deadline for queue in self._queues.values() if queue and queue[0].deadline is not None]
+        return min(deadlines) - time.monotonic() if deadlines else None
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._owner is None:
+                        queued = self._next_command()
+                        if queued is not None:
+                            break
+                    if self._shut_down and not any(self._queues.values()):
+                        return
+                    # wake up when the first queued command becomes overdue, to let it go before the foreground
+                    timeout = self._next_deadline()
+                    self._condition.wait(timeout=max(timeout, 0.001) if timeout is not None else None)
+                self._queues[queued.priority].popleft()
+                if queued.coalesce_key is not None and self._coalescing.get(queued.coalesce_key) is queued:
+                    del self._coalescing[queued.coalesce_key]
+                if not queued.future.set_running_or_notify_cancel():
+                    continue
+                self._owner = threading.current_thread()
+                self.stats.queued += 1
+                self.stats.max_queue_delay = max(self.stats.max_queue_delay, time.monotonic() - queued.queued_at)
+            try:
+                queued.future.set_result(queued.command())
+            except BaseException as e:
+                logger.warning(f'Queued command of {self.name} failed: {e}')
+                queued.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._owner = None
+                    self._condition.notify_all()
+
+    def cancel(self, coalesce_key: Hashable = None) -> int:
+        """
+        Cancels queued commands.
+
+        :param coalesce_key: Optional. Only cancel the queued command with this key. By default all queued commands are
+        cancelled.
+        :return: The number of cancelled commands.
+        """
+        with self._condition:
+            if coalesce_key is not None:
+                queued = self._coalescing.pop(coalesce_key, None)
+                cancelled = [queued] if queued is not None else []
+                for command in cancelled:
+                    self._queues[command.priority].remove(command)
+            else:
+                cancelled = [command for queue in self._queues.values() for command in queue]
+                for queue in self._queues.values():
+                    queue.clear()
+                self._coalescing.clear()
+            self._condition.notify_all()
+        return sum(1 for command in cancelled if command.future.cancel())
+
+    def shutdown(self, cancel_pending: bool = True):
+        """
+        Stops the dispatcher thread. Foreground commands can still be executed afterwards.
+
+        :param cancel_pending: Optional. Whether to cancel the queued commands, or to execute them first.
+        """
+        if cancel_pending:
+            self.cancel()
+        with self._condition:
+            self._shut_down = True
+            dispatcher = self._dispatcher
+            self._condition.notify_all()
+        if dispatcher is not None and dispatcher is not threading.current_thread():
+            dispatcher.join()
+
+    def __repr__(self):
+        return f'CommandScheduler({self.name})'
+
+
+def command_scheduler(driver, name: str = 'device') -> CommandScheduler:
+    """
+    Returns the scheduler of an Appium driver, attaching a new scheduler if the driver has none yet. Once attached,
+    every command sent by the driver (and by its WebElements) is a foreground command of the scheduler. The session
+    registry attaches a scheduler to every session it creates.
+
+    :param driver: The Appium driver.
+    :param name: Optional. The name of a new scheduler, typically the udid of the device.
+    :return: The scheduler of the driver.
+    """
+    # looked up in the instance dict, so a scheduler is never invented by a mock
+    with _attach_lock:
+        scheduler = vars(driver).get(_SCHEDULER_ATTRIBUTE)
+        if scheduler is None:
+            scheduler = CommandScheduler(name)
+            execute = driver.execute
+
+            def scheduled_execute(*args, **kwargs):
+                return scheduler.run(lambda: execute(*args, **kwargs))
+
+            driver.execute = scheduled_execute
+            setattr(driver, _SCHEDULER_ATTRIBUTE, scheduler)
+        return scheduler
+
+
+def detach_command_scheduler(driver):
+    """
+    Shuts down the scheduler of an Appium driver, if it has one, cancelling its queued commands. Used when the session
+    of the driver is closed.
+
+    :param driver: The Appium driver.
+    """
+    scheduler = vars(driver).get(_SCHEDULER_ATTRIBUTE)
+    if scheduler is not None:
+        scheduler.shutdown()
@@ -0,0 +1,39 @@
+from typing import Any, Hashable
+
+
+class ContextStore:
+    """
+    Stores data that is specific to one device, such as the tab that was last opened in a browser, for objects that are
+    shared between devices. States are class attributes of a StateGraph, so they are shared by every StateGraph
+    instance, and must not keep per-device data themselves. Instead, they keep it in the context store of the driver
+    they are given.
+
+    Every PumaDriver has a store of its own, so stores are never shared between devices, and no locking is needed.
+    """
+
+    def __init__(self):
+        self._contexts: dict[Hashable, dict[str, Any]] = {}
+
+    def of(self, owner: Hashable) -> dict[str, Any]:
+        """
+        Returns the context of an object, such as a state, on this device. Changes to the returned dict are stored.
+
+        :param owner: The object to get the context of.
+        :return: The context of the object. Empty if nothing was stored for the object yet.
+        """
+        # setdefault is atomic, so concurrent first use of a context cannot lose data
+        return self._contexts.setdefault(owner, {})
+
+    def clear(self, owner: Hashable = None):
+        """
+        Removes stored data.
+
+        :param owner: Optional. The object to remove the context of, by default all contexts are removed.
+        """
+        if owner is None:
+            self._contexts.clear()
+        else:
+            self._contexts.pop(owner, None)
+
+    def __contains__(self, owner: Hashable) -> bool:
+        return owner in self._contexts
@@ -0,0 +1,192 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, TypeVar
+
+from puma.state_graph import logger
+from puma.state_graph.state_graph import StateGraph
+
+T = TypeVar('T')
+
+
+class _DeviceWorker:
+    """
+    Runs the tasks of one device in order, on a thread of its own. The app of the device is created on that thread by
+    the first task, so creating the apps of several devices (and their Appium sessions) happens in parallel.
+    """
+
+    def __init__(self, udid: str, app_factory: Callable[[str], StateGraph]):
+        self.udid = udid
+        self.app: StateGraph | None = None
+        self._app_factory = app_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'puma-{udid}')
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def _run(self, task: Callable[..., T], args, kwargs) -> T:
+        if self.app is None:
+            self.app = self._app_factory(self.udid)
+        return task(self.app, *args, **kwargs)
+
+    def submit(self, task: Callable[..., T], args, kwargs) -> Future:
+        future = self._executor.submit(self._run, task, args, kwargs)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def cancel(self) -> int:
+        with self._lock:
+            pending = list(self._pending)
+        return sum(1 for future in pending if future.cancel())
+
+    def _close_app(self):
+        if self.app is not None:
+            self.app.close()
+
+    def shutdown(self, wait_for_tasks: bool):
+        # closing the app is queued after the tasks, so it never happens while a task is using the app
+        closed = self._executor.submit(self._close_app)
+        self._executor.shutdown(wait=wait_for_tasks)
+        if wait_for_tasks and closed.exception() is not None:
+            logger.warning(f'Could not close app on device {self.udid}: {closed.exception()}')
+
+
+class DeviceExecutor:
+    """
+    Runs tasks on StateGraph apps on many devices at once. Each device has a worker thread of its own, which executes
+    the tasks for that device one by one, in the order they were submitted. Tasks for different devices run in
+    parallel, so the throughput grows with the number of devices.
+
+    A task is any callable taking the app as first argument, such as an action of the app class:
+
+        with DeviceExecutor(WhatsApp, ['emulator-5554', 'emulator-5556']) as executor:
+            futures = executor.submit_all(WhatsApp.send_message, 'Hello!', conversation='Alice')
+            results = DeviceExecutor.results(futures)
+
+    Pending tasks can be cancelled. A task that is already running cannot be interrupted and is completed.
+    """
+
+    def __init__(self, app_factory: Callable[[str], StateGraph], udids: Iterable[str] = ()):
+        """
+        :param app_factory: Creates the app for a device, given its udid. For example an app class like WhatsApp.
+        The app is created by the worker of the device, when its first task runs.
+        :param udids: Optional. The unique device identifiers of the devices to run tasks on. More devices can be
+        added with add_device().
+        """
+        self._app_factory = app_factory
+        self._workers: dict[str, _DeviceWorker] = {}
+        self._lock = threading.Lock()
+        self._shut_down = False
+        for udid in udids:
+            self.add_device(udid)
+
+    @property
+    def udids(self) -> list[str]:
+        """
+        :return: The unique device identifiers of all devices of this executor.
+        """
+        with self._lock:
+            return list(self._workers)
+
+    def add_device(self, udid: str):
+        """
+        Adds a device to run tasks on. Adding a device that was already added has no effect.
+
+        :param udid: The unique device identifier of the device.
+        :raises RuntimeError: If the executor was shut down.
+        """
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError('Cannot add devices to an executor that was shut down')
+            if udid not in self._workers:
+                self._workers[udid] = _DeviceWorker(udid, self._app_factory)
+
+    def _worker(self, udid: str) -> _DeviceWorker:
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError('Cannot submit tasks to an executor that was shut down')
+            if udid not in self._workers:
+                raise ValueError(f'Unknown device {udid}, add it with add_device() first')
+            return self._workers[udid]
+
+    def submit(self, udid: str, task: Callable[..., T], *args, **kwargs) -> Future:
+        """
+        Schedules a task on a device. The task is called with the app of the device as first argument, followed by the
+        given arguments.
+
+        :param udid: The unique device identifier of the device to run the task on.
+        :param task: The task to run, such as an action of the app class.
+        :return: A future for the result of the task.
+        :raises ValueError: If the device was not added.
+        :raises RuntimeError: If the executor was shut down.
+        """
+        return self._worker(udid).submit(task, args, kwargs)
+
+    def submit_all(self, task: Callable[..., T], *args, **kwargs) -> dict[str, Future]:
+        """
+        Schedules a task on every device.
+
+        :param task: The task to run, called with the app of each device as first argument.
+        :return: The future for the result of the task, per device.
+        """
+        return {udid: self.submit(udid, task, *args, **kwargs) for udid in self.udids}
+
+    def cancel(self, udid: str = None) -> int:
+        """
+        Cancels the tasks that have not started yet. Running tasks are completed.
+
+        :param udid: Optional. The device to cancel the tasks of, by default the tasks of all devices are cancelled.
+        :return: The number of cancelled tasks.
+        :raises ValueError: If the device was not added.
+        """
+        with self._lock:
+            if udid is not None and udid not in self._workers:
+                raise ValueError(f'Unknown device {udid}')
+            workers = [self._workers[udid]] if udid is not None else list(self._workers.values())
+        return sum(worker.cancel() for worker in workers)
+
+    @staticmethod
+    def results(futures: dict[str, Future], timeout: float = None) -> dict[str, Any]:
+        """
+        Waits for the futures of several devices, for example as returned by submit_all().
+
+        :param futures: The futures per device.
+        :param timeout: Optional. The maximum time to wait in seconds, by default there is no limit.
+        :return: The result per device. For tasks that failed or were cancelled, this is the exception.
+        :raises TimeoutError: If not all futures were done in time.
+        """
+        done, not_done = wait(futures.values(), timeout=timeout)
+        if not_done:
+            raise TimeoutError(f'{len(not_done)} of {len(futures)} tasks did not finish within {timeout} seconds')
+        results = {}
+        for udid, future in futures.items():
+            try:
+                results[udid] = future.result()
+            except BaseException as e:
+                results[udid] = e
+        return results
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops all workers, after closing the apps of the devices, see StateGraph.close().
+
+        :param wait: Optional. Whether to wait until all tasks are done and the apps are closed.
+        :param cancel_pending: Optional. Whether to cancel the tasks that have not started yet.
+        """
+        with self._lock:
+            self._shut_down = True
+            workers = list(self._workers.values())
+        for worker in workers:
+            if cancel_pending:
+                worker.cancel()
+            worker.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown(cancel_pending=exc_type is not None)
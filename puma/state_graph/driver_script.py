@@ -0,0 +1,76 @@
+import json
+from dataclasses import dataclass
+
+from puma.state_graph.locator import Locator
+
+# The interval in milliseconds at which a click chain script polls for the next element
+POLL_INTERVAL_MS = 100
+
+# A WebdriverIO script for the Appium execute driver endpoint. For each step it polls until an element is found, then
+# clicks it. Errors are caught, so the script always returns how many steps were completed.
+_CLICK_CHAIN_TEMPLATE = '''
+const steps = %(steps)s;
+for (let i = 0; i < steps.length; i++) {
+    const deadline = Date.now() + %(timeout_ms)d;
+    try {
+        let found = await driver.findElements(steps[i][0], steps[i][1]);
+        while (found.length === 0 && Date.now() < deadline) {
+            await driver.pause(%(poll_interval_ms)d);
+            found = await driver.findElements(steps[i][0], steps[i][1]);
+        }
+        if (found.length === 0) {
+            return {completed: i, error: 'element not found'};
+        }
+        await driver.elementClick(found[0]['element-6066-11e4-a52e-4f735466cecf'] || found[0].ELEMENT);
+    } catch (e) {
+        return {completed: i, error: String(e && e.message || e)};
+    }
+}
+return {completed: steps.length, error: null};
+'''
+
+
+@dataclass(frozen=True)
+class ClickChainResult:
+    """
+    The outcome of a click chain script.
+
+    :param completed: The number of steps that were clicked successfully.
+    :param error: Why the step after the completed ones failed, or None if all steps were clicked.
+    """
+    completed: int
+    error: str | None = None
+
+    @property
+    def failed_step(self) -> int | None:
+        """
+        :return: The index of the step that failed, or None if all steps were clicked.
+        """
+        return None if self.error is None else self.completed
+
+    @staticmethod
+    def parse(result: dict) -> 'ClickChainResult':
+        """
+        :param result: The value returned by a click chain script.
+        :return: The parsed result.
+        :raises ValueError: If the value was not returned by a click chain script.
+        """
+        if not isinstance(result, dict) or not isinstance(result.get('completed'), int):
+            raise ValueError(f'Unexpected result of click chain script: {result!r}')
+        return ClickChainResult(result['completed'], result.get('error'))
+
+
+def compile_click_chain(locators: list[Locator], timeout: float) -> str:
+    """
+    Compiles a chain of clicks into a single script for Appium's execute driver endpoint, so the whole chain runs on
+    the Appium server in one request instead of several requests per click.
+
+    :param locators: The locators of the elements to click, in order.
+    :param timeout: The maximum time in seconds to wait for each element to appear.
+    :return: The WebdriverIO script. It returns an object that can be parsed with ClickChainResult.parse().
+    """
+    if not locators:
+        raise ValueError('A click chain needs at least one element to click')
+    steps = json.dumps([[locator.by, locator.value] for locator in locators])
+    return _CLICK_CHAIN_TEMPLATE % {'steps': steps, 'timeout_ms': int(timeout * 1000),
+                                    'poll_interval_ms': POLL_INTERVAL_MS}
@@ -0,0 +1,123 @@
+import re
+from dataclasses import dataclass
+
+_BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)]\[(-?\d+),(-?\d+)]')
+
+# key of a cached element: the app package, the id of the current state and the XPath of the element
+BoundsKey = tuple[str, str | None, str]
+
+
+@dataclass(frozen=True)
+class Bounds:
+    """
+    The bounds of an element on the screen, in pixels.
+    """
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    @staticmethod
+    def parse(bounds: str) -> 'Bounds | None':
+        """
+        Parses the bounds attribute of a node in the page source, such as "[0,0][1080,200]".
+
+        :param bounds: The bounds attribute.
+        :return: The bounds, or None if the attribute could not be parsed.
+        """
+        match = _BOUNDS_PATTERN.fullmatch(bounds or '')
+        return Bounds(*(int(group) for group in match.groups())) if match else None
+
+    @staticmethod
+    def from_rect(rect: dict) -> 'Bounds':
+        """
+        :param rect: The rect of a WebElement, containing the keys x, y, width and height.
+        :return: The bounds of the element.
+        """
+        return Bounds(rect['x'], rect['y'], rect['x'] + rect['width'], rect['y'] + rect['height'])
+
+    def point(self, width_ratio: float = 0.5, height_ratio: float = 0.5) -> tuple[int, int]:
+        """
+        Returns a point within the bounds. (0,0) corresponds to the top-left and (1,1) to the bottom right.
+
+        :param width_ratio: Optional. Determines the x coordinate, from 0 to 1 (left to right).
+        :param height_ratio: Optional. Determines the y coordinate, from 0 to 1 (top to bottom).
+        :return: The (x, y) coordinates of the point.
+        """
+        return (int(self.left + width_ratio * (self.right - self.left)),
+                int(self.top + height_ratio * (self.bottom - self.top)))
+
+
+@dataclass
+class TapCacheStats:
+    """
+    Statistics of the element bounds cache of a PumaDriver. Each hit is a click done by tapping cached coordinates,
+    without looking up the element on the device.
+    """
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: The fraction of clicks that tapped cached coordinates.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self):
+        """
+        Resets all counters.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def __sub__(self, other: 'TapCacheStats') -> 'TapCacheStats':
+        """
+        :return: The counts since other was copied from these statistics.
+        """
+        return TapCacheStats(self.hits - other.hits, self.misses - other.misses, self.stale - other.stale)
+
+    def __str__(self):
+        return f'{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), {self.stale} stale'
+
+
+class BoundsCache:
+    """
+    Cache of the bounds of elements that were clicked, per app, state and XPath.
+
+    Cached bounds must be validated against the current UI before they are used. All cached bounds are discarded when
+    the screen changes, i.e. when the device is rotated or the window size changes.
+    """
+
+    def __init__(self):
+        self._bounds: dict[BoundsKey, Bounds] = {}
+        self._screen = None
+        self.stats = TapCacheStats()
+
+    def get(self, key: BoundsKey) -> Bounds | None:
+        return self._bounds.get(key)
+
+    def put(self, key: BoundsKey, bounds: Bounds):
+        self._bounds[key] = bounds
+
+    def discard(self, key: BoundsKey):
+        self._bounds.pop(key, None)
+
+    def clear(self):
+        self._bounds.clear()
+
+    def update_screen(self, screen: tuple):
+        """
+        Discards all cached bounds if the screen differs from the screen the bounds were cached on.
+
+        :param screen: The current rotation, width and height of the screen.
+        """
+        if screen != self._screen:
+            self.clear()
+            self._screen = screen
+
+    def __len__(self):
+        return len(self._bounds)
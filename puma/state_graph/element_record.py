@@ -0,0 +1,129 @@
+from collections import Counter
+from typing import Callable, Hashable
+
+from lxml import etree
+
+from puma.state_graph.element_bounds import Bounds
+
+
+def _parse_bool(value: str | None) -> bool | None:
+    return None if value is None else value == 'true'
+
+
+# The attributes of the page source that can be extracted, with the record field they are stored in and their parser
+RECORD_ATTRIBUTES: dict[str, tuple[str, Callable[[str | None], object]]] = {
+    'text': ('text', lambda value: value),
+    'content-desc': ('content_desc', lambda value: value),
+    'resource-id': ('resource_id', lambda value: value),
+    'class': ('class_name', lambda value: value),
+    'package': ('package', lambda value: value),
+    'bounds': ('bounds', Bounds.parse),
+    'checked': ('checked', _parse_bool),
+    'clickable': ('clickable', _parse_bool),
+    'enabled': ('enabled', _parse_bool),
+    'focused': ('focused', _parse_bool),
+    'selected': ('selected', _parse_bool),
+    'scrollable': ('scrollable', _parse_bool),
+}
+
+
+def validate_attributes(attributes: list[str] | None) -> list[str]:
+    """
+    :param attributes: The attributes to extract, or None for all attributes in RECORD_ATTRIBUTES.
+    :return: The attributes to extract.
+    :raises ValueError: If an attribute cannot be extracted.
+    """
+    if attributes is None:
+        return list(RECORD_ATTRIBUTES)
+    unknown = [attribute for attribute in attributes if attribute not in RECORD_ATTRIBUTES]
+    if unknown:
+        raise ValueError(f'Cannot extract attributes {unknown}, supported attributes are {list(RECORD_ATTRIBUTES)}')
+    return attributes
+
+
+class ElementRecord:
+    """
+    The attributes of a UI element, read from the page source. Unlike a WebElement, reading an attribute of a record
+    does not need a request to the device. Attributes that were not extracted are None.
+    """
+    __slots__ = tuple(field for field, _ in RECORD_ATTRIBUTES.values())
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+
+    @staticmethod
+    def from_attributes(get_attribute: Callable[[str], str | None], attributes: list[str]) -> 'ElementRecord':
+        """
+        :param get_attribute: Returns the raw value of a page source attribute, or None if it is absent.
+        :param attributes: The attributes to extract.
+        :return: The record.
+        """
+        fields = {}
+        for attribute in attributes:
+            field, parse = RECORD_ATTRIBUTES[attribute]
+            fields[field] = parse(get_attribute(attribute))
+        return ElementRecord(**fields)
+
+    @staticmethod
+    def from_node(node: etree._Element, attributes: list[str]) -> 'ElementRecord':
+        """
+        :param node: A node of a UI snapshot.
+        :param attributes: The attributes to extract.
+        :return: The record.
+        """
+        return ElementRecord.from_attributes(node.get, attributes)
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, ElementRecord) and self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__
+                           if getattr(self, field) is not None)
+        return f'ElementRecord({fields})'
+
+
+def record_key(record: ElementRecord) -> Hashable:
+    """
+    The default key to recognize an element on consecutive screens while scrolling: its resource id, text and content
+    description. Raw bounds are not part of this key, as they change with every scroll. Instead, scroll_collect combines
+    the key with the position of the element in the scrolled content, see content_position().
+
+    :param record: The record of the element.
+    :return: The key of the element.
+    """
+    return record.resource_id, record.text, record.content_desc
+
+
+def scroll_offset(previous_positions: dict[Hashable, list[int]], keys: list[Hashable], records: list[ElementRecord],
+                  offset: int) -> int:
+    """
+    Estimates how far the content of a list is scrolled, from the elements that are on both the previous and the
+    current screen: the most common distance between their previous position in the content and their current position
+    on the screen.
+
+    :param previous_positions: The tops of the elements of the previous screen in content coordinates, per key.
+    :param keys: The keys of the elements on the current screen.
+    :param records: The records of the elements on the current screen, with bounds.
+    :param offset: The offset of the previous screen, used when no element is on both screens.
+    :return: The offset to add to a top on the current screen to get its position in the content.
+    """
+    distances = Counter(previous_top - record.bounds.top
+                        for element_key, record in zip(keys, records) if record.bounds is not None
+                        for previous_top in previous_positions.get(element_key, ()))
+    return distances.most_common(1)[0][0] if distances else offset
+
+
+def content_position(record: ElementRecord, offset: int) -> tuple[int, int] | None:
+    """
+    :param record: The record of an element, with bounds.
+    :param offset: The scroll offset of the screen the record was read from, see scroll_offset().
+    :return: The position of the top left corner of the element in the scrolled content, or None without bounds.
+    """
+    return (record.bounds.left, record.bounds.top + offset) if record.bounds is not None else None
@@ -0,0 +1,144 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from puma.state_graph.state import State
+
+
+def successors(state: State) -> list[State]:
+    """
+    :return: The states that can be reached from the given state with a single transition.
+    """
+    return [transition.to_state for transition in state.transitions]
+
+
+def reverse_adjacency(states: Iterable[State]) -> dict[State, list[State]]:
+    """
+    Builds the reversed graph: for each state, the states that have a transition to it.
+
+    :param states: The states of the state graph.
+    :return: A dict from each state to its predecessors.
+    """
+    predecessors = {state: [] for state in states}
+    for state in list(predecessors):
+        for to_state in successors(state):
+            predecessors.setdefault(to_state, []).append(state)
+    return predecessors
+
+
+def reachable_from(start: State, neighbours: Callable[[State], Iterable[State]] = successors) -> set[State]:
+    """
+    Finds all states reachable from a start state, including the start state itself, in O(states + transitions).
+
+    :param start: The state to start from.
+    :param neighbours: Returns the neighbours of a state. By default, follows the transitions of the state.
+    :return: The set of reachable states.
+    """
+    visited = {start}
+    queue = deque([start])
+    while queue:
+        for neighbour in neighbours(queue.popleft()):
+            if neighbour not in visited:
+                visited.add(neighbour)
+                queue.append(neighbour)
+    return visited
+
+
+def unreachable_states(states: list[State], initial_state: State) -> list[State]:
+    """
+    :return: The states that cannot be reached from the initial state, in the given order.
+    """
+    reachable = reachable_from(initial_state)
+    return [s for s in states if s not in reachable]
+
+
+def dead_end_states(states: list[State], initial_state: State) -> list[State]:
+    """
+    :return: The states from which the initial state cannot be reached, in the given order.
+    """
+    predecessors = reverse_adjacency(states)
+    can_reach_initial = reachable_from(initial_state, lambda s: predecessors.get(s, []))
+    return [s for s in states if s not in can_reach_initial]
+
+
+def strongly_connected_components(states: list[State]) -> list[list[State]]:
+    """
+    Computes the strongly connected components of a state graph using an iterative version of Tarjan's algorithm, so
+    large graphs do not hit the recursion limit. Within a component, every state can be reached from every other state.
+
+    :param states: The states of the state graph.
+    :return: The components, in reverse topological order.
+    """
+    index: dict[State, int] = {}
+    low_link: dict[State, int] = {}
+    on_stack: set[State] = set()
+    stack: list[State] = []
+    components: list[list[State]] = []
+
+    for root in states:
+        if root in index:
+            continue
+        index[root] = low_link[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            state, neighbours = work[-1]
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = low_link[neighbour] = len(index)
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(successors(neighbour))))
+                    break
+                if neighbour in on_stack:
+                    low_link[state] = min(low_link[state], index[neighbour])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[state])
+                if low_link[state] == index[state]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member is state:
+                            break
+                    components.append(component)
+    return components
+
+
+@dataclass
+class GraphAnalysis:
+    """
+    Structural analysis of a state graph.
+
+    :param unreachable_states: States that cannot be reached from the initial state.
+    :param dead_end_states: States from which the initial state cannot be reached.
+    :param components: The strongly connected components of the graph.
+    """
+    unreachable_states: list[State]
+    dead_end_states: list[State]
+    components: list[list[State]]
+
+    @property
+    def strongly_connected(self) -> bool:
+        """
+        :return: True if every state can be reached from every other state.
+        """
+        return len(self.components) <= 1
+
+
+def analyze_graph(states: list[State], initial_state: State) -> GraphAnalysis:
+    """
+    Analyzes the structure of a state graph in linear time.
+
+    :param states: The states of the state graph.
+    :param initial_state: The initial state of the state graph.
+    :return: The analysis of the graph.
+    """
+    return GraphAnalysis(unreachable_states=unreachable_states(states, initial_state),
+                         dead_end_states=dead_end_states(states, initial_state),
+                         components=strongly_connected_components(states))
@@ -0,0 +1,232 @@
+import queue
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from uuid import uuid4
+
+from adb_pywrapper import ADB_PATH
+from appium.webdriver.webdriver import WebDriver
+
+from puma.state_graph import logger
+
+# The maximum time in seconds to wait for the adb shell to execute a batch of input commands
+ADB_SHELL_TIMEOUT = 10
+
+
+class InputBackend(ABC):
+    """
+    Sends key events, taps and swipes to a device. Subclasses implement the actual communication with the device.
+    """
+
+    @abstractmethod
+    def key_event(self, keycode: int):
+        """
+        Presses and releases a key.
+
+        :param keycode: The Android keycode of the key.
+        """
+        pass
+
+    @abstractmethod
+    def tap(self, coords: tuple[int, int], duration: int = None):
+        """
+        Taps on the screen.
+
+        :param coords: The (x, y) coordinates to tap.
+        :param duration: Optional. The time in milliseconds to hold the tap.
+        """
+        pass
+
+    @abstractmethod
+    def swipe(self, start: tuple[int, int], end: tuple[int, int], duration: int):
+        """
+        Swipes over the screen.
+
+        :param start: The (x, y) coordinates to start the swipe.
+        :param end: The (x, y) coordinates to end the swipe.
+        :param duration: The duration of the swipe in milliseconds.
+        """
+        pass
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager in which input events may be combined and sent to the device at once. The events are
+        guaranteed to be executed when the context manager exits. By default, events are sent one by one.
+        """
+        yield
+
+    def close(self):
+        """
+        Releases any resources held by this backend.
+        """
+        pass
+
+
+class AppiumInputBackend(InputBackend):
+    """
+    Sends input through the Appium server, which is the default.
+    """
+
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+
+    def key_event(self, keycode: int):
+        self.driver.press_keycode(keycode)
+
+    def tap(self, coords: tuple[int, int], duration: int = None):
+        self.driver.tap([coords], duration=duration)
+
+    def swipe(self, start: tuple[int, int], end: tuple[int, int], duration: int):
+        self.driver.swipe(start[0], start[1], end[0], end[1], duration)
+
+
+class AdbShell:
+    """
+    A persistent `adb shell` session. Starting adb for every command takes tens of milliseconds, while writing a
+    command to an open shell is nearly free.
+    """
+
+    def __init__(self, udid: str):
+        """
+        :param udid: The unique device identifier of the device to open the shell on.
+        """
+        self.udid = udid
+        self._process = None
+        self._output = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._process = subprocess.Popen([ADB_PATH, '-s', self.udid, 'shell'], stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        self._output = queue.Queue()
+        # reading in a thread, so waiting for output can time out
+        threading.Thread(target=self._read_output, args=(self._process.stdout, self._output), daemon=True).start()
+
+    @staticmethod
+    def _read_output(stream, output: queue.Queue):
+        for line in stream:
+            output.put(line.rstrip('\n'))
+        output.put(None)
+
+    def run(self, commands: list[str], timeout: float = ADB_SHELL_TIMEOUT) -> list[str]:
+        """
+        Runs commands in the shell, and waits until they are done.
+
+        :param commands: The shell commands to run, in order.
+        :param timeout: Optional. The maximum time in seconds to wait for the commands to finish.
+        :return: The output lines of the commands.
+        :raises TimeoutError: If the commands did not finish in time. The shell is restarted on the next run.
+        :raises ConnectionError: If the shell exited, for example because the device disconnected.
+        """
+        marker = f'puma-done-{uuid4().hex}'
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            try:
+                self._process.stdin.write('; '.join(commands) + f'; echo {marker}\n')
+                self._process.stdin.flush()
+            except OSError as e:
+                self._stop()
+                raise ConnectionError(f'Could not write to adb shell of device {self.udid}: {e}') from e
+            lines = []
+            while True:
+                try:
+                    line = self._output.get(timeout=timeout)
+                except queue.Empty:
+                    self._stop()
+                    raise TimeoutError(f'adb shell of device {self.udid} did not finish {commands} in {timeout}s')
+                if line is None:
+                    self._stop()
+                    raise ConnectionError(f'adb shell of device {self.udid} exited while running {commands}')
+                if line == marker:
+                    return lines
+                lines.append(line)
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process = None
+
+    def close(self):
+        """
+        Closes the shell.
+        """
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                try:
+                    self._process.stdin.write('exit\n')
+                    self._process.stdin.flush()
+                    self._process.wait(timeout=1)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._stop()
+
+
+class AdbInputBackend(InputBackend):
+    """
+    Sends input with the `input` command over a persistent adb shell, bypassing the Appium server.
+    Within batch(), consecutive events are sent to the device in a single shell invocation, and consecutive key
+    events are combined into a single `input keyevent` command.
+    """
+
+    def __init__(self, udid: str, shell: AdbShell = None):
+        """
+        :param udid: The unique device identifier of the device.
+        :param shell: Optional. The shell to use, by default a new persistent shell is opened on first use.
+        """
+        self.shell = shell or AdbShell(udid)
+        self._pending: list[list[str]] = []
+        self._batch_depth = 0
+
+    def _send(self, *command: str):
+        if command[0] == 'keyevent' and self._pending and self._pending[-1][0] == 'keyevent':
+            self._pending[-1].extend(command[1:])
+        else:
+            self._pending.append(list(command))
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends all pending input events to the device, and waits until they are executed.
+        """
+        if not self._pending:
+            return
+        commands = ['input ' + ' '.join(command) for command in self._pending]
+        self._pending = []
+        output = self.shell.run(commands)
+        if output:
+            logger.warning(f'Unexpected output of adb input commands {commands}: {output}')
+
+    def key_event(self, keycode: int):
+        self._send('keyevent', str(keycode))
+
+    def tap(self, coords: tuple[int, int], duration: int = None):
+        x, y = (str(int(c)) for c in coords)
+        if duration:
+            # a swipe without movement is a long press
+            self._send('swipe', x, y, x, y, str(int(duration)))
+        else:
+            self._send('tap', x, y)
+
+    def swipe(self, start: tuple[int, int], end: tuple[int, int], duration: int):
+        self._send('swipe', *(str(int(c)) for c in (*start, *end)), str(int(duration)))
+
+    @contextmanager
+    def batch(self):
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            # do not send the remaining events of a batch that failed halfway
+            self._pending = []
+            raise
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def close(self):
+        self.shell.close()
@@ -0,0 +1,110 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+# a quoted XPath string literal, in single or double quotes
+_LITERAL = r'''(?:"(?P<{name}_dq>[^"]*)"|'(?P<{name}_sq>[^']*)')'''
+_ATTRIBUTE_CONDITIONS = {
+    'resource-id': 'resourceId',
+    'content-desc': 'description',
+    'text': 'text',
+}
+_CONDITION = re.compile(r'\s*@(?P<attribute>resource-id|content-desc|text)\s*=\s*' + _LITERAL.format(name='value') + r'\s*')
+_SIMPLE_XPATH = re.compile(r'//(?P<class_name>\*|[A-Za-z_][\w.$]*)\[(?P<conditions>[^\[\]]+)]')
+
+
+@dataclass(frozen=True)
+class Locator:
+    """
+    A strategy and value to find elements with, as passed to the find_element(s) methods of the Appium driver.
+
+    :param by: The locator strategy, one of the AppiumBy constants.
+    :param value: The value to search for with the strategy.
+    """
+    by: str
+    value: str
+
+
+def _ui_selector_string(value: str) -> str:
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _parse_conditions(conditions: str) -> dict[str, str] | None:
+    parsed = {}
+    for condition in re.split(r'\s+and\s+', conditions.strip()):
+        match = _CONDITION.fullmatch(condition)
+        if match is None or match['attribute'] in parsed:
+            return None
+        value = match['value_dq'] if match['value_dq'] is not None else match['value_sq']
+        parsed[match['attribute']] = value
+    return parsed
+
+
+def _parse_simple_xpath(xpath: str) -> tuple[str, dict[str, str]] | None:
+    match = _SIMPLE_XPATH.fullmatch(xpath.strip())
+    conditions = _parse_conditions(match['conditions']) if match else None
+    if not conditions or not all(conditions.values()):
+        return None
+    return match['class_name'], conditions
+
+
+def _ui_selector(class_name: str, conditions: dict[str, str]) -> str:
+    selector = 'new UiSelector()'
+    if class_name != '*':
+        selector += f'.className({_ui_selector_string(class_name)})'
+    for attribute, value in conditions.items():
+        selector += f'.{_ATTRIBUTE_CONDITIONS[attribute]}({_ui_selector_string(value)})'
+    return selector
+
+
+@lru_cache(maxsize=4096)
+def to_locator(xpath: str) -> Locator:
+    """
+    Translates an XPath to the fastest equivalent locator strategy. UiAutomator2 evaluates an XPath by serializing the
+    entire UI hierarchy, while its native strategies search the hierarchy directly.
+
+    Simple XPaths selecting elements by an exact resource id, content description and/or text (such as the XPaths built
+    by puma.utils.xpath_utils), optionally with a class name, are translated as follows:
+
+    * only a resource id including the package: AppiumBy.ID
+    * only a content description: AppiumBy.ACCESSIBILITY_ID
+    * anything else: AppiumBy.ANDROID_UIAUTOMATOR with an equivalent UiSelector
+
+    Any other XPath is returned as an AppiumBy.XPATH locator.
+
+    :param xpath: The XPath to translate.
+    :return: The locator to find the elements selected by the XPath with.
+    """
+    parsed = _parse_simple_xpath(xpath)
+    if parsed is None:
+        return Locator(AppiumBy.XPATH, xpath)
+    class_name, conditions = parsed
+    if class_name == '*' and len(conditions) == 1:
+        # without a package, the id strategy would prefix the id with the package of the current app
+        if ':id/' in conditions.get('resource-id', ''):
+            return Locator(AppiumBy.ID, conditions['resource-id'])
+        if 'content-desc' in conditions:
+            return Locator(AppiumBy.ACCESSIBILITY_ID, conditions['content-desc'])
+    return Locator(AppiumBy.ANDROID_UIAUTOMATOR, _ui_selector(class_name, conditions))
+
+
+def to_scroll_into_view_locator(xpath: str, max_swipes: int) -> Locator | None:
+    """
+    Translates a simple XPath (see to_locator) to a UiScrollable locator, which makes UiAutomator2 scroll the first
+    scrollable container until the element is in view. The whole search is done on the device, in a single request.
+    Note that UiScrollable first scrolls to the beginning of the container, and then searches forward.
+
+    :param xpath: The XPath of the element to scroll to.
+    :param max_swipes: The maximum number of swipes UiScrollable does while searching.
+    :return: The locator, or None if the XPath cannot be translated to a UiSelector.
+    """
+    parsed = _parse_simple_xpath(xpath)
+    if parsed is None:
+        return None
+    return Locator(AppiumBy.ANDROID_UIAUTOMATOR,
+                   'new UiScrollable(new UiSelector().scrollable(true).instance(0))'
+                   f'.setMaxSearchSwipes({int(max_swipes)})'
+                   f'.scrollIntoView({_ui_selector(*parsed)})')
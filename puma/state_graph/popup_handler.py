@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Dict
 
 from puma.state_graph.generic_xpaths import APP_STOPPED_POPUP_CLOSE_BUTTON, APP_STOPPED_POPUP_TITLE, \
     APP_UPDATE_POPUP_DISMISS_BUTTON, PERMISSIONS_POPUP_ALLOW_FOREGROUND_BUTTON, PERMISSIONS_POPUP_ALLOW_BUTTON
@@ -28,7 +28,17 @@ class PopUpHandler:
         :param driver: The PumaDriver instance to use for searching the window.
         return: Whether the pop-up window was found or not.
         """
-        return all(driver.is_present(xpath) for xpath in self.recognize_xpaths)
+        snapshot = driver.snapshot()
+        return all(snapshot.is_present(xpath) for xpath in self.recognize_xpaths)
+
+    def is_recognized_by(self, presence: Dict[str, bool]) -> bool:
+        """
+        Check if a pop-up is present, given the presence of its recognize XPaths as returned by PumaDriver.present_many.
+
+        :param presence: Whether each XPath is present. Must contain all recognize XPaths of this pop-up.
+        return: Whether the pop-up window was found or not.
+        """
+        return all(presence[xpath] for xpath in self.recognize_xpaths)
 
     def dismiss_popup(self, driver: PumaDriver):
         """
@@ -0,0 +1,360 @@
+import multiprocessing
+import pickle
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from typing import Callable, Iterable
+
+from puma.state_graph import logger
+from puma.state_graph.device_executor import DeviceExecutor
+from puma.state_graph.state_graph import StateGraph
+
+# Worker processes are spawned rather than forked: a forked child inherits the threads and open Appium connections of
+# the coordinator in an undefined state. Spawning does require the app factory and tasks to be picklable.
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+# The time in seconds a worker process gets to close its app when shutting down, before it is terminated
+SHUTDOWN_TIMEOUT = 30
+
+
+class WorkerCrashedError(RuntimeError):
+    """
+    Raised for a task that was running when the worker process of its device died, for example because the Appium
+    client crashed the interpreter. The worker is restarted for the next task of the device.
+    """
+    pass
+
+
+class RemoteTraceback(Exception):
+    """
+    The traceback of an exception raised in a worker process, set as the cause of that exception in the coordinator.
+    """
+
+    def __init__(self, tb: str):
+        super().__init__(tb)
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def _worker_main(udid: str, app_factory: Callable[[str], StateGraph], connection: Connection):
+    """
+    The main loop of a worker process. It receives pickled (task, args, kwargs) frames and answers each with a pickled
+    (succeeded, result or exception, traceback) frame. A None frame stops the worker, after closing the app.
+    """
+    app = None
+    try:
+        while True:
+            try:
+                request = pickle.loads(connection.recv_bytes())
+            except EOFError:
+                # the coordinator is gone
+                return
+            if request is None:
+                return
+            task, args, kwargs = request
+            try:
+                if app is None:
+                    app = app_factory(udid)
+                if isinstance(task, str):
+                    result = getattr(app, task)(*args, **kwargs)
+                else:
+                    result = task(app, *args, **kwargs)
+                response = (True, result, None)
+            except BaseException as e:
+                response = (False, e, traceback.format_exc())
+            try:
+                connection.send_bytes(pickle.dumps(response))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                # the result or exception cannot be sent to the coordinator, send an error it can unpickle instead
+                error = RuntimeError(f'Could not send the result of the task to the coordinator: {e!r}')
+                connection.send_bytes(pickle.dumps((False, error, traceback.format_exc())))
+    finally:
+        if app is not None:
+            try:
+                app.close()
+            except Exception as e:
+                logger.warning(f'Could not close app on device {udid}: {e}')
+        connection.close()
+
+
+class _ProcessWorker:
+    """
+    Runs the tasks of one device in order, in a process of its own. Tasks are queued in the coordinator and sent to the
+    process one at a time, so tasks that have not been sent yet can still be cancelled. A thread of the coordinator
+    reads the results as they arrive.
+    """
+
+    def __init__(self, udid: str, app_factory: Callable[[str], StateGraph]):
+        self.udid = udid
+        self.restarts = 0
+        self._app_factory = app_factory
+        self._queue: deque[tuple[Future, bytes]] = deque()
+        self._running: Future | None = None
+        self._process = None
+        self._connection: Connection | None = None
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    @property
+    def pid(self) -> int | None:
+        with self._lock:
+            return self._process.pid if self._process is not None else None
+
+    def _start(self):
+        """
+        Starts the worker process and the thread reading its results. Called with the lock held.
+        """
+        connection, child_connection = _MP_CONTEXT.Pipe()
+        self._process = _MP_CONTEXT.Process(target=_worker_main, args=(self.udid, self._app_factory, child_connection),
+                                            name=f'puma-{self.udid}', daemon=True)
+        self._process.start()
+        # the child holds the other end now, closing our copy lets us notice when the child dies
+        child_connection.close()
+        self._connection = connection
+        threading.Thread(target=self._read_results, args=(connection, self._process), name=f'puma-{self.udid}-results',
+                         daemon=True).start()
+
+    def submit(self, task: Callable | str, args, kwargs) -> Future:
+        # pickling here makes tasks that cannot be sent to the worker fail right away, in the caller
+        frame = pickle.dumps((task, args, kwargs))
+        future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError('Cannot submit tasks to an executor that was shut down')
+            self._queue.append((future, frame))
+            self._send_next()
+        return future
+
+    def _send_next(self):
+        """
+        Sends the next task that was not cancelled to the worker process, unless a task is running. Called with the
+        lock held.
+        """
+        while self._running is None and self._queue:
+            future, frame = self._queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if self._process is None:
+                self._start()
+            self._running = future
+            try:
+                self._connection.send_bytes(frame)
+            except OSError:
+                # the worker process died, the thread reading its results fails the task and starts a new process
+                pass
+
+    def _read_results(self, connection: Connection, process):
+        while True:
+            try:
+                frame = connection.recv_bytes()
+            except (EOFError, OSError):
+                self._on_exit(connection, process)
+                return
+            with self._lock:
+                future, self._running = self._running, None
+                self._send_next()
+            try:
+                succeeded, value, tb = pickle.loads(frame)
+            except Exception as e:
+                future.set_exception(RuntimeError(f'Could not read the result of the task: {e!r}'))
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                value.__cause__ = RemoteTraceback(tb)
+                future.set_exception(value)
+
+    def _on_exit(self, connection: Connection, process):
+        process.join()
+        with self._lock:
+            if process is not self._process:
+                return
+            self._process = None
+            self._connection = None
+            connection.close()
+            future, self._running = self._running, None
+            if self._stopping and future is None:
+                return
+            self.restarts += 1
+            logger.error(f'The worker process of device {self.udid} exited unexpectedly with exit code '
+                         f'{process.exitcode}')
+            if future is not None:
+                future.set_exception(WorkerCrashedError(
+                    f'The worker process of device {self.udid} exited with exit code {process.exitcode} while running '
+                    f'a task'))
+            # the next task starts a new worker process
+            self._send_next()
+
+    def cancel(self) -> int:
+        with self._lock:
+            queued = [future for future, _ in self._queue]
+        return sum(1 for future in queued if future.cancel())
+
+    def pending(self) -> list[Future]:
+        with self._lock:
+            return [future for future, _ in self._queue] + ([self._running] if self._running is not None else [])
+
+    def shutdown(self, wait_for_tasks: bool):
+        with self._lock:
+            self._stopping = True
+        if wait_for_tasks:
+            for future in self.pending():
+                try:
+                    future.exception()
+                except BaseException:
+                    pass
+        with self._lock:
+            process, connection = self._process, self._connection
+            # tasks still queued when not waiting are never sent, also when no worker process is running
+            for future, _ in self._queue:
+                future.cancel()
+            self._queue.clear()
+            if connection is not None:
+                connection.send_bytes(pickle.dumps(None))
+        if process is not None and wait_for_tasks:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f'The worker process of device {self.udid} did not stop in time, terminating it')
+                process.terminate()
+                process.join()
+
+
+class ProcessDeviceExecutor:
+    """
+    Runs tasks on StateGraph apps on many devices at once, like DeviceExecutor, but with the app of each device in a
+    worker process of its own. Parsing page sources, OCR and logging of different devices then no longer compete for
+    the interpreter lock, so a single machine can use all its cores. A worker process that crashes, for example in the
+    Appium client, only fails the task it was running; the next task of that device starts a new worker process.
+
+    Tasks and their arguments are sent to the worker processes, and the results back, as pickle frames over a pipe. The
+    app factory, the tasks, their arguments and their results must therefore be picklable. App classes, actions of app
+    classes and functions defined at module level are. A task can also be given as the name of a method of the app:
+
+        with ProcessDeviceExecutor(WhatsApp, ['emulator-5554', 'emulator-5556']) as executor:
+            futures = executor.submit_all(WhatsApp.send_message, 'Hello!', conversation='Alice')
+            results = ProcessDeviceExecutor.results(futures)
+
+    Worker processes are spawned, so scripts using this executor must guard their main code with
+    `if __name__ == '__main__':`.
+    """
+
+    def __init__(self, app_factory: Callable[[str], StateGraph], udids: Iterable[str] = ()):
+        """
+        :param app_factory: Creates the app for a device, given its udid. For example an app class like WhatsApp. The
+        app is created in the worker process of the device, when its first task runs.
+        :param udids: Optional. The unique device identifiers of the devices to run tasks on. More devices can be
+        added with add_device().
+        """
+        self._app_factory = app_factory
+        self._workers: dict[str, _ProcessWorker] = {}
+        self._lock = threading.Lock()
+        self._shut_down = False
+        for udid in udids:
+            self.add_device(udid)
+
+    @property
+    def udids(self) -> list[str]:
+        """
+        :return: The unique device identifiers of all devices of this executor.
+        """
+        with self._lock:
+            return list(self._workers)
+
+    def add_device(self, udid: str):
+        """
+        Adds a device to run tasks on. Its worker process is started by its first task. Adding a device that was
+        already added has no effect.
+
+        :param udid: The unique device identifier of the device.
+        :raises RuntimeError: If the executor was shut down.
+        """
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError('Cannot add devices to an executor that was shut down')
+            if udid not in self._workers:
+                self._workers[udid] = _ProcessWorker(udid, self._app_factory)
+
+    def _worker(self, udid: str) -> _ProcessWorker:
+        with self._lock:
+            if self._shut_down:
+                raise RuntimeError('Cannot submit tasks to an executor that was shut down')
+            if udid not in self._workers:
+                raise ValueError(f'Unknown device {udid}, add it with add_device() first')
+            return self._workers[udid]
+
+    def submit(self, udid: str, task: Callable | str, *args, **kwargs) -> Future:
+        """
+        Schedules a task on a device. The task is called in the worker process of the device, with the app of the
+        device as first argument, followed by the given arguments.
+
+        :param udid: The unique device identifier of the device to run the task on.
+        :param task: The task to run, such as an action of the app class, or the name of a method of the app.
+        :return: A future for the result of the task. If the worker process died while running the task, the future
+        fails with a WorkerCrashedError.
+        :raises ValueError: If the device was not added.
+        :raises RuntimeError: If the executor was shut down.
+        :raises pickle.PicklingError: If the task or its arguments cannot be sent to the worker process.
+        """
+        return self._worker(udid).submit(task, args, kwargs)
+
+    def submit_all(self, task: Callable | str, *args, **kwargs) -> dict[str, Future]:
+        """
+        Schedules a task on every device.
+
+        :param task: The task to run, called with the app of each device as first argument, or the name of a method of
+        the app.
+        :return: The future for the result of the task, per device.
+        """
+        return {udid: self.submit(udid, task, *args, **kwargs) for udid in self.udids}
+
+    def cancel(self, udid: str = None) -> int:
+        """
+        Cancels the tasks that have not started yet. Running tasks are completed.
+
+        :param udid: Optional. The device to cancel the tasks of, by default the tasks of all devices are cancelled.
+        :return: The number of cancelled tasks.
+        :raises ValueError: If the device was not added.
+        """
+        with self._lock:
+            if udid is not None and udid not in self._workers:
+                raise ValueError(f'Unknown device {udid}')
+            workers = [self._workers[udid]] if udid is not None else list(self._workers.values())
+        return sum(worker.cancel() for worker in workers)
+
+    def restarts(self, udid: str) -> int:
+        """
+        :param udid: The unique device identifier of the device.
+        :return: How often the worker process of the device exited unexpectedly.
+        :raises ValueError: If the device was not added.
+        """
+        with self._lock:
+            if udid not in self._workers:
+                raise ValueError(f'Unknown device {udid}')
+            return self._workers[udid].restarts
+
+    results = staticmethod(DeviceExecutor.results)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops all worker processes, after closing the apps of the devices, see StateGraph.close().
+
+        :param wait: Optional. Whether to wait until all tasks are done and the worker processes have stopped. When not
+        waiting, tasks that were not sent to a worker process yet are cancelled.
+        :param cancel_pending: Optional. Whether to cancel the tasks that have not started yet.
+        """
+        with self._lock:
+            self._shut_down = True
+            workers = list(self._workers.values())
+        for worker in workers:
+            if cancel_pending:
+                worker.cancel()
+            worker.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown(cancel_pending=exc_type is not None)
@@ -1,8 +1,11 @@
+import copy
+import functools
 import os
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Callable, Hashable, Iterator
 from uuid import uuid4
 
 from adb_pywrapper.adb_device import AdbDevice
@@ -10,15 +13,26 @@ from adb_pywrapper.adb_screen_recorder import AdbScreenRecorder
 from appium.options.android import UiAutomator2Options
 from appium.webdriver import WebElement
 from appium.webdriver.common.appiumby import AppiumBy
-from appium import webdriver
 from appium.webdriver.extensions.android.nativekey import AndroidKey
 from appium.webdriver.webdriver import WebDriver
+from selenium.common.exceptions import WebDriverException, StaleElementReferenceException, UnknownMethodException
 from selenium.webdriver import ActionChains
-from urllib3.exceptions import MaxRetryError
 
 from puma.computer_vision import ocr
 from puma.computer_vision.ocr import RecognizedText
 from puma.state_graph import logger
+from puma.state_graph.ui_snapshot import UiSnapshot, SnapshotCacheStats, UnsupportedXPathError
+from puma.state_graph.command_scheduler import CommandScheduler, command_scheduler
+from puma.state_graph.context_store import ContextStore
+from puma.state_graph.driver_script import ClickChainResult, compile_click_chain
+from puma.state_graph.element_bounds import Bounds, BoundsCache, TapCacheStats
+from puma.state_graph.element_record import (ElementRecord, validate_attributes, record_key, scroll_offset,
+                                             content_position)
+from puma.state_graph.input_backend import InputBackend, AppiumInputBackend, AdbInputBackend, AdbShell
+from puma.state_graph.session_registry import SESSIONS, SessionRegistry, AppiumSession
+from puma.state_graph.locator import Locator, to_locator, to_scroll_into_view_locator
+from puma.state_graph.text_entry import TEXT_ENTRY_STRATEGIES, TextEntryStats, TextEntryUnavailableError
+from puma.state_graph.waits import DEFAULT_WAIT_TIMEOUT, EXPONENTIAL_BACKOFF, PollStrategy, poll
 from puma.utils import CACHE_FOLDER
 from puma.utils.gtl_logging import create_gtl_logger
 
@@ -27,6 +41,9 @@ KEYCODE_LEFT_ARROW = 21
 KEYCODE_ENTER = 66
 KEYCODE_BACKSPACE = 67
 
+# A cached UI snapshot older than this (in seconds) is not reused, as apps can change the UI without any interaction.
+DEFAULT_SNAPSHOT_MAX_AGE = 1.0
+
 class PumaClickException(Exception):
     """
     Custom exception for handling errors related to clicking actions in the PumaDriver.
@@ -49,25 +66,72 @@ def _get_android_default_options() -> UiAutomator2Options:
     return options
 
 
-__drivers: dict[str, WebDriver] = {}
+# Parts of the error messages of Appium servers that do not support the execute driver endpoint
+_UNSUPPORTED_COMMAND_MESSAGES = ('unknown command', 'unknown method', 'not enabled', 'not supported',
+                                 'could not be found')
+
+
+def _is_unsupported_command(error: WebDriverException) -> bool:
+    """
+    :param error: The error of a command.
+    :return: Whether the error means that the Appium server does not support the command, so it did not execute it.
+    """
+    if isinstance(error, UnknownMethodException):
+        return True
+    message = (error.msg or '').lower()
+    return any(part in message for part in _UNSUPPORTED_COMMAND_MESSAGES)
+
+
+def _get_options(udid: str, desired_capabilities: Dict[str, str] = None) -> UiAutomator2Options:
+    options = _get_android_default_options()
+    options.udid = udid
+    if desired_capabilities:
+        options.load_capabilities(desired_capabilities)
+    return options
+
+
+def warm_up_sessions(udids: list[str], appium_server: str = 'http://localhost:4723',
+                     desired_capabilities: Dict[str, str] = None, session_registry: SessionRegistry = None,
+                     max_workers: int = None) -> dict[str, Exception]:
+    """
+    Creates the Appium sessions for several devices in parallel, so creating a PumaDriver or StateGraph for these
+    devices does not have to wait for the UiAutomator2 server to start. Bringing up many devices then takes about as
+    long as starting a single session. Use the same Appium server and capabilities as the PumaDrivers will, as the
+    capabilities of an existing session cannot be changed.
+
+    :param udids: The unique device identifiers of the devices.
+    :param appium_server: Optional. The address of the Appium server, defaults to 'http://localhost:4723'.
+    :param desired_capabilities: Optional. The desired capabilities as passed to the Appium webdriver.
+    :param session_registry: Optional. The registry to create the sessions in, by default the shared registry.
+    :param max_workers: Optional. The maximum number of sessions to create at the same time, by default all at once.
+    :return: The errors of the devices for which no session could be created. Empty if all sessions were created.
+    """
+    registry = session_registry if session_registry is not None else SESSIONS
+    return registry.warm_up(appium_server, {udid: _get_options(udid, desired_capabilities) for udid in udids},
+                            max_workers)
+
 
 def _get_appium_driver(appium_server: str, udid: str, options) -> WebDriver:
-    key = f"{appium_server}${udid}"
-    if key not in __drivers.keys():
+    """
+    Returns the shared Appium driver for a device, see SessionRegistry.acquire(). Used by the deprecated
+    AndroidAppiumActions, which never releases its session.
+    """
+    return SESSIONS.acquire(appium_server, udid, options).driver
+
+def _invalidates_snapshot(method):
+    """
+    Decorator for PumaDriver methods that can change the UI. The cached UI snapshot is invalidated once the method is
+    done, so the next read reflects the new state of the UI.
+    Methods returning WebElements are decorated as well, as the caller can change the UI through these elements.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
         try:
-            __drivers[key] = webdriver.Remote(appium_server, options=options)
-        except MaxRetryError:
-            logger.error("Connecting to the Appium server has failed.\n"
-                         "Make sure that the appium server is running!\n"
-                         "This can be done by running the `appium` command from the command line.")
-            exit(1)
-    else:
-        logger.warning(f'WARNING: There already was an initialized driver for appium server {appium_server} and udid {udid}. '
-                       'This driver will be used, which might mean your Appium capabilities are ignored as these cannot be'
-                       'altered for a driver that has already been initialized. If you need specific capabilities, please '
-                       'rewrite your Puma code to ensure the correct capabilities are loaded the first time you connect to '
-                       f'server {appium_server} and device {udid}.')
-    return __drivers[key]
+            return method(self, *args, **kwargs)
+        finally:
+            self.invalidate_snapshot()
+
+    return wrapper
 
 def supported_version(version: str):
     def decorator(class_or_function):
@@ -85,44 +149,357 @@ class PumaDriver:
     remote control of the application.
     """
 
-    def __init__(self, udid: str, app_package: str, implicit_wait: int = 1, appium_server: str = 'http://localhost:4723', desired_capabilities: Dict[str, str] = None):
+    def __init__(self, udid: str, app_package: str, implicit_wait: int = 1, appium_server: str = 'http://localhost:4723', desired_capabilities: Dict[str, str] = None,
+                 session_registry: SessionRegistry = None):
         """
         Initializes the PumaDriver with device and application details.
 
         :param udid: The unique device identifier for the Android device.
         :param app_package: The package name of the application to interact with.
-        :param implicit_wait: The implicit wait time for element searches, defaults to 1 second.
+        :param implicit_wait: The time to wait for elements to appear when searching for them, defaults to 1 second.
+        This wait is done by PumaDriver itself: the implicit wait of the Appium session is set to 0.
         :param appium_server: The address of the Appium server, defaults to 'http://localhost:4723'.
         :param desired_capabilities: The desired capabilities as passed to the Appium webdriver.
+        :param session_registry: Optional. The registry to get the Appium session from, by default the registry shared
+        by all PumaDrivers in this process.
+        :raises AppiumConnectionError: If no session could be created on the Appium server.
         """
-        self.options = _get_android_default_options()
-        self.options.udid = udid
+        self.options = _get_options(udid, desired_capabilities)
         self.app_package = app_package
-        if desired_capabilities:
-            self.options.load_capabilities(desired_capabilities)
         logger.info("Connecting to Appium driver...")
-        self.driver = _get_appium_driver(appium_server, udid, self.options)
+        self._session_registry = session_registry if session_registry is not None else SESSIONS
+        self._session: AppiumSession | None = self._session_registry.acquire(appium_server, udid, self.options)
+        self._connected_driver = self._session.driver
         self.implicit_wait = implicit_wait
-        self.driver.implicitly_wait(implicit_wait)
+        # the implicit wait of the Appium session, tracked so it is only sent when it changes
+        self._server_implicit_wait = None
+        self._set_server_implicit_wait(0)
         self.udid = self.driver.capabilities.get("udid")
+        self.device_model = self.driver.capabilities.get("deviceModel")
         self.adb = AdbDevice(self.udid)
         self._screen_recorder = None
         self._screen_recorder_output_directory = None
+        self.snapshot_max_age = DEFAULT_SNAPSHOT_MAX_AGE
+        self.snapshot_cache_stats = SnapshotCacheStats()
+        self._snapshot_cache = None
+        self._snapshot_taken_at = 0.0
+        self._snapshot_pins = 0
+        # find simple XPaths with the faster native locator strategies of UiAutomator2, see locator()
+        self.use_native_locators = True
+        # search elements out of view by scrolling on the device, see swipe_to_find_element()
+        self.use_native_scrolling = True
+        # click stable controls by tapping their cached coordinates, see click()
+        self.use_bounds_cache = True
+        self.bounds_cache = BoundsCache()
+        # run chains of clicks on the Appium server in a single request, see click_chain()
+        self.use_driver_scripts = True
+        # the id of the current state of the app, set by the StateGraph using this driver
+        self.ui_state = None
+        # data of shared objects, such as states, that is specific to this device
+        self.context = ContextStore()
+        # key events, taps and swipes are sent through Appium, unless use_adb_input() is called
+        self.input: InputBackend = AppiumInputBackend(self.driver)
+        self._adb_shell = None
+        # the text entry strategies send_keys tries, in order, see text_entry.TEXT_ENTRY_STRATEGIES
+        self.text_entry_strategies = ['send_keys']
+        # whether send_keys reads the text back after entering it, see send_keys
+        self.verify_text_entry = False
+        self.text_entry_stats: dict[str, TextEntryStats] = {}
         self.gtl_logger = create_gtl_logger(udid)
 
+    @property
+    def driver(self) -> WebDriver:
+        """
+        The Appium driver of the session of this PumaDriver. The driver changes when the session is re-created, see
+        ensure_session().
+        """
+        if self._session is None:
+            raise ConnectionError(f'{self} is closed')
+        return self._session.driver
+
+    @property
+    def scheduler(self) -> CommandScheduler:
+        """
+        The command scheduler of the Appium session of this PumaDriver. All commands of the session go through it, the
+        commands of this PumaDriver as foreground commands. Background tasks sharing the session, such as location
+        updates, should submit their commands to it, see CommandScheduler.submit().
+        """
+        return command_scheduler(self.driver, self.udid)
+
+    def ensure_session(self, force: bool = False):
+        """
+        Checks that the Appium session is still alive, and transparently re-creates it when it is not. The check is
+        done at most once per health check interval of the session registry, unless forced.
+
+        :param force: Optional. Check even if the session was checked recently.
+        :raises AppiumConnectionError: If the session had to be re-created, but that failed.
+        """
+        self._session_registry.ensure_healthy(self._session, force)
+        if self._session.driver is not self._connected_driver:
+            self._on_new_session()
+
+    def _on_new_session(self):
+        logger.info(f'Using new Appium session for device {self.udid}')
+        self._connected_driver = self._session.driver
+        self._server_implicit_wait = None
+        self._set_server_implicit_wait(0)
+        if isinstance(self.input, AppiumInputBackend):
+            self.input = AppiumInputBackend(self.driver)
+        self.use_driver_scripts = True
+        self.bounds_cache.clear()
+        self.invalidate_snapshot()
+
     def is_present(self, xpath: str, implicit_wait: float = 0) -> bool:
         """
         Checks if an element is present on the screen.
+        Checks without a wait are evaluated against the cached UI snapshot, see snapshot(). The snapshot is discarded
+        whenever WebElements are handed out, as the caller can change the UI through them. A snapshot taken after that,
+        but before such an element is used, is still reused until it expires (see snapshot_max_age); call
+        invalidate_snapshot() after using a WebElement in that case.
 
         :param xpath: The XPath of the element to check.
         :param implicit_wait: The time to wait for the element to be present.
         :return: True if the element is present, False otherwise.
         """
-        self.driver.implicitly_wait(implicit_wait)
-        found = self.driver.find_elements(by=AppiumBy.XPATH, value=xpath)
-        self.driver.implicitly_wait(self.implicit_wait)
-        return len(found) > 0
+        if implicit_wait == 0:
+            return self.snapshot().is_present(xpath)
+        return self._is_present_on_device(xpath, implicit_wait)
+
+    def _is_present_on_device(self, xpath: str, implicit_wait: float = 0) -> bool:
+        return len(self._wait_for_elements(xpath, implicit_wait)) > 0
+
+    def _set_server_implicit_wait(self, seconds: float):
+        if self._server_implicit_wait != seconds:
+            self.driver.implicitly_wait(seconds)
+            self._server_implicit_wait = seconds
+
+    def _wait_for_elements(self, xpath: str, timeout: float) -> list[WebElement]:
+        """
+        Finds the elements matching an XPath on the device, polling until at least one element is found or the timeout
+        expires. Polling is done here instead of on the Appium server, so the implicit wait of the session never has to
+        be changed.
+
+        :param xpath: The XPath of the elements to find.
+        :param timeout: The maximum time to wait for the elements in seconds.
+        :return: The found elements, or an empty list if none were found in time.
+        """
+        self._set_server_implicit_wait(0)
+        found = []
+
+        def any_found() -> bool:
+            nonlocal found
+            found = self._find_elements(xpath)
+            return len(found) > 0
+
+        poll(any_found, timeout)
+        return found
+
+    def locator(self, xpath: str) -> Locator:
+        """
+        Returns the locator used to find the elements selected by an XPath on the device. Simple XPaths on resource id,
+        content description and text are translated to a native UiAutomator2 strategy, see to_locator(), unless
+        use_native_locators is False.
+
+        :param xpath: The XPath of the elements to find.
+        :return: The locator for the XPath.
+        """
+        return to_locator(xpath) if self.use_native_locators else Locator(AppiumBy.XPATH, xpath)
+
+    def _find_elements(self, xpath: str) -> list[WebElement]:
+        locator = self.locator(xpath)
+        return self.driver.find_elements(by=locator.by, value=locator.value)
+
+    def present_many(self, xpaths: Iterable[str]) -> dict[str, bool]:
+        """
+        Checks for a number of XPaths which of them are present on the screen, in a single round trip.
+        All XPaths are evaluated against one UI snapshot. XPaths that cannot be evaluated locally are combined into one
+        union query on the device, so these cost at most one extra round trip when none of them are present.
+
+        :param xpaths: The XPaths of the elements to check.
+        :return: A dict from each XPath to True if the element is present, False otherwise.
+        """
+        snapshot = self.snapshot()
+        presence = {}
+        unsupported = []
+        for xpath in xpaths:
+            if xpath in presence or xpath in unsupported:
+                continue
+            try:
+                presence[xpath] = len(snapshot.find_all(xpath)) > 0
+            except UnsupportedXPathError:
+                unsupported.append(xpath)
+        if len(unsupported) > 1 and not self._is_present_on_device(' | '.join(f'({xpath})' for xpath in unsupported)):
+            presence.update({xpath: False for xpath in unsupported})
+        else:
+            presence.update({xpath: self._is_present_on_device(xpath) for xpath in unsupported})
+        return presence
+
+    def first_present(self, xpaths: list[str], timeout: float = 0,
+                      poll_strategy: PollStrategy = EXPONENTIAL_BACKOFF) -> str | None:
+        """
+        Returns the first of the given XPaths that is present on the screen, checking all XPaths in one round trip.
+        Until the timeout expires, the screen is checked again as described in wait_until.
+
+        :param xpaths: The XPaths of the elements to check, in order of preference.
+        :param timeout: Optional. The time in seconds to wait for any of the elements to be present. Defaults to 0.
+        :param poll_strategy: Optional. Determines the time between checks. Defaults to exponential backoff.
+        :return: The first XPath of which the element is present, or None if none of them are present in time.
+        """
+        present = None
+
+        def any_present() -> bool:
+            nonlocal present
+            presence = self.present_many(xpaths)
+            present = next((xpath for xpath in xpaths if presence[xpath]), None)
+            return present is not None
+
+        self.wait_until(any_present, timeout, poll_strategy)
+        return present
+
+    def wait_until(self, condition: str | Callable[[], bool], timeout: float = DEFAULT_WAIT_TIMEOUT,
+                   poll_strategy: PollStrategy = EXPONENTIAL_BACKOFF) -> bool:
+        """
+        Waits until a condition is true, instead of sleeping for a fixed time. The condition is checked immediately, and
+        then again with increasing intervals (see PollStrategy) until it is true or the timeout expires.
+        The cached UI snapshot is discarded before every retry, so conditions using is_present see the current UI.
+
+        :param condition: The XPath of an element to wait for, or a function returning True once done waiting.
+        :param timeout: Optional. The maximum time to wait in seconds. Defaults to 5 seconds.
+        :param poll_strategy: Optional. Determines the time between checks. Defaults to exponential backoff.
+        :return: True if the condition became true, False if the timeout expired.
+        """
+        if isinstance(condition, str):
+            xpath = condition
+            condition = lambda: self.is_present(xpath)
+        return poll(condition, timeout, poll_strategy, before_retry=self.invalidate_snapshot)
+
+    def wait_until_stable(self, timeout: float = DEFAULT_WAIT_TIMEOUT,
+                          poll_strategy: PollStrategy = EXPONENTIAL_BACKOFF) -> bool:
+        """
+        Waits until the screen is stable: until two consecutive page sources are the same, meaning animations such as
+        scrolling or opening a menu have finished. The last snapshot stays cached, so checks right after this wait do
+        not need another round trip.
+
+        :param timeout: Optional. The maximum time to wait in seconds. Defaults to 5 seconds.
+        :param poll_strategy: Optional. Determines the time between checks. Defaults to exponential backoff.
+        :return: True if the screen became stable, False if the timeout expired.
+        """
+        self.invalidate_snapshot()
+        previous = self.snapshot().page_source
+
+        def unchanged() -> bool:
+            nonlocal previous
+            self.invalidate_snapshot()
+            current = self.snapshot().page_source
+            stable, previous = current == previous, current
+            return stable
+
+        return poll(unchanged, timeout, poll_strategy)
+
+    def snapshot(self) -> UiSnapshot:
+        """
+        Returns a snapshot of the current UI hierarchy. The page source is requested once, after which any number of
+        XPaths can be evaluated locally. XPaths that cannot be evaluated locally are checked on the device instead.
+
+        Snapshots are cached until a PumaDriver method changes the UI, or until the snapshot is older than
+        snapshot_max_age seconds. Hits and misses are counted in snapshot_cache_stats.
+        If the UI is changed without using the PumaDriver methods, call invalidate_snapshot().
+
+        :return: A snapshot of the current UI.
+        """
+        if self._has_fresh_snapshot():
+            self.snapshot_cache_stats.hits += 1
+            return self._snapshot_cache
+        self.snapshot_cache_stats.misses += 1
+        self._snapshot_cache = UiSnapshot(self.driver.page_source, fallback=self._is_present_on_device)
+        self._snapshot_taken_at = time.monotonic()
+        return self._snapshot_cache
+
+    def use_adb_input(self, enabled: bool = True):
+        """
+        Sends key events, taps and swipes over a persistent adb shell instead of through the Appium server. This skips
+        the Appium server for input that does not need a response. Within input_batch(), consecutive events are sent
+        to the device at once.
+
+        :param enabled: Optional. False to switch back to sending input through Appium.
+        """
+        self.input.close()
+        self.input = AdbInputBackend(self.udid, shell=self.adb_shell) if enabled else AppiumInputBackend(self.driver)
+
+    @property
+    def adb_shell(self) -> AdbShell:
+        """
+        A persistent adb shell on the device, which is opened on first use.
+        """
+        if self._adb_shell is None:
+            self._adb_shell = AdbShell(self.udid)
+        return self._adb_shell
+
+    @contextmanager
+    def input_batch(self):
+        """
+        Context manager in which the key events, taps and swipes may be sent to the device at once, when they are not
+        sent through Appium (see use_adb_input()). All events are executed when the context manager exits.
+        Do not read the UI within the batch, as the events might not have been executed yet.
+        """
+        try:
+            with self.input.batch():
+                yield
+        finally:
+            self.invalidate_snapshot()
+
+    def _has_fresh_snapshot(self) -> bool:
+        return self._snapshot_cache is not None and (
+                self._snapshot_pins > 0 or time.monotonic() - self._snapshot_taken_at <= self.snapshot_max_age)
+
+    def invalidate_snapshot(self):
+        """
+        Discards the cached UI snapshot, so the next read requests the page source again.
+        """
+        if self._snapshot_cache is not None:
+            self._snapshot_cache = None
+            self.snapshot_cache_stats.invalidations += 1
+
+    def copy_stats(self) -> tuple[SnapshotCacheStats, TapCacheStats, dict[str, TextEntryStats]]:
+        """
+        Copies the snapshot cache, element bounds cache and text entry statistics of this driver, see stats_since().
+
+        :return: The copied statistics.
+        """
+        return (copy.copy(self.snapshot_cache_stats), copy.copy(self.bounds_cache.stats),
+                {name: copy.copy(stats) for name, stats in self.text_entry_stats.items()})
+
+    def stats_since(self, stats: tuple[SnapshotCacheStats, TapCacheStats, dict[str, TextEntryStats]]) -> str:
+        """
+        Describes the statistics gathered since they were copied, for example to log the statistics of a single action.
 
+        :param stats: Statistics copied earlier with copy_stats().
+        :return: A description of the statistics gathered since the copy.
+        """
+        snapshot_stats, bounds_stats, text_entry_stats = stats
+        text_entry = {name: entry_stats - text_entry_stats.get(name, TextEntryStats())
+                      for name, entry_stats in self.text_entry_stats.items()}
+        text_entry = ', '.join(f'{name}: {entry_stats}' for name, entry_stats in text_entry.items()
+                               if entry_stats.entries or entry_stats.failures)
+        return (f'UI snapshot cache {self.snapshot_cache_stats - snapshot_stats}; '
+                f'element bounds cache {self.bounds_cache.stats - bounds_stats}; '
+                f'text entry {text_entry or "unused"}')
+
+    @contextmanager
+    def snapshot_mode(self):
+        """
+        Context manager in which the cached UI snapshot does not expire with age, so all presence checks without a wait
+        are evaluated against the same snapshot. UI actions still invalidate the snapshot.
+
+        :return: The snapshot at the start of this snapshot mode.
+        """
+        self._snapshot_pins += 1
+        try:
+            yield self.snapshot()
+        finally:
+            self._snapshot_pins -= 1
+
+    @_invalidates_snapshot
     def activate_app(self):
         """
         Activates the application on the device.
@@ -130,6 +507,7 @@ class PumaDriver:
         self.gtl_logger.info(f'Activating app {self.app_package}')
         self.driver.activate_app(self.app_package)
 
+    @_invalidates_snapshot
     def terminate_app(self):
         """
         Terminates the application on the device.
@@ -152,20 +530,23 @@ class PumaDriver:
         """
         return str(self.driver.current_package) == self.app_package
 
+    @_invalidates_snapshot
     def back(self):
         """
         Simulates pressing the back button on the device.
         """
         self.gtl_logger.info(f'Pressing back button')
-        self.driver.press_keycode(AndroidKey.BACK)
+        self.input.key_event(AndroidKey.BACK)
 
+    @_invalidates_snapshot
     def home(self):
         """
         Simulates pressing the home button on the device.
         """
         self.gtl_logger.info(f'Pressing home button')
-        self.driver.press_keycode(AndroidKey.HOME)
+        self.input.key_event(AndroidKey.HOME)
 
+    @_invalidates_snapshot
     def click(self, xpath: str, width_ratio:float=0.5, height_ratio:float=0.5):
         """
         Clicks on an element specified by its XPath.
@@ -176,24 +557,127 @@ class PumaDriver:
         corresponds to the top-left and (1,1) corresponds to the bottom right.
         The width_ratio determines the x coordinate, the height_ratio the y coordinate.
 
+        The bounds of clicked elements are cached per app, state and XPath. When the element is clicked again while a
+        fresh UI snapshot is cached, e.g. after the state was validated, its cached bounds are compared to the bounds in
+        that snapshot, and if they are the same the cached coordinates are tapped without looking up the element on the
+        device. Without a fresh snapshot the element is looked up, as taking a snapshot would cost more than the
+        lookup. How often the cached coordinates are tapped is counted in bounds_cache.stats.
+
         :param xpath: The XPath of the element to click.
         :param width_ratio: Optional. Determines the x coordinate, relative within the element, from 0 to 1 (left to right).
         :param height_ratio: Optional. Determines the y coordinate, relative within the element, from 0 to 1 (top to bottom).
         :raises PumaClickException: If the element cannot be clicked after multiple attempts.
         """
+        if self.use_bounds_cache and self._tap_cached_bounds(xpath, width_ratio, height_ratio):
+            return
         for attempt in range(3):
-            if self.is_present(xpath, self.implicit_wait):
+            found = self._wait_for_elements(xpath, self.implicit_wait)
+            if found:
+                element = found[0]
+                # caching the bounds is free when the current snapshot is still valid
+                if self.use_bounds_cache and self._has_fresh_snapshot():
+                    self._cache_bounds(self._snapshot_cache, xpath)
                 if (width_ratio, height_ratio) == (0.5, 0.5):
-                    self.driver.find_element(by=AppiumBy.XPATH, value=xpath).click()
+                    element.click()
                 else:
-                    element = self.get_element(xpath)
-                    top_left = element.location['x'], element.location['y']
-                    size = element.size['height'], element.size['width']
-                    location = int(top_left[0] + width_ratio * size[1]), int(top_left[1] + height_ratio * size[0])
-                    self.tap(location)
+                    self.tap(Bounds.from_rect(element.rect).point(width_ratio, height_ratio))
                 return
         raise PumaClickException(f'Could not click on non present element with xpath {xpath}')
 
+    @_invalidates_snapshot
+    def click_chain(self, xpaths: list[str]):
+        """
+        Clicks on a series of elements, waiting for each element to appear before clicking it.
+
+        The whole chain is compiled into one script that is executed by the Appium server, so it takes a single request
+        instead of several requests per click. This requires the execute driver feature of Appium, see
+        https://appium.io/docs/en/latest/guides/execute-driver/. If the Appium server does not support it, the elements
+        are clicked one by one with click() and use_driver_scripts is disabled for the rest of the session. Any other
+        failure of the script raises, as some elements may have been clicked already.
+
+        :param xpaths: The XPaths of the elements to click, in order.
+        :raises PumaClickException: If one of the elements cannot be clicked. The message names the failing XPath.
+        """
+        if len(xpaths) > 1 and self.use_driver_scripts:
+            result = self._run_click_chain_script(xpaths)
+            if result is not None:
+                if result.failed_step is not None:
+                    xpath = xpaths[result.failed_step]
+                    raise PumaClickException(f'Could not click on element {result.failed_step + 1} of {len(xpaths)} '
+                                             f'with xpath {xpath}: {result.error}')
+                return
+        for xpath in xpaths:
+            self.click(xpath)
+
+    def _run_click_chain_script(self, xpaths: list[str]) -> ClickChainResult | None:
+        # each element gets as much time to appear as click() gives it
+        timeout = self.implicit_wait * 3
+        script = compile_click_chain([self.locator(xpath) for xpath in xpaths], timeout)
+        try:
+            response = self.driver.execute_driver(script, timeout_ms=int((timeout * len(xpaths) + 10) * 1000))
+            return ClickChainResult.parse(response.result)
+        except WebDriverException as e:
+            if not _is_unsupported_command(e):
+                self._raise_click_chain_error(xpaths, e)
+            # the server refused the script, so nothing was clicked yet
+            logger.warning(f'Could not run click chain on the Appium server, falling back to separate clicks. '
+                           f'Start Appium with the execute-driver plugin to use click chains: {e}')
+            self.use_driver_scripts = False
+            return None
+        except ValueError as e:
+            self._raise_click_chain_error(xpaths, e)
+
+    def _raise_click_chain_error(self, xpaths: list[str], error: Exception):
+        """
+        Raises a PumaClickException for a click chain script that failed after it started, e.g. because it timed out.
+        Some elements may have been clicked already, so the chain is not clicked again. The failed step is estimated as
+        the last element of the chain that is on the screen now.
+        """
+        self.invalidate_snapshot()
+        present = [step for step, xpath in enumerate(xpaths) if self.is_present(xpath)]
+        if not present:
+            raise PumaClickException(f'Could not click on the chain of {len(xpaths)} elements, the Appium server failed '
+                                     f'at an unknown element: {error}') from error
+        step = present[-1]
+        raise PumaClickException(f'Could not click on element {step + 1} of {len(xpaths)} with xpath {xpaths[step]}: '
+                                 f'{error}') from error
+
+    def _bounds_key(self, xpath: str) -> tuple[str, str | None, str]:
+        return self.app_package, self.ui_state, xpath
+
+    def _cache_bounds(self, snapshot: UiSnapshot, xpath: str):
+        bounds = self._snapshot_bounds(snapshot, xpath)
+        if bounds is not None:
+            self.bounds_cache.update_screen(snapshot.screen)
+            self.bounds_cache.put(self._bounds_key(xpath), bounds)
+
+    @staticmethod
+    def _snapshot_bounds(snapshot: UiSnapshot, xpath: str) -> Bounds | None:
+        try:
+            nodes = snapshot.find_all(xpath)
+        except UnsupportedXPathError:
+            return None
+        return Bounds.parse(nodes[0].get('bounds')) if nodes else None
+
+    def _tap_cached_bounds(self, xpath: str, width_ratio: float, height_ratio: float) -> bool:
+        key = self._bounds_key(xpath)
+        cached = self.bounds_cache.get(key)
+        if cached is None or not self._has_fresh_snapshot():
+            self.bounds_cache.stats.misses += 1
+            return False
+        snapshot = self._snapshot_cache
+        # rotating the device or resizing the window invalidates all cached bounds
+        self.bounds_cache.update_screen(snapshot.screen)
+        if self.bounds_cache.get(key) is None or self._snapshot_bounds(snapshot, xpath) != cached:
+            self.bounds_cache.discard(key)
+            self.bounds_cache.stats.stale += 1
+            self.bounds_cache.stats.misses += 1
+            return False
+        self.bounds_cache.stats.hits += 1
+        self.tap(cached.point(width_ratio, height_ratio))
+        return True
+
+    @_invalidates_snapshot
     def tap(self, coords: tuple[int, int], duration: int = None):
         """
         Taps on the screen at the specified coordinates.
@@ -201,8 +685,9 @@ class PumaDriver:
         :param coords: A tuple (x, y) representing the coordinates to tap.
         """
         self.gtl_logger.info(f'Tapping on coordinates {coords}')
-        self.driver.tap([coords], duration=duration)
+        self.input.tap(coords, duration=duration)
 
+    @_invalidates_snapshot
     def long_click_element(self, xpath: str, duration: int = 2, width_ratio:float=0.5, height_ratio:float=0.5):
         """
         Clicks on a certain element, and hold for a given duration (in seconds)
@@ -216,12 +701,10 @@ class PumaDriver:
             actions = ActionChains(self.driver)
             actions.move_to_element(element).click_and_hold().pause(duration).release().perform()
         else:
-            element = self.get_element(xpath)
-            top_left = element.location['x'], element.location['y']
-            size = element.size['height'], element.size['width']
-            location = int(top_left[0] + width_ratio * size[1]), int(top_left[1] + height_ratio * size[0])
-            self.tap(location, duration=duration)
+            self.tap(Bounds.from_rect(element.rect).point(width_ratio, height_ratio), duration=duration)
 
+    @_invalidates_snapshot
+    @_invalidates_snapshot
     def get_element(self, xpath: str):
         """
         Retrieves an element specified by its XPath.
@@ -231,10 +714,12 @@ class PumaDriver:
         :raises PumaClickException: If the element cannot be found after multiple attempts.
         """
         for attempt in range(3):
-            if self.is_present(xpath, self.implicit_wait):
-                return self.driver.find_element(by=AppiumBy.XPATH, value=xpath)
+            found = self._wait_for_elements(xpath, self.implicit_wait)
+            if found:
+                return found[0]
         raise PumaClickException(f'Could not find element with xpath {xpath}')
 
+    @_invalidates_snapshot
     def get_elements(self, xpath: str) -> list[WebElement]:
         """
         Retrieves all elements matching the specified XPath.
@@ -244,42 +729,81 @@ class PumaDriver:
         :raises PumaClickException: If no elements can be found after multiple attempts.
         """
         for attempt in range(3):
-            if self.is_present(xpath, self.implicit_wait):
-                return self.driver.find_elements(by=AppiumBy.XPATH, value=xpath)
+            found = self._wait_for_elements(xpath, self.implicit_wait)
+            if found:
+                return found
         raise PumaClickException(f'Could not find elements with xpath {xpath}')
 
+    def extract(self, xpath: str, attributes: list[str] = None, timeout: float = 0) -> list[ElementRecord]:
+        """
+        Reads attributes of all elements matching an XPath from a single UI snapshot, instead of requesting each
+        attribute of each element from the device. Use this instead of get_elements() when processing lists.
+        XPaths that cannot be evaluated locally are looked up on the device, reading the attributes per element.
+
+        :param xpath: The XPath of the elements.
+        :param attributes: Optional. The page source attributes to extract, see element_record.RECORD_ATTRIBUTES.
+        By default all of them are extracted.
+        :param timeout: Optional. The maximum time in seconds to wait for at least one element to be present.
+        :return: A record per matching element, in document order. An empty list if no element matched in time.
+        :raises ValueError: If an attribute cannot be extracted.
+        """
+        attributes = validate_attributes(attributes)
+        if timeout > 0:
+            self.wait_until(xpath, timeout=timeout)
+        try:
+            return [ElementRecord.from_node(node, attributes) for node in self.snapshot().find_all(xpath)]
+        except UnsupportedXPathError:
+            return [ElementRecord.from_attributes(element.get_attribute, attributes)
+                    for element in self._find_elements(xpath)]
+
     def _scroll_down(self):
         """
-        Moves/scrolls down a screen by simulating a 'swipe up' gesture.
+        Moves/scrolls down a screen by simulating a 'swipe up' gesture, and waits until scrolling has finished.
         """
-        window_size = self.driver.get_window_size()
-        start_x = window_size['width'] / 2
-        start_y = window_size['height'] * 0.8
-        end_y = window_size['height'] * 0.2
-        self.driver.swipe(start_x, start_y, start_x, end_y, 500)
-        time.sleep(0.5)
+        self._swipe_vertically(0.8, 0.2)
+        self.wait_until_stable(timeout=1)
 
     def _scroll_up(self):
         """
-        Moves/scrolls up a screen by simulating a 'swipe down' gesture.
+        Moves/scrolls up a screen by simulating a 'swipe down' gesture, and waits until scrolling has finished.
         """
+        self._swipe_vertically(0.2, 0.8)
+        self.wait_until_stable(timeout=1)
+
+    @_invalidates_snapshot
+    def _swipe_vertically(self, start_height_ratio: float, end_height_ratio: float):
         window_size = self.driver.get_window_size()
         start_x = window_size['width'] / 2
-        start_y = window_size['height'] * 0.2
-        end_y = window_size['height'] * 0.8
-        self.driver.swipe(start_x, start_y, start_x, end_y, 500)
-        time.sleep(0.5)
+        start_y = window_size['height'] * start_height_ratio
+        end_y = window_size['height'] * end_height_ratio
+        self.input.swipe((start_x, start_y), (start_x, end_y), 500)
 
+    @_invalidates_snapshot
     def swipe_to_find_element(self, xpath: str, max_swipes: int = 10, swipe_down: bool = True):
         """
         Swipes up or down to find an element specified by its XPath. This is necessary when the element you want to click on
         is out of view.
 
+        When swiping down, simple XPaths (see locator.to_locator) are searched for by UiAutomator2 itself with a
+        UiScrollable, which takes a single request, unless use_native_scrolling is False. When the element is not found
+        that way, for example because the list is not the first scrollable container on the screen, or for any other
+        XPath, swiping is done by PumaDriver. A UiScrollable that did not find the element leaves the list scrolled to
+        its end, so in that case PumaDriver swipes back up instead.
+
         :param xpath: The XPath of the element to find.
         :param max_swipes: The maximum number of swipe attempts to find the element.
         :param swipe_down: If the element can be found below, True, otherwise False.
+        :return: The found element.
         :raises PumaClickException: If the element cannot be found after the maximum number of swipes.
         """
+        if swipe_down and self.use_native_scrolling and not self.is_present(xpath):
+            page_source = self.snapshot().page_source
+            found = self._scroll_into_view(xpath, max_swipes)
+            if found:
+                return found[0]
+            if self.snapshot().page_source != page_source:
+                # the UiScrollable scrolled to the end of the list, so anything still to be found is above
+                swipe_down = False
         for attempt in range(max_swipes):
             if self.is_present(xpath):
                 return self.get_element(xpath)
@@ -291,6 +815,96 @@ class PumaDriver:
                     self._scroll_up()
         raise PumaClickException(f'After {max_swipes} swipes, cannot find element with xpath {xpath}')
 
+    def _scroll_into_view(self, xpath: str, max_swipes: int) -> list[WebElement]:
+        locator = to_scroll_into_view_locator(xpath, max_swipes)
+        if locator is None:
+            return []
+        self._set_server_implicit_wait(0)
+        try:
+            found = self.driver.find_elements(by=locator.by, value=locator.value)
+        except WebDriverException as e:
+            logger.warning(f'Could not scroll to element with xpath {xpath} on the device: {e}')
+            return []
+        finally:
+            self.invalidate_snapshot()
+        if not found:
+            self.gtl_logger.warning(f'Element with xpath {xpath} not found by scrolling on the device, swiping')
+        return found
+
+    def scroll_collect(self, xpath: str, max_swipes: int = 10, attributes: list[str] = None,
+                       stop_when: Callable[[ElementRecord], bool] = None,
+                       key: Callable[[ElementRecord], Hashable] = record_key) -> Iterator[ElementRecord]:
+        """
+        Scrolls down through a list, and yields the records of the elements matching an XPath as they appear, see
+        extract(). Elements that were already on the previous screen are not yielded again. Only the keys of the
+        previous screen are kept, so memory use does not grow with the length of the list.
+
+        Elements are recognized on consecutive screens by their key and their position in the scrolled content, which
+        is derived from their bounds and the distance the list scrolled. That way identical elements at different
+        positions in the list, such as two contacts with the same name, are all yielded. The bounds are always
+        extracted for this.
+
+        Scrolling stops at the end of the list, i.e. as soon as the screen did not change after a swipe, after
+        max_swipes swipes, or when stop_when returns True for a yielded record.
+
+        :param xpath: The XPath of the elements to collect.
+        :param max_swipes: Optional. The maximum number of swipes.
+        :param attributes: Optional. The attributes to extract, by default all attributes.
+        :param stop_when: Optional. Called with each yielded record, scrolling stops after a record for which it
+        returns True.
+        :param key: Optional. Recognizes an element on consecutive screens, by default on its resource id, text and
+        content description.
+        :return: An iterator over the records of the elements, in the order they appear.
+        """
+        attributes = validate_attributes(attributes)
+        if 'bounds' not in attributes:
+            attributes = [*attributes, 'bounds']
+        previous_keys = set()
+        previous_positions: dict[Hashable, list[int]] = {}
+        previous_page_source = None
+        offset = 0
+        for swipe in range(max_swipes + 1):
+            snapshot = self.snapshot()
+            if snapshot.page_source == previous_page_source:
+                logger.info(f'Reached the end of the list after {swipe - 1} swipes')
+                return
+            records = self.extract(xpath, attributes)
+            keys = [key(record) for record in records]
+            offset = scroll_offset(previous_positions, keys, records, offset)
+            current_keys = set()
+            current_positions: dict[Hashable, list[int]] = {}
+            for record, element_key in zip(records, keys):
+                position = content_position(record, offset)
+                if position is not None:
+                    current_positions.setdefault(element_key, []).append(position[1])
+                current_keys.add((element_key, position))
+                if (element_key, position) in previous_keys:
+                    continue
+                yield record
+                if stop_when is not None and stop_when(record):
+                    return
+            previous_keys, previous_positions = current_keys, current_positions
+            previous_page_source = snapshot.page_source
+            if swipe < max_swipes:
+                self._scroll_down()
+
+    def swipe_to_find_records(self, xpath: str, num_swipes: int = 10, attributes: list[str] = None) -> list[ElementRecord]:
+        """
+        Collects the records of all elements matching given XPath, swiping down until the end of the list, or at most a
+        number of times, see scroll_collect(). Use this instead of swipe_to_find_elements() when only the attributes of
+        the elements are needed, as it reads them from UI snapshots, see extract().
+
+        :param xpath: the xpath of the elements to find
+        :param num_swipes: the maximum number of swipes to execute
+        :param attributes: Optional. The attributes to extract, by default all attributes.
+        :return: the records of the found elements
+        :raises PumaClickException: if no matching element can be found after given number of swipes
+        """
+        results = list(self.scroll_collect(xpath, num_swipes, attributes))
+        if not results:
+            raise PumaClickException(f'After {num_swipes} swipes, no element with xpath {xpath} found')
+        return results
+
     def swipe_to_find_elements(self, xpath: str, num_swipes: int = 10):
         """
         Collects all elements matching given XPath. Next, swipes down a number of times and collects
@@ -322,6 +936,7 @@ class PumaDriver:
 
         return results
 
+    @_invalidates_snapshot
     def swipe_to_click_element(self, xpath: str, max_swipes: int = 10):
         """
         Swipes down to find and click an element specified by its XPath. This is necessary when the element you want to
@@ -333,46 +948,97 @@ class PumaDriver:
         """
         self.swipe_to_find_element(xpath, max_swipes).click()
 
-    def send_keys(self, xpath: str, text: str):
+    @_invalidates_snapshot
+    def send_keys(self, xpath: str, text: str, strategies: list[str] = None, verify: bool = None):
         """
-        Sends keys to an element specified by its XPath.
+        Sends keys to an element specified by its XPath, replacing its current text.
+
+        The text is entered with the first text entry strategy that works (see text_entry.TEXT_ENTRY_STRATEGIES): if a
+        strategy cannot be used, the next strategy is tried. With verification, the text of the element is read back
+        after entering it, and the next strategy is also tried when it does not match. Verification costs a request
+        per strategy, and only suits text boxes that show the text exactly as entered: not, for example, an address bar
+        with autocompletion, or a field that formats or masks its text. The speed of each strategy is measured in
+        text_entry_stats.
 
         :param xpath: The XPath of the element to send keys to.
         :param text: The text to send to the element.
+        :param strategies: Optional. The names of the strategies to try, in order. Defaults to text_entry_strategies.
+        :param verify: Optional. Whether to verify the entered text. Defaults to verify_text_entry, which is False.
+        :raises PumaClickException: If none of the strategies could be used, or, when verifying, if the text box does
+        not contain the text after all strategies were tried.
         """
+        strategies = strategies or self.text_entry_strategies
+        verify = self.verify_text_entry if verify is None else verify
+        unknown = [name for name in strategies if name not in TEXT_ENTRY_STRATEGIES]
+        if unknown:
+            raise ValueError(f'Unknown text entry strategies {unknown}, choose from {list(TEXT_ENTRY_STRATEGIES)}')
         self.gtl_logger.info(f'Entering text "{text}" in text box')
         element = self.get_element(xpath)
         element.click() # TODO check all usages
-        time.sleep(0.5)
+        self.wait_until(self.driver.is_keyboard_shown, timeout=0.5)
         # The element has changed after clicking due to the keyboard appearing, so find it again.
         element = self.get_element(xpath)
-        element.clear()
-        element.send_keys(text)
+        error = None
+        mismatch = None
+        for name in strategies:
+            stats = self.text_entry_stats.setdefault(name, TextEntryStats())
+            start = time.perf_counter()
+            try:
+                TEXT_ENTRY_STRATEGIES[name](self, element, text)
+                entered_text = self._element_text(xpath, element) if verify else text
+            except (TextEntryUnavailableError, WebDriverException, OSError) as e:
+                logger.warning(f'Could not enter text with strategy {name}: {e}')
+                stats.failures += 1
+                error = e
+                continue
+            if entered_text == text:
+                stats.entries += 1
+                stats.characters += len(text)
+                stats.duration += time.perf_counter() - start
+                return
+            logger.warning(f'Text entered with strategy {name} does not match, the text box contains "{entered_text}"')
+            stats.failures += 1
+            mismatch = entered_text
+        if mismatch is None:
+            raise PumaClickException(f'Could not enter text in element with xpath {xpath}: {error}') from error
+        raise PumaClickException(f'Could not enter text in element with xpath {xpath}: the text box contains '
+                                 f'"{mismatch}" instead of "{text}"')
+
+    def _element_text(self, xpath: str, element: WebElement) -> str:
+        try:
+            return element.text
+        except StaleElementReferenceException:
+            return self.get_element(xpath).text
 
+    @_invalidates_snapshot
     def press_enter(self):
         """
         Presses the ENTER key.
         """
-        self.driver.press_keycode(KEYCODE_ENTER)
+        self.input.key_event(KEYCODE_ENTER)
 
+    @_invalidates_snapshot
     def press_backspace(self):
         """
         Presses the BACKSPACE key.
         """
-        self.driver.press_keycode(KEYCODE_BACKSPACE)
+        self.input.key_event(KEYCODE_BACKSPACE)
 
+    @_invalidates_snapshot
     def press_left_arrow(self):
         """
         Presses the LEFT ARROW key.
         """
-        self.driver.press_keycode(KEYCODE_LEFT_ARROW)
+        self.input.key_event(KEYCODE_LEFT_ARROW)
 
+    @_invalidates_snapshot
     def open_url(self, url: str):
         """
         Opens a given URL. The URl will open in the default app configured for that URL.
         """
         self.adb.open_intent(url)
 
+    @_invalidates_snapshot
     def open_notifications(self):
         """
         Opens the Android notifications panel.
@@ -420,6 +1086,7 @@ class PumaDriver:
             if screenshot_taken:
                 os.remove(path)
 
+    @_invalidates_snapshot
     def click_text_ocr(self, text_to_click: str, click_first_when_multiple: bool = False):
         """
         Clicks a text if it can be found on a screen using OCR.
@@ -456,6 +1123,7 @@ class PumaDriver:
         settings.update({"waitForIdleTimeout": timeout})
         self.driver.update_settings(settings)
 
+    @_invalidates_snapshot
     def execute_script(self, script: str):
         self.driver.execute_script(script)
 
@@ -470,7 +1138,20 @@ class PumaDriver:
     def __enter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def close(self):
+        """
+        Stops any screen recording and releases the Appium session. The session stays open for other PumaDrivers on the
+        same device, and is closed by the session registry once it is no longer used.
+        """
+        if self._session is None:
+            return
         if self._screen_recorder is not None:
             self.stop_recording_and_save_video()
-        self.driver.__exit__(exc_type, exc_val, exc_tb)
\ No newline at end of file
+        self.input.close()
+        if self._adb_shell is not None:
+            self._adb_shell.close()
+        self._session_registry.release(self._session)
+        self._session = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import heapq
+from collections import deque
+from itertools import count
+from typing import Iterator, Callable
+
+from puma.state_graph.state import State, Transition
+
+
+def _state_id(state: State | str) -> str:
+    return state if isinstance(state, str) else state.id
+
+
+class RoutingTable:
+    """
+    All-pairs next-hop routing table of a state graph.
+
+    The table is computed once per graph class, after which finding the next transition towards a state is a single
+    dictionary lookup, instead of a breadth-first search on every navigation step.
+    States are referred to by their id, but State objects can be passed as well.
+    """
+
+    def __init__(self, states: list[State], cost: Callable[[Transition], float] = None):
+        """
+        Computes the routing table for the given states.
+        Without a cost function, a breadth-first search is done from every state. The routes are the shortest paths,
+        and in case of a tie the paths using the transitions that were defined first.
+        With a cost function, Dijkstra's algorithm is used to find the cheapest paths instead. Ties are broken in the
+        same way, so equal costs for all transitions give the same routes as the breadth-first search.
+
+        :param states: The states of the state graph.
+        :param cost: Optional. Returns the cost of a transition, which must not be negative.
+        """
+        if cost is None:
+            self._next_hop: dict[str, dict[str, Transition]] = {s.id: self._first_hops(s) for s in states}
+        else:
+            self._next_hop = {s.id: self._cheapest_first_hops(s, cost) for s in states}
+
+    @staticmethod
+    def _first_hops(start: State) -> dict[str, Transition]:
+        first_hops: dict[str, Transition] = {}
+        visited = {start}
+        queue = deque([start])
+        while queue:
+            state = queue.popleft()
+            for transition in state.transitions:
+                if transition.to_state in visited:
+                    continue
+                visited.add(transition.to_state)
+                # the first hop towards a state is the first hop towards its BFS parent
+                first_hops[transition.to_state.id] = transition if state is start else first_hops[state.id]
+                queue.append(transition.to_state)
+        return first_hops
+
+    @staticmethod
+    def _cheapest_first_hops(start: State, cost: Callable[[Transition], float]) -> dict[str, Transition]:
+        first_hops: dict[str, Transition] = {}
+        distances = {start: 0.0}
+        done = set()
+        # the sequence number makes the search process states with equal distances in the order they were found
+        sequence = count()
+        queue = [(0.0, next(sequence), start)]
+        while queue:
+            distance, _, state = heapq.heappop(queue)
+            if state in done:
+                continue
+            done.add(state)
+            for transition in state.transitions:
+                to_state = transition.to_state
+                new_distance = distance + cost(transition)
+                if to_state in done or new_distance >= distances.get(to_state, float('inf')):
+                    continue
+                distances[to_state] = new_distance
+                first_hops[to_state.id] = transition if state is start else first_hops[state.id]
+                heapq.heappush(queue, (new_distance, next(sequence), to_state))
+        return first_hops
+
+    def next_hop(self, start: State | str, destination: State | str) -> Transition | None:
+        """
+        Looks up the first transition on the shortest path between two states.
+
+        :param start: The state to start from.
+        :param destination: The state to go to.
+        :return: The first transition to take, or None if the destination cannot be reached or is the start state.
+        """
+        return self._next_hop.get(_state_id(start), {}).get(_state_id(destination))
+
+    def iter_route(self, start: State | str, destination: State | str) -> Iterator[Transition]:
+        """
+        Iterates over the transitions on the shortest path between two states, without building the path.
+
+        :param start: The state to start from.
+        :param destination: The state to go to.
+        :return: An iterator over the transitions, which is empty if the destination cannot be reached.
+        """
+        destination_id = _state_id(destination)
+        transition = self.next_hop(start, destination_id)
+        while transition is not None:
+            yield transition
+            transition = self.next_hop(transition.to_state, destination_id)
+
+    def route(self, start: State | str, destination: State | str) -> list[Transition] | None:
+        """
+        Returns the shortest path between two states.
+
+        :param start: The state to start from.
+        :param destination: The state to go to.
+        :return: The transitions on the shortest path, an empty list if start and destination are the same state, or
+        None if the destination cannot be reached.
+        """
+        if _state_id(start) == _state_id(destination):
+            return []
+        if self.next_hop(start, destination) is None:
+            return None
+        return list(self.iter_route(start, destination))
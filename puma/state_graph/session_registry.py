@@ -0,0 +1,263 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from appium import webdriver
+from appium.webdriver.webdriver import WebDriver
+from selenium.common.exceptions import WebDriverException
+from urllib3.exceptions import HTTPError, MaxRetryError
+
+from puma.state_graph import logger
+from puma.state_graph.command_scheduler import command_scheduler, detach_command_scheduler
+
+# A session that has not been used by any PumaDriver for this long (in seconds) is closed. This is well within the
+# default new command timeout of 1200 seconds, after which the Appium server closes the session itself.
+DEFAULT_IDLE_TIMEOUT = 600
+# Sessions are probed at most this often (in seconds) to check that they are still alive
+DEFAULT_HEALTH_CHECK_INTERVAL = 60
+
+
+class AppiumConnectionError(ConnectionError):
+    """
+    Raised when no session can be created on the Appium server, for example because the server is not running.
+    """
+    pass
+
+
+def _capabilities(options) -> dict:
+    return options.to_capabilities() if hasattr(options, 'to_capabilities') else options
+
+
+class AppiumSession:
+    """
+    A shared Appium session for a device on an Appium server. When the registry re-creates a session that died, the
+    driver of this object is replaced, so everybody holding it transparently uses the new session.
+    """
+
+    def __init__(self, appium_server: str, udid: str, options):
+        self.appium_server = appium_server
+        self.udid = udid
+        self.options = options
+        self.driver: WebDriver | None = None
+        self.references = 0
+        self.last_used = time.monotonic()
+        self.last_health_check = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.appium_server, self.udid
+
+    def __repr__(self):
+        return f'AppiumSession({self.udid} on {self.appium_server}, {self.references} references)'
+
+
+class SessionRegistry:
+    """
+    Keeps the Appium sessions of this process, so every PumaDriver for the same device and Appium server shares one
+    session. All methods are thread safe.
+
+    A session is reference counted: acquire() increments the count, release() decrements it. Sessions that are no
+    longer referenced are kept for reuse until they have been idle for idle_timeout seconds, or until more than
+    max_sessions sessions exist, in which case the least recently used unreferenced session is closed first.
+    """
+
+    def __init__(self, idle_timeout: float | None = DEFAULT_IDLE_TIMEOUT, max_sessions: int | None = None,
+                 health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL):
+        """
+        :param idle_timeout: Optional. The time in seconds after which an unreferenced session is closed, or None to
+        keep unreferenced sessions until the registry is closed.
+        :param max_sessions: Optional. The maximum number of sessions to keep, or None for no maximum. Referenced
+        sessions are never closed, so this number can be exceeded when all sessions are in use.
+        :param health_check_interval: Optional. The minimal time in seconds between two health probes of a session.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.health_check_interval = health_check_interval
+        self._sessions: dict[tuple[str, str], AppiumSession] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, appium_server: str, udid: str, options) -> AppiumSession:
+        """
+        Returns the session for a device, creating it if there is none yet, and increments its reference count.
+        Sessions for different devices are created in parallel when acquired from different threads.
+
+        :param appium_server: The address of the Appium server.
+        :param udid: The unique device identifier of the device.
+        :param options: The Appium options to create the session with. These are ignored when the session exists, which
+        is logged when they differ from the options the session was created with.
+        :return: The session. Call release() when it is no longer used.
+        :raises AppiumConnectionError: If the session could not be created.
+        """
+        with self._lock:
+            session = self._sessions.get((appium_server, udid))
+            if session is None:
+                session = AppiumSession(appium_server, udid, options)
+                self._sessions[session.key] = session
+            session.references += 1
+            session.last_used = time.monotonic()
+        try:
+            with session.lock:
+                if session.driver is None:
+                    session.driver = self._create_driver(session)
+                    session.last_health_check = time.monotonic()
+                elif _capabilities(options) != _capabilities(session.options):
+                    logger.warning(f'WARNING: There already was an initialized driver for appium server {appium_server} and udid {udid}. '
+                                   'This driver will be used, which might mean your Appium capabilities are ignored as these cannot be'
+                                   'altered for a driver that has already been initialized. If you need specific capabilities, please '
+                                   'rewrite your Puma code to ensure the correct capabilities are loaded the first time you connect to '
+                                   f'server {appium_server} and device {udid}.')
+        except BaseException:
+            self.release(session)
+            raise
+        self._evict()
+        return session
+
+    def release(self, session: AppiumSession):
+        """
+        Decrements the reference count of a session. The session is kept for reuse until it is evicted.
+
+        :param session: The session that is no longer used.
+        """
+        with self._lock:
+            session.references = max(session.references - 1, 0)
+            session.last_used = time.monotonic()
+        self._evict()
+
+    def ensure_healthy(self, session: AppiumSession, force: bool = False) -> bool:
+        """
+        Probes whether a session is still alive, and re-creates it if it is not. Probes are done at most once every
+        health_check_interval seconds.
+
+        :param session: The session to check.
+        :param force: Optional. Probe even if the session was probed recently.
+        :return: True if the session was re-created.
+        :raises AppiumConnectionError: If the session had to be re-created, but that failed.
+        """
+        with session.lock:
+            session.last_used = time.monotonic()
+            if not force and time.monotonic() - session.last_health_check < self.health_check_interval:
+                return False
+            session.last_health_check = time.monotonic()
+            if session.driver is not None and self._is_alive(session.driver):
+                return False
+            logger.warning(f'The Appium session for device {session.udid} is no longer alive, creating a new session')
+            self._quit(session)
+            session.driver = self._create_driver(session)
+            return True
+
+    @staticmethod
+    def _is_alive(driver: WebDriver) -> bool:
+        try:
+            driver.current_package
+            return True
+        except (WebDriverException, HTTPError, OSError):
+            return False
+
+    @staticmethod
+    def _create_driver(session: AppiumSession) -> WebDriver:
+        logger.info(f'Creating Appium session for device {session.udid} on {session.appium_server}')
+        try:
+            driver = webdriver.Remote(session.appium_server, options=session.options)
+        except MaxRetryError as e:
+            raise AppiumConnectionError("Connecting to the Appium server has failed.\n"
+                                        "Make sure that the appium server is running!\n"
+                                        "This can be done by running the `appium` command from the command line.") from e
+        # all users of the session, including background threads, send their commands through one scheduler
+        command_scheduler(driver, session.udid)
+        return driver
+
+    @staticmethod
+    def _quit(session: AppiumSession):
+        driver, session.driver = session.driver, None
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except (WebDriverException, HTTPError, OSError) as e:
+            logger.debug(f'Could not quit Appium session for device {session.udid}: {e}')
+        finally:
+            detach_command_scheduler(driver)
+
+    def warm_up(self, appium_server: str, options_per_udid: dict, max_workers: int = None) -> dict[str, Exception]:
+        """
+        Creates the sessions for several devices in parallel, so they are ready when PumaDrivers for these devices are
+        created. The sessions are not referenced afterwards, so they are closed again when they stay unused for longer
+        than idle_timeout.
+
+        :param appium_server: The address of the Appium server.
+        :param options_per_udid: The Appium options to create the session with, per unique device identifier.
+        :param max_workers: Optional. The maximum number of sessions to create at the same time, by default all at once.
+        :return: The errors of the devices for which no session could be created. Empty if all sessions were created.
+        """
+        if not options_per_udid:
+            return {}
+
+        def warm_up_session(udid: str):
+            self.release(self.acquire(appium_server, udid, options_per_udid[udid]))
+
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(options_per_udid),
+                                thread_name_prefix='puma-warm-up') as executor:
+            futures = {udid: executor.submit(warm_up_session, udid) for udid in options_per_udid}
+            for udid, future in futures.items():
+                error = future.exception()
+                if error is not None:
+                    logger.error(f'Could not create Appium session for device {udid}: {error}')
+                    errors[udid] = error
+        return errors
+
+    def _evict(self):
+        """
+        Closes unreferenced sessions that have been idle for too long, and the least recently used unreferenced
+        sessions when there are more than max_sessions.
+        """
+        now = time.monotonic()
+        with self._lock:
+            unreferenced = sorted((session for session in self._sessions.values() if session.references == 0),
+                                  key=lambda session: session.last_used)
+            evicted = [session for session in unreferenced
+                       if self.idle_timeout is not None and now - session.last_used > self.idle_timeout]
+            if self.max_sessions is not None:
+                excess = len(self._sessions) - len(evicted) - self.max_sessions
+                evicted += [session for session in unreferenced if session not in evicted][:max(excess, 0)]
+            for session in evicted:
+                del self._sessions[session.key]
+        for session in evicted:
+            logger.info(f'Closing unused Appium session for device {session.udid}')
+            with session.lock:
+                self._quit(session)
+
+    def evict_idle(self):
+        """
+        Closes the unreferenced sessions that have been idle for longer than idle_timeout. This is also done on every
+        acquire() and release().
+        """
+        self._evict()
+
+    def close(self):
+        """
+        Closes all sessions, including referenced sessions.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                self._quit(session)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# The sessions of all PumaDrivers, unless a PumaDriver is given its own registry
+SESSIONS = SessionRegistry()
+atexit.register(SESSIONS.close)
@@ -1,5 +1,4 @@
 from abc import ABC, abstractmethod
-from collections import deque
 from dataclasses import dataclass
 from typing import Callable, List
 
@@ -98,13 +97,15 @@ class SimpleState(State):
 
     def validate(self, driver: PumaDriver) -> bool:
         """
-        Validates if all XPaths are present on the screen.
+        Validates if all XPaths are present on the screen, and none of the invalid XPaths are.
+        All XPaths are evaluated against a single snapshot of the UI.
 
         :param driver: The PumaDriver instance to use.
         :return: True if all XPaths are present, otherwise False.
         """
-        return (all(driver.is_present(xpath) for xpath in self.present_xpaths)
-                and all((not driver.is_present(xpath)) for xpath in self.invalid_xpaths))
+        snapshot = driver.snapshot()
+        return (all(snapshot.is_present(xpath) for xpath in self.present_xpaths)
+                and all((not snapshot.is_present(xpath)) for xpath in self.invalid_xpaths))
 
 
 def back(driver: PumaDriver):
@@ -114,7 +115,7 @@ def back(driver: PumaDriver):
     :param driver: The PumaDriver instance to use.
     """
     logger.info(f'calling driver.back() with driver {driver}')
-    driver.back()
+    return driver.back()
 
 @dataclass
 class Transition:
@@ -140,48 +141,22 @@ def compose_clicks(xpaths: List[str], name: str = 'click') -> Callable[[PumaDriv
     Helper function to create a lambda for constructing transitions by clicking elements.
 
     This function generates a lambda function that, when executed, will click on a series
-    of elements specified by their XPaths.
+    of elements specified by their XPaths. A series of several elements is clicked in a single request to the Appium
+    server, see PumaDriver.click_chain. The lambda returns what the driver returns, so with an AsyncPumaDriver the
+    clicks can be awaited.
 
     :param xpaths: A list of XPaths of the elements to be clicked.
     :param name: The name to give this lambda function.
     :return: A lambda function that takes a driver and performs the clicking actions.
     """
     def _click_(driver):
-        for xpath in xpaths:
-            driver.click(xpath)
+        if len(xpaths) == 1:
+            return driver.click(xpaths[0])
+        return driver.click_chain(xpaths)
     _click_.__name__ = name
     return _click_
 
 
-def _shortest_path(start: State, destination: State | str) -> list[Transition] | None:
-    """
-       Finds the shortest path between two states.
-
-       This function uses a breadth-first search algorithm to find the shortest path
-       from the starting state to the destination state. The destination can be specified
-       either as a State object or as a string representing the name of the state.
-
-       :param start: The starting state for the path search.
-       :param destination: The destination state or state name for the path search.
-       :return: A list of transitions representing the shortest path from the start
-                state to the destination state. Returns None if no path is found.
-       """
-    visited = set()
-    queue = deque([(start, [])])
-    while queue:
-        state, path = queue.popleft()
-        # if this is a path to the desired state, return the path
-        if state == destination or state.id == destination:
-            return path
-        # we do not want cycles: skip paths to already visited states
-        if state in visited:
-            continue
-        visited.add(state)
-        # take a step in all possible directions
-        for transition in state.transitions:
-            queue.append((transition.to_state, path + [transition]))
-    return None
-
 class TransitionError(Exception):
     """
     Exception raised when there is an error in state transition.
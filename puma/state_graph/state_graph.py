@@ -1,12 +1,21 @@
-from time import sleep
+import logging
+import threading
+from time import perf_counter
 from typing import Dict
 
 from puma.state_graph import logger
+from puma.state_graph.graph_analysis import unreachable_states, dead_end_states
 from puma.state_graph.popup_handler import known_popups, PopUpHandler
 from puma.state_graph.puma_driver import PumaDriver, PumaClickException
-from puma.state_graph.state import State, ContextualState, Transition, _shortest_path
+from puma.state_graph.routing import RoutingTable
+from puma.state_graph.state import State, ContextualState, Transition
+from puma.state_graph.state_index import StateIndex
+from puma.state_graph.transition_costs import TransitionCostModel
 from puma.state_graph.utils import safe_func_call, filter_arguments, is_valid_package_name
 
+# The measured transition costs are stored after this many transitions (and when the program exits)
+TRANSITION_COSTS_SAVE_INTERVAL = 10
+
 
 class StateGraphMeta(type):
     """
@@ -32,8 +41,8 @@ class StateGraphMeta(type):
         """
         new_class = super().__new__(cls, name, bases, namespace)
 
-        # Skip validation for the base PumaUIGraph class
-        if name == 'StateGraph':
+        # Skip validation for the base PumaUIGraph classes
+        if name in ('StateGraph', 'AsyncStateGraph'):
             return new_class
 
         # collect states and transitions
@@ -52,6 +61,11 @@ class StateGraphMeta(type):
         # validation
         StateGraphMeta._validate_graph(states)
 
+        # index of all XPaths, used to identify the current state using a single UI snapshot
+        new_class.state_index = StateIndex(states)
+        # next-hop routing table, so navigation does not need a path search on every step
+        new_class.routing_table = RoutingTable(states)
+
         return new_class
 
     @staticmethod
@@ -100,11 +114,10 @@ class StateGraphMeta(type):
     @staticmethod
     def _validate_every_state_reachable(states):
         initial_state = next(s for s in states if s.initial_state)
-        unreachable_transitions = [s for s in states if not s.initial_state and not (
-                    bool(_shortest_path(initial_state, s)))]
-        unreachable_parents = [s for s in states if not s.initial_state and not (
-            bool(_shortest_path(s, initial_state)))]
-        if unreachable_parents or unreachable_parents:
+        # one forward and one backward search from the initial state, instead of a path search for every state
+        unreachable_transitions = unreachable_states(states, initial_state)
+        unreachable_parents = dead_end_states(states, initial_state)
+        if unreachable_transitions or unreachable_parents:
             raise ValueError(
                 f"Some states cannot be reached from the initial state '{initial_state}'.\n"
                 f"Add the missing transitions or missing parent states to your Puma StateGraph to fix this issue.\n"
@@ -143,7 +156,33 @@ class StateGraph(metaclass=StateGraphMeta):
     This class uses a state machine approach to manage transitions between different states
     of a user interface. It initializes with a device and application package, and provides
     methods to navigate between states, validate states, and handle unexpected states or errors.
+
+    The duration and success rate of all transitions are measured and stored per app and device model, and navigation
+    uses the route with the lowest expected duration. Set transition_costs to None to route on the number of
+    transitions instead.
+
+    With optimistic_navigation enabled, go_to_state executes all transitions on the route without validating the
+    states in between, except for contextual states. Only the destination state is validated. If anything fails, the
+    navigation falls back to validating every step.
+
+    Apps can set text_entry_strategies to the text entry strategies that work best for them, see PumaDriver.send_keys.
+
+    Creating the Appium session takes several seconds. With connect_lazily enabled (for example by setting
+    StateGraph.connect_lazily = True), the constructor returns immediately and the StateGraph connects on first use
+    of its driver, typically the first action. Sessions can be created for many devices in parallel up front with
+    puma_driver.warm_up_sessions.
     """
+    optimistic_navigation: bool = False
+    connect_lazily: bool = False
+    text_entry_strategies: list[str] = None
+    transition_costs: TransitionCostModel = None
+    _cost_routing_table: RoutingTable = None
+    _cost_routing_version: int = -1
+    _driver: PumaDriver = None
+    _gtl_logger: logging.Logger = None
+    _connection: dict = None
+    # held while an action runs, so actions on one StateGraph from several threads do not mix their state
+    _action_lock: threading.RLock = None
 
     def __init__(self, device_udid: str, app_package: str, appium_server: str = 'http://localhost:4723', desired_capabilities: Dict[str, str] = None):
         """
@@ -155,11 +194,82 @@ class StateGraph(metaclass=StateGraphMeta):
         """
         if not is_valid_package_name(app_package):
             raise ValueError(f'The provided package name is invalid: {app_package}')
+        self._connection = {'udid': device_udid, 'app_package': app_package, 'appium_server': appium_server,
+                            'desired_capabilities': desired_capabilities}
         self.current_state = self.initial_state
-        self.driver = PumaDriver(device_udid, app_package, appium_server=appium_server, desired_capabilities=desired_capabilities)
         self.app_popups = []
         self.try_restart = True
-        self.gtl_logger = self.driver.gtl_logger
+        self._action_lock = threading.RLock()
+        if not self.connect_lazily:
+            self.connect()
+
+    def connect(self):
+        """
+        Connects to the device by creating the PumaDriver of this StateGraph, if that was not done yet. This is done by
+        the constructor, or on first use of the driver when connect_lazily is enabled.
+
+        :raises AppiumConnectionError: If no session could be created on the Appium server.
+        """
+        if self._driver is not None:
+            return
+        connection = self._connection
+        driver = PumaDriver(connection['udid'], connection['app_package'], appium_server=connection['appium_server'],
+                            desired_capabilities=connection['desired_capabilities'])
+        if self.text_entry_strategies:
+            driver.text_entry_strategies = list(self.text_entry_strategies)
+        driver.ui_state = self.current_state.id
+        self.transition_costs = TransitionCostModel.for_device(connection['app_package'], driver.device_model)
+        self._driver = driver
+
+    @property
+    def driver(self) -> PumaDriver:
+        """
+        The PumaDriver of this StateGraph. Connects to the device if that was not done yet, see connect().
+        """
+        if self._driver is None:
+            self.connect()
+        return self._driver
+
+    @driver.setter
+    def driver(self, driver: PumaDriver):
+        self._driver = driver
+
+    @property
+    def gtl_logger(self) -> logging.Logger:
+        """
+        The ground truth logger of the device, see puma.utils.gtl_logging.
+        """
+        return self._gtl_logger if self._gtl_logger is not None else self.driver.gtl_logger
+
+    @gtl_logger.setter
+    def gtl_logger(self, gtl_logger: logging.Logger):
+        self._gtl_logger = gtl_logger
+
+    def close(self):
+        """
+        Releases the Appium session of this StateGraph, see PumaDriver.close(). Does nothing if it never connected.
+        """
+        if self._driver is not None:
+            self._driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def current_state(self) -> State:
+        """
+        The state the app is believed to be in. Setting it also tells the driver, which caches element bounds per state.
+        """
+        return self._current_state
+
+    @current_state.setter
+    def current_state(self, state: State):
+        self._current_state = state
+        if self._driver is not None:
+            self._driver.ui_state = state.id
 
     def go_to_state(self, to_state: State | str, **kwargs) -> bool:
         """
@@ -178,21 +288,89 @@ class StateGraph(metaclass=StateGraphMeta):
             self._validate_state(self.current_state, **kwargs)
         except PumaClickException as pce:
             logger.warning(f"Initial state validation encountered a problem {pce}")
+        routing_table = self._get_routing_table()
+        if self.optimistic_navigation and self.current_state != to_state:
+            if self._navigate_optimistically(to_state, routing_table, **kwargs):
+                return True
+            try:
+                self._validate_state(self.current_state, **kwargs)
+            except PumaClickException as pce:
+                logger.warning(f"State validation after optimistic navigation encountered a problem {pce}")
         while self.current_state != to_state and counter < max_transitions:
             counter += 1
             try:
-                transition = self._find_shortest_path(to_state)[0]
+                transition = routing_table.next_hop(self.current_state, to_state)
+                if transition is None:
+                    raise ValueError(f"There is no path from state '{self.current_state}' to '{to_state}'")
 
                 self.gtl_logger.info(f"Going from state '{self.current_state}' to '{to_state}', calling transition '{transition.ui_actions.__name__}'")
+                start = perf_counter()
                 safe_func_call(transition.ui_actions, **kwargs)
+                duration = perf_counter() - start
+                # transitions can change the UI without going through the PumaDriver, e.g. by clicking a WebElement
+                self.driver.invalidate_snapshot()
 
                 self._validate_state(transition.to_state, **kwargs)
+                self._record_transition(transition, duration, success=self.current_state == transition.to_state)
             except PumaClickException as pce:
                 logger.warning(f"Transition or state validation failed, recover? {pce}")
         if counter >= max_transitions:
             raise ValueError(f"Too many transitions, state is unrecoverable")
         return True
 
+    def _navigate_optimistically(self, to_state: State, routing_table: RoutingTable, **kwargs) -> bool:
+        route = routing_table.route(self.current_state, to_state)
+        if route is None:
+            raise ValueError(f"There is no path from state '{self.current_state}' to '{to_state}'")
+        self.gtl_logger.info(f"Going from state '{self.current_state}' to '{to_state}' without intermediate validation, "
+                             f"calling transitions {[t.ui_actions.__name__ for t in route]}")
+        durations = []
+        for transition in route:
+            start = perf_counter()
+            try:
+                transition.ui_actions(**filter_arguments(transition.ui_actions, **kwargs).arguments)
+            except PumaClickException as pce:
+                logger.warning(f"Transition '{transition.ui_actions.__name__}' failed, validating every step instead {pce}")
+                return False
+            finally:
+                self.driver.invalidate_snapshot()
+            durations.append(perf_counter() - start)
+            # from here on, the state is unknown until validated: if validation fails, recovery will start from here
+            self.current_state = transition.to_state
+            if transition.to_state != to_state and isinstance(transition.to_state, ContextualState):
+                if not self._is_valid_state(transition.to_state, **kwargs):
+                    logger.warning(f"Could not validate state '{transition.to_state}' on the way to '{to_state}', "
+                                   f"validating every step instead")
+                    return False
+        if not self._is_valid_state(to_state, **kwargs):
+            logger.warning(f"Could not validate state '{to_state}' after optimistic navigation, validating every step instead")
+            return False
+        for transition, duration in zip(route, durations):
+            self._record_transition(transition, duration, success=True)
+        self.gtl_logger.info(f"Validated that current state is the expected state '{to_state}'")
+        return True
+
+    def _is_valid_state(self, state: State, **kwargs) -> bool:
+        if not state.validate(self.driver):
+            return False
+        return not isinstance(state, ContextualState) or bool(safe_func_call(state.validate_context, **kwargs))
+
+    def _get_routing_table(self) -> RoutingTable:
+        if self.transition_costs is None or not self.transition_costs.stats:
+            return self.routing_table
+        # only rebuilt when the costs changed significantly, not after every measured transition
+        if self._cost_routing_version != self.transition_costs.routing_version:
+            self._cost_routing_table = RoutingTable(self.states, cost=self.transition_costs.expected_cost)
+            self._cost_routing_version = self.transition_costs.routing_version
+        return self._cost_routing_table
+
+    def _record_transition(self, transition: Transition, duration: float, success: bool):
+        if self.transition_costs is None:
+            return
+        self.transition_costs.record(transition, duration, success)
+        if self.transition_costs.version % TRANSITION_COSTS_SAVE_INTERVAL == 0:
+            self.transition_costs.save()
+
     def _validate_state(self, expected_state: State, **kwargs):
         """
         Validates the current state against an expected state.
@@ -258,25 +436,29 @@ class StateGraph(metaclass=StateGraphMeta):
         self._search_state(expected_state)
 
     def _handle_popups(self):
-        clicked = True
-        while clicked:
-            clicked = False
-            for popup_handler in known_popups + self.app_popups:
-                if popup_handler.is_popup_window(self.driver):
-                    popup_handler.dismiss_popup(self.driver)
-                    clicked = True
+        while True:
+            # all pop-ups are recognized in one round trip, which is outdated as soon as a pop-up is dismissed
+            popup_handlers = known_popups + self.app_popups
+            presence = self.driver.present_many(xpath for p in popup_handlers for xpath in p.recognize_xpaths)
+            popup_handler = next((p for p in popup_handlers if p.is_recognized_by(presence)), None)
+            if popup_handler is None:
+                return
+            popup_handler.dismiss_popup(self.driver)
 
     def _search_state(self, expected_state: State):
-        current_states = [s for s in self.states if s.validate(self.driver)]
+        identification = self.state_index.identify(self.driver)
+        current_states = identification.matches
         if len(current_states) != 1:
             if not self.try_restart:
-                if len(current_states) > 1:
-                    raise ValueError(f"More than one state matches the current UI. Write stricter XPaths. states: {current_states}")
+                if identification.ambiguous:
+                    raise ValueError(identification.describe())
                 else:
-                    raise ValueError("Unknown state, cannot recover")
-            logger.warning(f'Not in a known state. Restarting app {self.driver.app_package} once')
+                    raise ValueError(f"Unknown state, cannot recover. {identification.describe()}")
+            logger.warning(f'Not in a known state. {identification.describe()}')
+            logger.warning(f'Restarting app {self.driver.app_package} once')
             self.driver.restart_app()
-            sleep(3)
+            # wait for the app to show a known state, but no longer than the app needs to start
+            self.driver.wait_until(lambda: self.state_index.identify(self.driver).state is not None, timeout=3)
             self.try_restart = False
             return
         self.gtl_logger.info(
@@ -306,4 +488,4 @@ class StateGraph(metaclass=StateGraphMeta):
         :param destination: The destination state or state name.
         :return: A list of transitions representing the shortest path to the destination state, or None if no path is found.
         """
-        return _shortest_path(self.current_state, destination)
+        return self.routing_table.route(self.current_state, destination)
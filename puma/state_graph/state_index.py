@@ -0,0 +1,141 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from puma.state_graph.puma_driver import PumaDriver
+from puma.state_graph.state import State, SimpleState
+
+
+@dataclass
+class StateScore:
+    """
+    How well the current UI matches a single state.
+
+    :param state: The scored state.
+    :param missing_xpaths: Required XPaths of the state that are not present.
+    :param forbidden_xpaths: Invalid XPaths of the state that are present.
+    :param score: The fraction of required XPaths that is present, or 1.0 or 0.0 for states which are not indexed.
+    """
+    state: State
+    missing_xpaths: list[str] = field(default_factory=list)
+    forbidden_xpaths: list[str] = field(default_factory=list)
+    score: float = 1.0
+
+    @property
+    def matches(self) -> bool:
+        return not self.missing_xpaths and not self.forbidden_xpaths and self.score == 1.0
+
+
+@dataclass
+class StateIdentification:
+    """
+    The result of identifying the current state, including diagnostics for when zero or multiple states match.
+
+    :param matches: All states that match the current UI, in the order they are defined in the graph.
+    :param scores: The scores of all states, from best to worst match.
+    """
+    matches: list[State]
+    scores: list[StateScore]
+
+    @property
+    def state(self) -> State | None:
+        """
+        :return: The current state, or None if zero or multiple states match.
+        """
+        return self.matches[0] if len(self.matches) == 1 else None
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.matches) > 1
+
+    def describe(self) -> str:
+        """
+        :return: A human-readable explanation of the identification result.
+        """
+        if self.ambiguous:
+            return (f'More than one state matches the current UI: {self.matches}. '
+                    f'Write stricter XPaths, or add invalid XPaths to tell these states apart.')
+        if self.state is not None:
+            return f'Recognized state {self.state}'
+        closest = [s for s in self.scores if s.score > 0][:3]
+        if not closest:
+            return 'No state matches the current UI, and none of the required XPaths are present'
+        details = '; '.join(f'{s.state} ({s.score:.0%} of required XPaths present, missing: {s.missing_xpaths}'
+                            f'{f", present invalid XPaths: {s.forbidden_xpaths}" if s.forbidden_xpaths else ""})'
+                            for s in closest)
+        return f'No state matches the current UI. Closest states: {details}'
+
+
+def _is_indexable(state: State) -> bool:
+    # states with a custom validate method cannot be validated by looking at their XPaths only
+    return isinstance(state, SimpleState) and type(state).validate is SimpleState.validate
+
+
+class StateIndex:
+    """
+    Inverted index from XPaths to the states that require or forbid them.
+
+    With this index, all states in a graph can be scored against a single UI snapshot, evaluating each distinct XPath
+    only once, instead of validating the states one by one.
+    """
+
+    def __init__(self, states: list[State]):
+        """
+        Builds the index for the given states.
+
+        :param states: The states of the state graph.
+        """
+        self.states = states
+        self.required_by: dict[str, list[State]] = defaultdict(list)
+        self.forbidden_by: dict[str, list[State]] = defaultdict(list)
+        # states with a custom validate method, these are validated using that method
+        self.unindexed_states: list[State] = []
+        for state in states:
+            if not _is_indexable(state):
+                self.unindexed_states.append(state)
+                continue
+            for xpath in dict.fromkeys(state.present_xpaths):
+                self.required_by[xpath].append(state)
+            for xpath in dict.fromkeys(state.invalid_xpaths):
+                self.forbidden_by[xpath].append(state)
+        self.xpaths = list(dict.fromkeys([*self.required_by, *self.forbidden_by]))
+
+    def identify(self, driver: PumaDriver) -> StateIdentification:
+        """
+        Determines which states match the current UI, using a single UI snapshot.
+
+        :param driver: The PumaDriver instance to use.
+        :return: The identification result.
+        """
+        with driver.snapshot_mode() as snapshot:
+            presence = {xpath: snapshot.is_present(xpath) for xpath in self.xpaths}
+            validity = {state: state.validate(driver) for state in self.unindexed_states}
+        return self.identify_from(presence, validity)
+
+    def identify_from(self, presence: dict[str, bool], validity: dict[State, bool]) -> StateIdentification:
+        """
+        Determines which states match the UI, given the presence of all XPaths of the index and the validity of the
+        states with a custom validate method. This allows identifying states with presence determined in another way,
+        for example asynchronously.
+
+        :param presence: Whether each XPath in xpaths is present.
+        :param validity: Whether each state in unindexed_states is valid.
+        :return: The identification result.
+        """
+        scores = {state: StateScore(state) for state in self.states}
+        for xpath in self.xpaths:
+            if presence[xpath]:
+                for state in self.forbidden_by.get(xpath, []):
+                    scores[state].forbidden_xpaths.append(xpath)
+            else:
+                for state in self.required_by.get(xpath, []):
+                    scores[state].missing_xpaths.append(xpath)
+        for state in self.unindexed_states:
+            scores[state].score = 1.0 if validity[state] else 0.0
+        for state in self.states:
+            if _is_indexable(state):
+                score = scores[state]
+                required = len(set(state.present_xpaths))
+                score.score = (required - len(score.missing_xpaths)) / required
+        return StateIdentification(matches=[s for s in self.states if scores[s].matches],
+                                   scores=sorted(scores.values(), key=lambda s: (s.score, -len(s.forbidden_xpaths)),
+                                                 reverse=True))
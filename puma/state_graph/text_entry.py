@@ -0,0 +1,97 @@
+import base64
+from dataclasses import dataclass
+from typing import Callable, TYPE_CHECKING
+
+from appium.webdriver import WebElement
+
+if TYPE_CHECKING:
+    from puma.state_graph.puma_driver import PumaDriver
+
+KEYCODE_PASTE = 279
+ADB_KEYBOARD_IME = 'com.android.adbkeyboard/.AdbIME'
+
+
+class TextEntryUnavailableError(Exception):
+    """
+    Raised by a text entry strategy that cannot be used on the device, so the next strategy is tried.
+    """
+    pass
+
+
+@dataclass
+class TextEntryStats:
+    """
+    Statistics of a text entry strategy.
+
+    :param entries: How often text was entered with the strategy.
+    :param failures: How often the strategy could not be used, or the text in the field did not match afterwards.
+    :param characters: The number of characters entered successfully.
+    :param duration: The time in seconds spent on successful entries, including verification.
+    """
+    entries: int = 0
+    failures: int = 0
+    characters: int = 0
+    duration: float = 0.0
+
+    @property
+    def chars_per_second(self) -> float:
+        return self.characters / self.duration if self.duration else 0.0
+
+    def __sub__(self, other: 'TextEntryStats') -> 'TextEntryStats':
+        """
+        :return: The counts since other was copied from these statistics.
+        """
+        return TextEntryStats(self.entries - other.entries, self.failures - other.failures,
+                              self.characters - other.characters, self.duration - other.duration)
+
+    def __str__(self):
+        return f'{self.entries} entries, {self.failures} failures, {self.chars_per_second:.0f} chars/s'
+
+
+def send_keys(driver: 'PumaDriver', element: WebElement, text: str):
+    """
+    Clears the field and types the text through Appium.
+    """
+    element.clear()
+    element.send_keys(text)
+
+
+def set_value(driver: 'PumaDriver', element: WebElement, text: str):
+    """
+    Replaces the text of the field in a single Appium request.
+    """
+    driver.driver.execute_script('mobile: replaceElementValue', {'elementId': element.id, 'text': text})
+
+
+def clipboard(driver: 'PumaDriver', element: WebElement, text: str):
+    """
+    Clears the field, puts the text on the clipboard and pastes it. Pasting is as fast for long texts and emoji as it
+    is for a single character. Note that this overwrites the clipboard of the device.
+    """
+    driver.driver.set_clipboard_text(text)
+    element.clear()
+    driver.input.key_event(KEYCODE_PASTE)
+
+
+def adb_ime(driver: 'PumaDriver', element: WebElement, text: str):
+    """
+    Enters the text with a broadcast to the ADB Keyboard (https://github.com/senzhk/ADBKeyBoard), bypassing Appium.
+    The ADB Keyboard must be installed and be the current input method of the device.
+
+    :raises TextEntryUnavailableError: If the ADB Keyboard is not the current input method.
+    """
+    encoded = base64.b64encode(text.encode('utf-8')).decode('ascii')
+    output = driver.adb_shell.run([
+        f'if [ "$(settings get secure default_input_method)" != "{ADB_KEYBOARD_IME}" ]; then echo unavailable; else '
+        f'am broadcast -a ADB_CLEAR_TEXT > /dev/null; am broadcast -a ADB_INPUT_B64 --es msg {encoded} > /dev/null; fi'])
+    if 'unavailable' in output:
+        raise TextEntryUnavailableError(f'{ADB_KEYBOARD_IME} is not the current input method')
+
+
+# the text entry strategies by name, see PumaDriver.send_keys
+TEXT_ENTRY_STRATEGIES: dict[str, Callable[['PumaDriver', WebElement, str], None]] = {
+    'send_keys': send_keys,
+    'set_value': set_value,
+    'clipboard': clipboard,
+    'adb_ime': adb_ime,
+}
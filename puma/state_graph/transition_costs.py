@@ -0,0 +1,177 @@
+import atexit
+import json
+import re
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from puma.state_graph import logger
+from puma.state_graph.state import Transition
+from puma.utils import CACHE_FOLDER
+
+TRANSITION_COSTS_FOLDER = Path(CACHE_FOLDER) / 'transition_costs'
+
+# The cost in seconds of a transition for which no measurements exist yet, when no other transition is measured either
+DEFAULT_TRANSITION_COST = 1.0
+# The relative change of the expected cost of a transition after which routes are computed again
+ROUTING_COST_CHANGE_THRESHOLD = 0.2
+
+# cost models per file, so all devices of the same model share (and store) the same measurements
+_models: dict[Path, 'TransitionCostModel'] = {}
+_models_lock = threading.Lock()
+
+
+@dataclass
+class TransitionStats:
+    """
+    Measurements of a single transition.
+
+    :param attempts: How often the transition was executed.
+    :param successes: How often the transition ended in its destination state.
+    :param total_duration: The summed wall-clock duration of the UI actions of the transition, in seconds.
+    """
+    attempts: int = 0
+    successes: int = 0
+    total_duration: float = 0.0
+
+    @property
+    def mean_duration(self) -> float:
+        return self.total_duration / self.attempts if self.attempts else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """
+        :return: The success rate, with Laplace smoothing so a single failure does not rule out a transition.
+        """
+        return (self.successes + 1) / (self.attempts + 2)
+
+
+def transition_key(transition: Transition) -> str:
+    return f'{transition.from_state.id}->{transition.to_state.id}'
+
+
+class TransitionCostModel:
+    """
+    Keeps track of the duration and success rate of transitions, to find the fastest route between states.
+
+    The expected cost of a transition is its mean duration divided by its success rate, as a failed transition has to
+    be retried (after recovering). Transitions that were never executed get the mean cost of the measured transitions.
+    Measurements can be stored to and loaded from a JSON file, so they are kept between runs.
+
+    Computing routes for all states is relatively expensive, so routing_version is only increased when the expected
+    cost of a transition changed significantly since routes were last computed, or when a transition is measured for
+    the first time.
+    """
+
+    def __init__(self, path: Path = None):
+        """
+        Creates a new cost model, loading earlier measurements from the given file if it exists.
+
+        :param path: Optional. The JSON file the measurements are stored in.
+        """
+        self.path = path
+        self.stats: dict[str, TransitionStats] = {}
+        # increased on every measurement, so routing tables know when they are outdated
+        self.version = 0
+        # increased when the expected costs changed enough to compute the routes again
+        self.routing_version = 0
+        # the expected cost of each transition as of the last routing_version increase
+        self._routed_costs: dict[str, float] = {}
+        self._default_cost = None
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            self._load()
+
+    @staticmethod
+    def for_device(app_package: str, device_model: str) -> 'TransitionCostModel':
+        """
+        Returns the cost model for an app on a device model, with its measurements stored in the transition costs
+        folder. All devices of the same model share the same cost model.
+
+        :param app_package: The package name of the app.
+        :param device_model: The model of the device.
+        :return: The cost model.
+        """
+        safe_model = re.sub(r'[^A-Za-z0-9_.-]', '_', device_model or 'unknown')
+        path = TRANSITION_COSTS_FOLDER / f'{app_package}_{safe_model}.json'
+        with _models_lock:
+            if path not in _models:
+                _models[path] = TransitionCostModel(path)
+                # stored once at exit, however often devices with this model connect
+                atexit.register(_models[path].save)
+            return _models[path]
+
+    def record(self, transition: Transition, duration: float, success: bool):
+        """
+        Records the execution of a transition.
+
+        :param transition: The executed transition.
+        :param duration: The wall-clock duration of the UI actions, in seconds.
+        :param success: Whether the transition ended in its destination state.
+        """
+        with self._lock:
+            stats = self.stats.setdefault(transition_key(transition), TransitionStats())
+            stats.attempts += 1
+            stats.successes += int(success)
+            stats.total_duration += duration
+            self.version += 1
+            key = transition_key(transition)
+            cost = self._measured_cost(stats)
+            routed_cost = self._routed_costs.get(key)
+            if routed_cost is None or abs(cost - routed_cost) > ROUTING_COST_CHANGE_THRESHOLD * routed_cost:
+                self._routed_costs[key] = cost
+                self.routing_version += 1
+
+    def _measured_cost(self, stats: TransitionStats) -> float:
+        return stats.mean_duration / stats.success_rate
+
+    def expected_cost(self, transition: Transition) -> float:
+        """
+        :param transition: The transition.
+        :return: The expected cost of the transition, in seconds.
+        """
+        # the model is shared by all devices of a model, which can record transitions while routes are computed
+        with self._lock:
+            stats = self.stats.get(transition_key(transition))
+            if stats is not None and stats.attempts:
+                return self._measured_cost(stats)
+            return self._unmeasured_cost()
+
+    def default_cost(self) -> float:
+        """
+        :return: The cost used for transitions without measurements: the mean cost of all measured transitions.
+        """
+        with self._lock:
+            return self._unmeasured_cost()
+
+    def _unmeasured_cost(self) -> float:
+        # cached per version, as this is called for every unmeasured transition while computing routes. Called with the
+        # lock held.
+        if self._default_cost is None or self._default_cost[0] != self.version:
+            measured = [self._measured_cost(s) for s in self.stats.values() if s.attempts]
+            self._default_cost = (self.version, sum(measured) / len(measured) if measured else DEFAULT_TRANSITION_COST)
+        return self._default_cost[1]
+
+    def save(self):
+        """
+        Stores the measurements in the JSON file of this model. Does nothing if this model has no file.
+        """
+        if self.path is None or not self.stats:
+            return
+        with self._lock:
+            data = {key: asdict(stats) for key, stats in self.stats.items()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(data, indent=2))
+            temp_path.replace(self.path)
+        except OSError as e:
+            logger.warning(f'Could not store transition costs in {self.path}: {e}')
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text())
+            self.stats = {key: TransitionStats(**stats) for key, stats in data.items()}
+            self._routed_costs = {key: self._measured_cost(stats) for key, stats in self.stats.items() if stats.attempts}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f'Could not load transition costs from {self.path}, starting without measurements: {e}')
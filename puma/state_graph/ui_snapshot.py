@@ -0,0 +1,174 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+from lxml import etree
+
+
+class UnsupportedXPathError(ValueError):
+    """
+    Raised when an XPath expression cannot be evaluated locally against a UI snapshot.
+    """
+    pass
+
+
+def _string_value(value: Any) -> str:
+    """
+    Converts an XPath function argument to its string value, following the XPath rules: a node set converts to the
+    string value of its first node, or to the empty string when it is empty.
+    """
+    if isinstance(value, list):
+        if not value:
+            return ''
+        value = value[0]
+    if isinstance(value, etree._Element):
+        return ''.join(value.itertext())
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _lower_case(_context, value) -> str:
+    return _string_value(value).lower()
+
+
+def _upper_case(_context, value) -> str:
+    return _string_value(value).upper()
+
+
+def _ends_with(_context, value, suffix) -> bool:
+    return _string_value(value).endswith(_string_value(suffix))
+
+
+_REGEX_FLAGS = {'i': re.IGNORECASE, 's': re.DOTALL, 'm': re.MULTILINE, 'x': re.VERBOSE}
+
+
+def _matches(_context, value, pattern, flags='') -> bool:
+    re_flags = 0
+    for flag in _string_value(flags):
+        re_flags |= _REGEX_FLAGS.get(flag, 0)
+    return re.search(_string_value(pattern), _string_value(value), re_flags) is not None
+
+
+# XPath 2.0 functions used in the Puma app modules, which lxml (XPath 1.0) does not provide out of the box.
+XPATH_2_SHIMS: dict[tuple[None, str], Callable] = {
+    (None, 'lower-case'): _lower_case,
+    (None, 'upper-case'): _upper_case,
+    (None, 'ends-with'): _ends_with,
+    (None, 'matches'): _matches,
+}
+
+
+@lru_cache(maxsize=2048)
+def compile_xpath(xpath: str) -> etree.XPath:
+    """
+    Compiles an XPath expression, including the XPath 2.0 shims. Compiled expressions are cached, as the same XPaths
+    are evaluated over and over again during state validation.
+
+    :param xpath: The XPath expression to compile.
+    :return: The compiled XPath expression.
+    :raises UnsupportedXPathError: If the expression cannot be compiled by lxml.
+    """
+    try:
+        return etree.XPath(xpath, extensions=XPATH_2_SHIMS)
+    except etree.XPathSyntaxError as e:
+        raise UnsupportedXPathError(f'Cannot evaluate xpath {xpath} locally: {e}') from e
+
+
+class UiSnapshot:
+    """
+    A parsed copy of the UI hierarchy of a device, as returned by the Appium page source.
+
+    Evaluating an XPath against a snapshot does not need any communication with the device, so many XPaths can be
+    checked against the same screen for the cost of a single page source request.
+    """
+
+    def __init__(self, page_source: str, fallback: Callable[[str], bool] = None):
+        """
+        Parses the page source into a UI snapshot.
+
+        :param page_source: The XML page source, as returned by the Appium driver.
+        :param fallback: Optional. Called with the XPath to determine presence when an XPath cannot be evaluated
+        locally, for example when it uses an XPath 2.0 function for which no shim exists.
+        """
+        self.page_source = page_source
+        parser = etree.XMLParser(recover=True, huge_tree=True)
+        self.root = etree.fromstring(page_source.encode('utf-8'), parser=parser)
+        self._fallback = fallback
+
+    @property
+    def screen(self) -> tuple[str, str, str]:
+        """
+        :return: The rotation, width and height of the screen the snapshot was taken on.
+        """
+        return self.root.get('rotation'), self.root.get('width'), self.root.get('height')
+
+    def find_all(self, xpath: str) -> list[etree._Element]:
+        """
+        Finds all nodes in the snapshot matching the given XPath.
+
+        :param xpath: The XPath of the nodes to find.
+        :return: The matching nodes, in document order.
+        :raises UnsupportedXPathError: If the XPath cannot be evaluated locally.
+        """
+        try:
+            result = compile_xpath(xpath)(self.root)
+        except etree.XPathEvalError as e:
+            raise UnsupportedXPathError(f'Cannot evaluate xpath {xpath} locally: {e}') from e
+        if not isinstance(result, list):
+            raise UnsupportedXPathError(f'XPath {xpath} does not select elements')
+        return [node for node in result if isinstance(node, etree._Element)]
+
+    def is_present(self, xpath: str) -> bool:
+        """
+        Checks if an element matching the given XPath is present in the snapshot.
+
+        :param xpath: The XPath of the element to check.
+        :return: True if the element is present, False otherwise.
+        :raises UnsupportedXPathError: If the XPath cannot be evaluated locally, and no fallback was given.
+        """
+        try:
+            return len(self.find_all(xpath)) > 0
+        except UnsupportedXPathError:
+            if self._fallback is None:
+                raise
+            return self._fallback(xpath)
+
+
+@dataclass
+class SnapshotCacheStats:
+    """
+    Statistics of the UI snapshot cache of a PumaDriver. Each hit is a page source request that was saved.
+    """
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: The fraction of snapshot requests that were served from the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self):
+        """
+        Resets all counters, for example to measure the cache use of a single action.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __sub__(self, other: 'SnapshotCacheStats') -> 'SnapshotCacheStats':
+        """
+        :return: The counts since other was copied from these statistics, for example the cache use of a single action.
+        """
+        return SnapshotCacheStats(self.hits - other.hits, self.misses - other.misses,
+                                  self.invalidations - other.invalidations)
+
+    def __str__(self):
+        return f'{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), {self.invalidations} invalidations'
@@ -26,6 +26,24 @@ def safe_func_call(func, **kwargs):
         return None
 
 
+async def async_safe_func_call(func, **kwargs):
+    """
+    Like safe_func_call(), but for functions that may be coroutine functions, such as the transitions and context
+    validations of an AsyncStateGraph. The result is awaited if it is awaitable.
+
+    :param func: The function to be called.
+    :param kwargs: Arbitrary keyword arguments to pass to the function.
+    :return: The result of the function call, or None if an exception occurs.
+    """
+    bound_args = filter_arguments(func, **kwargs)
+    try:
+        result = func(**bound_args.arguments)
+        return await result if inspect.isawaitable(result) else result
+    except PumaClickException as pce:
+        logger.warning(f"A problem occurred during a safe function call, recovering.. {pce}")
+        return None
+
+
 def filter_arguments(func, **kwargs) -> inspect.BoundArguments:
     signature = inspect.signature(func)
     filtered_args = {
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator
+
+# The time in seconds to wait for a condition when no timeout is given
+DEFAULT_WAIT_TIMEOUT = 5.0
+
+
+@dataclass(frozen=True)
+class PollStrategy:
+    """
+    Determines how often a condition is checked while waiting for it.
+
+    The first check is done immediately. After that, the time between two checks starts at initial_interval and is
+    multiplied by backoff_factor after every check, up to max_interval. Conditions that become true quickly are noticed
+    quickly, while slow conditions are not checked more often than needed.
+
+    :param initial_interval: The time in seconds between the first and second check.
+    :param backoff_factor: The factor by which the interval grows after every check. 1 gives a fixed interval.
+    :param max_interval: The maximum time in seconds between two checks.
+    """
+    initial_interval: float = 0.1
+    backoff_factor: float = 2.0
+    max_interval: float = 1.0
+
+    def intervals(self) -> Iterator[float]:
+        """
+        :return: An endless iterator over the times to wait between consecutive checks.
+        """
+        interval = self.initial_interval
+        while True:
+            yield interval
+            interval = min(interval * self.backoff_factor, self.max_interval)
+
+
+EXPONENTIAL_BACKOFF = PollStrategy()
+FIXED_INTERVAL = PollStrategy(initial_interval=0.5, backoff_factor=1.0, max_interval=0.5)
+
+
+def poll(condition: Callable[[], bool], timeout: float, poll_strategy: PollStrategy = EXPONENTIAL_BACKOFF,
+         before_retry: Callable[[], None] = None) -> bool:
+    """
+    Checks a condition until it is true, or until the timeout expires. The condition is always checked at least once,
+    and once more when the timeout expires.
+
+    :param condition: The condition to check.
+    :param timeout: The maximum time to wait in seconds.
+    :param poll_strategy: Optional. Determines the time between checks. Defaults to exponential backoff.
+    :param before_retry: Optional. Called before every check except the first, for example to discard cached data.
+    :return: True if the condition became true, False if the timeout expired.
+    """
+    deadline = time.monotonic() + timeout
+    if condition():
+        return True
+    for interval in poll_strategy.intervals():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        if before_retry is not None:
+            before_retry()
+        if condition():
+            return True
+
+
+async def async_poll(condition: Callable[[], Awaitable[bool]], timeout: float,
+                     poll_strategy: PollStrategy = EXPONENTIAL_BACKOFF) -> bool:
+    """
+    Like poll(), but for a coroutine function as condition. The event loop is free to run other tasks in between checks.
+
+    :param condition: The coroutine function checking the condition.
+    :param timeout: The maximum time to wait in seconds.
+    :param poll_strategy: Optional. Determines the time between checks. Defaults to exponential backoff.
+    :return: True if the condition became true, False if the timeout expired.
+    """
+    deadline = time.monotonic() + timeout
+    if await condition():
+        return True
+    for interval in poll_strategy.intervals():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(interval, remaining))
+        if await condition():
+            return True
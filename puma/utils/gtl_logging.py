@@ -1,26 +1,38 @@
 import logging
+import threading
 from pathlib import Path
 
 from puma.utils import LOG_FOLDER, PUMA_INIT_TIMESTAMP
 
+# The ground truth log file is shared by all devices. A single handler writes it, so lines logged by different devices
+# at the same time, for example from different threads, are never interleaved.
+_gtl_file_handler: logging.FileHandler | None = None
+_gtl_lock = threading.Lock()
+
+
+def _get_gtl_file_handler() -> logging.FileHandler:
+    global _gtl_file_handler
+    if _gtl_file_handler is None:
+        _gtl_file_handler = logging.FileHandler(Path(LOG_FOLDER) / f'{PUMA_INIT_TIMESTAMP}_gtl.log')
+        # the name of a ground truth logger is the udid of its device
+        _gtl_file_handler.setFormatter(logging.Formatter(fmt='%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
+                                                         datefmt='%Y-%m-%d %H:%M:%S'))
+    return _gtl_file_handler
+
 
 def create_gtl_logger(udid: str) -> logging.Logger:
     """
     Create a Puma Ground Truth Logger, specific for one device.
     This logger will log the ground truth of actions taken on this device, including navigation and UI interactions.
     Each log line will include the time and device udid so a clear timeline of events can be tracked on each device.
+    Calling this function again for the same device returns the same logger, and is safe to do from several threads.
 
     :param udid: the device id of the device this logger tracks.
     """
     gtl_logger = logging.getLogger(f'{udid}')
-
-    # format of log lines
-    formatter = logging.Formatter(fmt=f'%(asctime)s [%(levelname)s] [{udid}] %(message)s',
-                                  datefmt='%Y-%m-%d %H:%M:%S')
-    # file name of log file
-    file_handler = logging.FileHandler(Path(LOG_FOLDER) / f'{PUMA_INIT_TIMESTAMP}_gtl.log')
-    file_handler.setFormatter(formatter)
-
-    gtl_logger.addHandler(file_handler)
+    with _gtl_lock:
+        file_handler = _get_gtl_file_handler()
+        if file_handler not in gtl_logger.handlers:
+            gtl_logger.addHandler(file_handler)
 
     return gtl_logger
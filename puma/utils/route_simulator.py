@@ -1,3 +1,4 @@
+import functools
 import random
 import random
 import threading
@@ -13,6 +14,7 @@ from geopy import Point
 from gpxpy.gpx import GPXTrackPoint
 
 from puma.apps.android.appium_actions import AndroidAppiumActions
+from puma.state_graph.command_scheduler import PERIODIC, command_scheduler
 
 
 class RouteSimulator:
@@ -174,6 +176,8 @@ class RouteSimulator:
         """
         self._next_locations = None
         self._current_location = None
+        # a location update that was not sent yet would move the device after the route was stopped
+        command_scheduler(self.driver).cancel((self, 'set_location'))
 
     # The following methods are for internal use only, and are for traveling along the loaded route.
     def _travel_distance(self, distance_to_travel):
@@ -239,13 +243,21 @@ class RouteSimulator:
         This method will loop and spoof the location through appium
         It will exit if there is no set _current_location().
         The loop will attempt to execute every location_update_interval seconds (with a minimum of once every 0.1s)
+        The updates are submitted as periodic commands to the command scheduler of the Appium session, so they never
+        interfere with actions executed at the same time, yet are sent within the update interval while actions run.
+        An update that was not sent yet when the next one is submitted is dropped.
         """
+        scheduler = command_scheduler(self.driver)
         while self._current_location:
             start = time.time()
-            self.driver.set_location(self._current_location.latitude,
-                                     self._current_location.longitude,
-                                     self._current_location.altitude,
-                                     self._current_speed, 5)
+            # stop_route() can clear the location at any time
+            location = self._current_location
+            if location is None:
+                break
+            scheduler.submit(functools.partial(self.driver.set_location, location.latitude, location.longitude,
+                                               location.altitude, self._current_speed, 5),
+                             priority=PERIODIC, coalesce_key=(self, 'set_location'),
+                             max_delay=self.location_update_interval)
             stop = time.time()
             delay = stop - start
             sleep(max(self.location_update_interval - delay, 0.1))
@@ -24,6 +24,7 @@ setup(
         "setuptools~=80.9.0",
         "gpxpy~=1.6.2",
         "adb_pywrapper~=1.3.0",
-        "requests~=2.32.5"
+        "requests~=2.32.5",
+        "lxml~=6.1.3"
     ],
 )
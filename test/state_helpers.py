@@ -0,0 +1,15 @@
+from puma.state_graph.state import SimpleState
+
+
+def create_states(ids: list[str]) -> list[SimpleState]:
+    """
+    Creates states without transitions, each recognized by a text element showing its id. The first state is the
+    initial state.
+
+    :param ids: The ids of the states.
+    :return: The states, in the order of the ids.
+    """
+    states = [SimpleState([f'//*[@text="{state_id}"]'], initial_state=i == 0) for i, state_id in enumerate(ids)]
+    for state_id, state in zip(ids, states):
+        state.id = state_id
+    return states
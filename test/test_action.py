@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 from unittest.mock import Mock
 
@@ -20,6 +22,14 @@ class MockApplication(StateGraph):
     def action_throws_generic_exception(self):
         raise Exception('test generic exception')
 
+    @action(main_state)
+    def slow_action(self, running: list):
+        running.append(threading.current_thread())
+        time.sleep(0.05)
+        overlapping = len(running)
+        running.remove(threading.current_thread())
+        return overlapping
+
 
 class TestAction(unittest.TestCase):
 
@@ -38,4 +48,19 @@ class TestAction(unittest.TestCase):
             # the error should be logged by the action
             self.assertIn('ERROR:mock_udid:Unexpected exception while executing an action', logs.output[0])
             # and contain information about the reason
-            self.assertIn('test generic exception', logs.output[0])
\ No newline at end of file
+            self.assertIn('test generic exception', logs.output[0])
+
+    def test_actions_on_one_application_do_not_overlap(self):
+        application = MockApplication()
+        application._action_lock = threading.RLock()
+        running, overlapping = [], []
+        threads = [threading.Thread(target=lambda: overlapping.append(application.slow_action(running))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlapping, [1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import unittest
+
+from puma.state_graph.async_http import AsyncHttpClient, HttpError
+
+
+class FakeServer:
+    """
+    A tiny HTTP server answering every request with the request itself as JSON, keeping connections alive.
+    """
+
+    def __init__(self, chunked: bool = False, close_after: int = None, drop_after: int = None):
+        self.chunked = chunked
+        self.close_after = close_after
+        # the number of requests per connection after which the next request is read, but never answered
+        self.drop_after = drop_after
+        self.requests = []
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return f'http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}'
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        handled = 0
+        try:
+            while self.close_after is None or handled < self.close_after:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while (line := await reader.readline()) != b'\r\n':
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.requests.append(request_line.decode().split()[0])
+                if handled == self.drop_after:
+                    return
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+                await asyncio.sleep(0.01)
+                self.active -= 1
+                method, path, _ = request_line.decode().split()
+                content = json.dumps({'value': {'method': method, 'path': path,
+                                                'payload': json.loads(body) if body else None}}).encode()
+                if self.chunked:
+                    middle = len(content) // 2
+                    chunks = b''.join(b'%x\r\n%s\r\n' % (len(part), part) for part in (content[:middle], content[middle:]))
+                    writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n' + chunks + b'0\r\n\r\n')
+                else:
+                    writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n' % len(content) + content)
+                await writer.drain()
+                handled += 1
+        finally:
+            writer.close()
+
+
+class TestAsyncHttpClient(unittest.IsolatedAsyncioTestCase):
+    async def test_json_request_and_response(self):
+        server = FakeServer()
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            response = await client.request('POST', f'{url}/session/1/elements', {'using': 'xpath', 'value': '//a'})
+        await server.stop()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body['value'], {'method': 'POST', 'path': '/session/1/elements',
+                                                  'payload': {'using': 'xpath', 'value': '//a'}})
+
+    async def test_connections_are_reused(self):
+        server = FakeServer()
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            for _ in range(5):
+                await client.request('GET', f'{url}/status')
+        await server.stop()
+        self.assertEqual(client.connections_opened, 1)
+        self.assertEqual(server.connections, 1)
+
+    async def test_chunked_response(self):
+        server = FakeServer(chunked=True)
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            first = await client.request('GET', f'{url}/source')
+            second = await client.request('GET', f'{url}/source')
+        await server.stop()
+        self.assertEqual(first.body['value']['path'], '/source')
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(client.connections_opened, 1)
+
+    async def test_connection_closed_by_server_is_replaced(self):
+        server = FakeServer(close_after=1)
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            await client.request('GET', f'{url}/status')
+            response = await client.request('GET', f'{url}/status')
+        await server.stop()
+        self.assertEqual(response.body['value']['path'], '/status')
+        self.assertEqual(client.connections_opened, 2)
+
+    async def test_idle_connection_closed_by_server_is_not_used(self):
+        server = FakeServer(close_after=1)
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            await client.request('POST', f'{url}/session/1/element/1/click', {})
+            await asyncio.sleep(0.05)
+            response = await client.request('POST', f'{url}/session/1/element/1/click', {})
+        await server.stop()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(server.requests, ['POST', 'POST'])
+
+    async def test_failed_idempotent_request_is_retried(self):
+        server = FakeServer(drop_after=1)
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            await client.request('GET', f'{url}/status')
+            response = await client.request('GET', f'{url}/status')
+        await server.stop()
+        self.assertEqual(response.body['value']['path'], '/status')
+        self.assertEqual(server.requests, ['GET', 'GET', 'GET'])
+
+    async def test_failed_non_idempotent_request_is_not_retried(self):
+        server = FakeServer(drop_after=1)
+        url = await server.start()
+        async with AsyncHttpClient() as client:
+            await client.request('POST', f'{url}/session/1/element/1/click', {})
+            with self.assertRaises(HttpError):
+                await client.request('POST', f'{url}/session/1/element/1/click', {})
+        await server.stop()
+        self.assertEqual(server.requests, ['POST', 'POST'])
+
+    async def test_connections_per_host_are_limited(self):
+        server = FakeServer()
+        url = await server.start()
+        async with AsyncHttpClient(max_connections_per_host=3) as client:
+            await asyncio.gather(*(client.request('GET', f'{url}/status') for _ in range(10)))
+        await server.stop()
+        self.assertEqual(server.max_active, 3)
+        self.assertEqual(client.connections_opened, 3)
+
+    async def test_closed_client_cannot_be_used(self):
+        client = AsyncHttpClient()
+        await client.close()
+        with self.assertRaises(RuntimeError):
+            await client.request('GET', 'http://127.0.0.1:1/status')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+from puma.state_graph.async_http import HttpResponse
+from puma.state_graph.async_puma_driver import AsyncPumaDriver
+from puma.state_graph.puma_driver import PumaClickException
+from puma.state_graph.session_registry import AppiumConnectionError
+
+SERVER = 'http://localhost:4723'
+# the W3C WebDriver key of element references, as returned by an Appium server
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+PAGE_SOURCE = '''<hierarchy rotation="0" width="1080" height="2400">
+<android.widget.FrameLayout>
+    <android.widget.Button resource-id="com.example:id/send" text="Send" bounds="[0,0][100,100]"/>
+    <android.widget.EditText resource-id="com.example:id/input" text="" bounds="[0,100][100,200]"/>
+</android.widget.FrameLayout>
+</hierarchy>'''
+
+
+class FakeAppiumClient:
+    """
+    Answers W3C commands like an Appium server with one screen, recording all requests.
+    """
+
+    def __init__(self, page_source: str = PAGE_SOURCE, elements: dict[str, list[str]] = None):
+        self.page_source = page_source
+        self.elements = elements if elements is not None else {}
+        self.requests = []
+        self.closed = False
+
+    async def request(self, method: str, url: str, payload=None) -> HttpResponse:
+        path = url.removeprefix(SERVER)
+        self.requests.append((method, path, payload))
+        if path == '/session':
+            return HttpResponse(200, {'value': {'sessionId': 's1', 'capabilities': {}}})
+        path = path.removeprefix('/session/s1')
+        if path == '/source':
+            return HttpResponse(200, {'value': self.page_source})
+        if path == '/elements':
+            return HttpResponse(200, {'value': [{ELEMENT_KEY: element}
+                                                for element in self.elements.get(payload['value'], [])]})
+        if path.startswith('/element/missing'):
+            return HttpResponse(404, {'value': {'error': 'no such element', 'message': 'gone', 'stacktrace': ''}})
+        if path == '/execute/sync' and payload['script'] == 'mobile: getCurrentPackage':
+            return HttpResponse(200, {'value': 'com.example'})
+        return HttpResponse(200, {'value': None})
+
+    async def close(self):
+        self.closed = True
+
+    def paths(self) -> list[str]:
+        return [path for _, path, _ in self.requests]
+
+
+async def create_driver(client: FakeAppiumClient) -> AsyncPumaDriver:
+    driver = AsyncPumaDriver('emulator-5554', 'com.example', implicit_wait=0, client=client)
+    await driver.connect()
+    return driver
+
+
+class TestAsyncPumaDriver(unittest.IsolatedAsyncioTestCase):
+    async def test_connect_creates_session_with_capabilities(self):
+        client = FakeAppiumClient()
+        driver = await create_driver(client)
+        self.assertEqual(driver.session_id, 's1')
+        method, path, payload = client.requests[0]
+        self.assertEqual((method, path), ('POST', '/session'))
+        self.assertEqual(payload['capabilities']['alwaysMatch']['appium:udid'], 'emulator-5554')
+
+    async def test_connection_failure(self):
+        client = FakeAppiumClient()
+
+        async def refuse(*args):
+            raise ConnectionRefusedError()
+
+        client.request = refuse
+        with self.assertRaises(AppiumConnectionError):
+            await create_driver(client)
+
+    async def test_command_before_connect(self):
+        driver = AsyncPumaDriver('emulator-5554', 'com.example', client=FakeAppiumClient())
+        with self.assertRaises(ConnectionError):
+            await driver.command('GET', '/source')
+
+    async def test_presence_checks_share_one_snapshot(self):
+        client = FakeAppiumClient()
+        driver = await create_driver(client)
+        self.assertTrue(await driver.is_present('//*[@text="Send"]'))
+        self.assertFalse(await driver.is_present('//*[@text="Cancel"]'))
+        self.assertEqual(await driver.present_many(['//*[@text="Send"]', '//android.widget.EditText']),
+                         {'//*[@text="Send"]': True, '//android.widget.EditText': True})
+        self.assertEqual(client.paths().count('/session/s1/source'), 1)
+
+    async def test_unsupported_xpath_is_checked_on_device(self):
+        xpath = '//*[unknown-function(@text)]'
+        client = FakeAppiumClient(elements={xpath: ['e1']})
+        driver = await create_driver(client)
+        driver.use_native_locators = False
+        self.assertTrue(await driver.is_present(xpath))
+        self.assertIn('/session/s1/elements', client.paths())
+
+    async def test_click_uses_native_locator_and_invalidates_snapshot(self):
+        selector = 'new UiSelector().text("Send")'
+        client = FakeAppiumClient(elements={selector: ['e1']})
+        driver = await create_driver(client)
+        await driver.snapshot()
+        await driver.click('//*[@text="Send"]')
+        self.assertIn(('POST', '/session/s1/elements', {'using': '-android uiautomator', 'value': selector}),
+                      client.requests)
+        self.assertIn('/session/s1/element/e1/click', client.paths())
+        await driver.snapshot()
+        self.assertEqual(client.paths().count('/session/s1/source'), 2)
+
+    async def test_click_non_present_element(self):
+        driver = await create_driver(FakeAppiumClient())
+        with self.assertRaises(PumaClickException):
+            await driver.click('//*[@text="Cancel"]')
+
+    async def test_click_chain_names_failing_step(self):
+        client = FakeAppiumClient(elements={'new UiSelector().text("Send")': ['e1']})
+        driver = await create_driver(client)
+        with self.assertRaisesRegex(PumaClickException, 'element 2 of 2'):
+            await driver.click_chain(['//*[@text="Send"]', '//*[@text="Cancel"]'])
+        self.assertIn('/session/s1/element/e1/click', client.paths())
+
+    async def test_send_keys_replaces_text(self):
+        client = FakeAppiumClient(elements={'com.example:id/input': ['e2']})
+        driver = await create_driver(client)
+        await driver.send_keys('//*[@resource-id="com.example:id/input"]', 'Hi')
+        self.assertEqual(client.requests[-2:], [('POST', '/session/s1/element/e2/clear', {}),
+                                                ('POST', '/session/s1/element/e2/value', {'text': 'Hi', 'value': ['H', 'i']})])
+
+    async def test_w3c_errors_are_raised_as_selenium_exceptions(self):
+        driver = await create_driver(FakeAppiumClient())
+        with self.assertRaises(NoSuchElementException):
+            await driver.command('POST', '/element/missing/click', {})
+
+    async def test_http_error_without_w3c_body(self):
+        client = FakeAppiumClient()
+        driver = await create_driver(client)
+
+        async def server_error(*args):
+            return HttpResponse(500, None)
+
+        client.request = server_error
+        with self.assertRaises(WebDriverException):
+            await driver.back()
+
+    async def test_app_open(self):
+        driver = await create_driver(FakeAppiumClient())
+        self.assertTrue(await driver.app_open())
+
+    async def test_close_deletes_session_but_not_a_shared_client(self):
+        client = FakeAppiumClient()
+        async with AsyncPumaDriver('emulator-5554', 'com.example', client=client) as driver:
+            self.assertEqual(driver.session_id, 's1')
+        self.assertEqual(client.requests[-1], ('DELETE', '/session/s1', None))
+        self.assertIsNone(driver.session_id)
+        self.assertFalse(client.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
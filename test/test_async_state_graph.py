@@ -0,0 +1,157 @@
+import asyncio
+import unittest
+from unittest.mock import Mock
+
+from puma.state_graph.async_state_graph import AsyncStateGraph, async_action
+from puma.state_graph.puma_driver import PumaClickException
+from puma.state_graph.state import SimpleState, compose_clicks
+
+HOME = '//*[@text="Home"]'
+CHATS = '//*[@text="Chats"]'
+OPEN_CHATS = '//*[@text="Open chats"]'
+SETTINGS = '//*[@text="Settings"]'
+
+
+class FakeAsyncDriver:
+    """
+    Shows one of a few screens, and moves between them when elements are clicked or back is pressed.
+    """
+
+    def __init__(self):
+        self.screen = 'home'
+        self.screens = {'home': {HOME, OPEN_CHATS}, 'chats': {CHATS}, 'settings': {SETTINGS}, 'blank': set()}
+        self.clicks = {OPEN_CHATS: 'chats'}
+        self.app_package = 'com.example'
+        self.gtl_logger = Mock()
+        self.ui_state = None
+        self.restarted = False
+
+    async def present_many(self, xpaths):
+        await asyncio.sleep(0)
+        return {xpath: xpath in self.screens[self.screen] for xpath in xpaths}
+
+    async def click(self, xpath: str):
+        if xpath not in self.screens[self.screen]:
+            raise PumaClickException(f'Could not click on non present element with xpath {xpath}')
+        self.screen = self.clicks[xpath]
+
+    async def click_chain(self, xpaths):
+        for xpath in xpaths:
+            await self.click(xpath)
+
+    async def back(self):
+        self.screen = 'home'
+
+    async def app_open(self) -> bool:
+        return True
+
+    async def restart_app(self):
+        self.restarted = True
+        self.screen = 'home'
+
+    def invalidate_snapshot(self):
+        pass
+
+
+async def open_settings(driver: FakeAsyncDriver):
+    await asyncio.sleep(0)
+    driver.screen = 'settings'
+
+
+class AsyncApplication(AsyncStateGraph):
+    home_state = SimpleState([HOME], initial_state=True)
+    chats_state = SimpleState([CHATS], parent_state=home_state)
+    settings_state = SimpleState([SETTINGS], parent_state=home_state)
+
+    home_state.to(chats_state, compose_clicks([OPEN_CHATS], name='open_chats'))
+    home_state.to(settings_state, open_settings)
+
+    def __init__(self):
+        super().__init__('emulator-5554', 'com.example')
+        self.executed = []
+
+    @async_action(chats_state)
+    async def read_chats(self, delay: float = 0):
+        self.executed.append(('start', self.driver.screen))
+        await asyncio.sleep(delay)
+        self.executed.append(('end', self.driver.screen))
+        return 'read'
+
+    @async_action(settings_state, end_state=home_state)
+    async def leave_settings(self):
+        await self.driver.back()
+
+    @async_action(chats_state)
+    async def flaky(self):
+        self.executed.append('flaky')
+        if len(self.executed) == 1:
+            self.driver.screen = 'blank'
+            raise PumaClickException('flaky')
+        return self.driver.screen
+
+
+def create_application() -> AsyncApplication:
+    application = AsyncApplication()
+    application.driver = FakeAsyncDriver()
+    return application
+
+
+class TestAsyncStateGraph(unittest.IsolatedAsyncioTestCase):
+    async def test_go_to_state_awaits_transitions(self):
+        application = create_application()
+        await application.go_to_state(application.settings_state)
+        self.assertEqual(application.driver.screen, 'settings')
+        await application.go_to_state(application.chats_state)
+        self.assertEqual(application.driver.screen, 'chats')
+        self.assertEqual(application.current_state, application.chats_state)
+        self.assertEqual(application.driver.ui_state, application.chats_state.id)
+
+    async def test_action_runs_in_its_state(self):
+        application = create_application()
+        self.assertEqual(await application.read_chats(), 'read')
+        self.assertEqual(application.executed, [('start', 'chats'), ('end', 'chats')])
+
+    async def test_action_with_end_state(self):
+        application = create_application()
+        await application.leave_settings()
+        self.assertEqual(application.current_state, application.home_state)
+
+    async def test_failed_action_is_retried_after_recovery(self):
+        application = create_application()
+        self.assertEqual(await application.flaky(), 'chats')
+        self.assertEqual(application.executed, ['flaky', 'flaky'])
+        self.assertTrue(application.driver.restarted)
+
+    async def test_verify_with_coroutine_function(self):
+        application = create_application()
+        verified = []
+
+        async def verify(app: AsyncApplication) -> bool:
+            verified.append(app.driver.screen)
+            return True
+
+        await application.read_chats(verify_with=verify)
+        self.assertEqual(verified, ['chats'])
+
+    async def test_concurrent_actions_on_one_graph_do_not_overlap(self):
+        application = create_application()
+        await asyncio.gather(application.read_chats(0.05), application.read_chats(0.05))
+        self.assertEqual([event for event, _ in application.executed], ['start', 'end', 'start', 'end'])
+
+    async def test_actions_on_different_graphs_run_concurrently(self):
+        applications = [create_application(), create_application()]
+        await asyncio.gather(*(application.read_chats(0.05) for application in applications))
+        self.assertEqual([event for event, _ in applications[0].executed], ['start', 'end'])
+
+    async def test_driver_before_connect(self):
+        application = AsyncApplication()
+        with self.assertRaises(ConnectionError):
+            application.driver
+
+    def test_async_action_requires_coroutine_function(self):
+        with self.assertRaises(TypeError):
+            async_action(AsyncApplication.home_state)(lambda self: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
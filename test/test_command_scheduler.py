@@ -0,0 +1,211 @@
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+
+from puma.state_graph.command_scheduler import (CommandScheduler, FOREGROUND, PERIODIC, BACKGROUND, command_scheduler,
+                                                detach_command_scheduler)
+
+
+class BlockingCommand:
+    """
+    A foreground command that keeps the session busy until it is released.
+    """
+
+    def __init__(self, scheduler: CommandScheduler):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=scheduler.run, args=(self._run,))
+        self.thread.start()
+        self.started.wait(1)
+
+    def _run(self):
+        self.started.set()
+        self.release.wait(5)
+
+    def finish(self):
+        self.release.set()
+        self.thread.join()
+
+
+class FakeAppiumDriver:
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, driver_command: str, params: dict = None):
+        self.commands.append(driver_command)
+        return {'value': None}
+
+    def set_location(self, latitude, longitude):
+        return self.execute('setLocation', {'latitude': latitude, 'longitude': longitude})
+
+
+class TestCommandScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = CommandScheduler('test')
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_foreground_command_runs_on_calling_thread(self):
+        self.assertEqual(self.scheduler.run(lambda: threading.current_thread()), threading.current_thread())
+        self.assertEqual(self.scheduler.stats.foreground, 1)
+
+    def test_queued_commands_run_by_priority(self):
+        executed = []
+        busy = BlockingCommand(self.scheduler)
+        background = self.scheduler.submit(lambda: executed.append('background'), BACKGROUND)
+        periodic = self.scheduler.submit(lambda: executed.append('periodic'), PERIODIC)
+        busy.finish()
+        background.result(1)
+        periodic.result(1)
+        self.assertEqual(executed, ['periodic', 'background'])
+
+    def test_waiting_foreground_goes_before_queued_commands(self):
+        executed = []
+        busy = BlockingCommand(self.scheduler)
+        background = self.scheduler.submit(lambda: executed.append('background'))
+        foreground = threading.Thread(target=self.scheduler.run, args=(lambda: executed.append('foreground'),))
+        foreground.start()
+        time.sleep(0.05)
+        busy.finish()
+        foreground.join()
+        background.result(1)
+        self.assertEqual(executed, ['foreground', 'background'])
+
+    def test_overdue_command_goes_before_waiting_foreground(self):
+        executed = []
+        busy = BlockingCommand(self.scheduler)
+        periodic = self.scheduler.submit(lambda: executed.append('periodic'), PERIODIC, max_delay=0.01)
+        foreground = threading.Thread(target=self.scheduler.run, args=(lambda: executed.append('foreground'),))
+        foreground.start()
+        time.sleep(0.05)
+        busy.finish()
+        foreground.join()
+        periodic.result(1)
+        self.assertEqual(executed, ['periodic', 'foreground'])
+
+    def test_periodic_commands_are_not_starved_by_foreground_commands(self):
+        stop = threading.Event()
+
+        def foreground_load():
+            while not stop.is_set():
+                self.scheduler.run(lambda: time.sleep(0.005))
+
+        threads = [threading.Thread(target=foreground_load) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        try:
+            futures = []
+            for _ in range(5):
+                futures.append(self.scheduler.submit(lambda: None, PERIODIC, max_delay=0.05))
+                time.sleep(0.05)
+            for future in futures:
+                future.result(1)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.assertLess(self.scheduler.stats.max_queue_delay, 0.2)
+
+    def test_stale_commands_are_coalesced(self):
+        executed = []
+        busy = BlockingCommand(self.scheduler)
+        other = self.scheduler.submit(lambda: executed.append('other'), PERIODIC)
+        futures = [self.scheduler.submit(lambda i=i: executed.append(i), PERIODIC, coalesce_key='location')
+                   for i in range(5)]
+        last = self.scheduler.submit(lambda: executed.append('last'), PERIODIC)
+        busy.finish()
+        last.result(1)
+        other.result(1)
+        self.assertEqual(executed, ['other', 4, 'last'])
+        for future in futures[:-1]:
+            with self.assertRaises(CancelledError):
+                future.result()
+        self.assertEqual(self.scheduler.stats.coalesced, 4)
+
+    def test_commands_never_overlap(self):
+        active = 0
+        overlaps = []
+        lock = threading.Lock()
+
+        def command():
+            nonlocal active
+            with lock:
+                active += 1
+                overlaps.append(active)
+            time.sleep(0.001)
+            with lock:
+                active -= 1
+
+        producers = [threading.Thread(target=lambda: [self.scheduler.submit(command, PERIODIC, coalesce_key=i % 3)
+                                                      for i in range(20)]) for _ in range(4)]
+        foreground = threading.Thread(target=lambda: [self.scheduler.run(command) for _ in range(20)])
+        for thread in [*producers, foreground]:
+            thread.start()
+        for thread in [*producers, foreground]:
+            thread.join()
+        self.scheduler.shutdown(cancel_pending=False)
+        self.assertEqual(max(overlaps), 1)
+
+    def test_nested_commands_run_right_away(self):
+        future = self.scheduler.submit(lambda: self.scheduler.run(lambda: 'nested'))
+        self.assertEqual(future.result(1), 'nested')
+
+    def test_failing_queued_command(self):
+        future = self.scheduler.submit(lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            future.result(1)
+        self.assertEqual(self.scheduler.run(lambda: 'still working'), 'still working')
+
+    def test_foreground_priority_cannot_be_queued(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(lambda: None, FOREGROUND)
+
+    def test_shutdown_cancels_queued_commands(self):
+        busy = BlockingCommand(self.scheduler)
+        future = self.scheduler.submit(lambda: None)
+        threading.Timer(0.05, busy.finish).start()
+        self.scheduler.shutdown()
+        self.assertTrue(future.cancelled())
+        with self.assertRaises(RuntimeError):
+            self.scheduler.submit(lambda: None)
+
+
+class TestAttachedScheduler(unittest.TestCase):
+    def test_driver_commands_go_through_scheduler(self):
+        driver = FakeAppiumDriver()
+        scheduler = command_scheduler(driver, 'emulator-5554')
+        self.assertIs(command_scheduler(driver), scheduler)
+        driver.execute('getPageSource')
+        scheduler.submit(lambda: driver.set_location(52.0, 4.3), PERIODIC, coalesce_key='set_location').result(1)
+        self.assertEqual(driver.commands, ['getPageSource', 'setLocation'])
+        self.assertEqual(scheduler.stats.foreground, 1)
+        self.assertEqual(scheduler.stats.queued, 1)
+        detach_command_scheduler(driver)
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(lambda: None)
+
+    def test_concurrent_attach_wraps_driver_once(self):
+        driver = FakeAppiumDriver()
+        schedulers = []
+        barrier = threading.Barrier(8)
+
+        def attach():
+            barrier.wait()
+            schedulers.append(command_scheduler(driver))
+
+        threads = [threading.Thread(target=attach) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(scheduler) for scheduler in schedulers}), 1)
+        driver.execute('getPageSource')
+        self.assertEqual(driver.commands, ['getPageSource'])
+        self.assertEqual(schedulers[0].stats.foreground, 1)
+        detach_command_scheduler(driver)
+
+
+if __name__ == '__main__':
+    unittest.main()
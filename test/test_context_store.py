@@ -0,0 +1,46 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+from puma.apps.android.google_chrome.states import CurrentTab
+from puma.state_graph.context_store import ContextStore
+from puma.state_graph.state import SimpleState
+
+
+class TestContextStore(unittest.TestCase):
+    def test_contexts_are_per_owner(self):
+        store = ContextStore()
+        store.of('tabs')['last_opened'] = 2
+        self.assertEqual(store.of('tabs'), {'last_opened': 2})
+        self.assertEqual(store.of('app_page'), {})
+
+    def test_clear(self):
+        store = ContextStore()
+        store.of('tabs')['last_opened'] = 2
+        store.of('app_page')['last_opened'] = 'com.example'
+        store.clear('tabs')
+        self.assertNotIn('tabs', store)
+        self.assertIn('app_page', store)
+        store.clear()
+        self.assertNotIn('app_page', store)
+
+    def test_concurrent_first_use(self):
+        store = ContextStore()
+        threads = [threading.Thread(target=lambda i=i: store.of('tabs').__setitem__(i, i)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(store.of('tabs')), 50)
+
+    def test_shared_state_keeps_context_per_device(self):
+        current_tab = CurrentTab(SimpleState(['//*'], initial_state=True))
+        alice, bob = Mock(context=ContextStore()), Mock(context=ContextStore())
+        alice.is_present.return_value = False
+        current_tab.switch_to_tab(alice, 2)
+        self.assertTrue(current_tab.validate_context(alice, tab_index=2))
+        self.assertFalse(current_tab.validate_context(bob, tab_index=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+from unittest.mock import Mock
+
+from puma.state_graph.device_executor import DeviceExecutor
+
+UDIDS = ['alice', 'bob', 'carol']
+
+
+def create_app(udid: str) -> Mock:
+    app = Mock()
+    app.udid = udid
+    return app
+
+
+class TestDeviceExecutor(unittest.TestCase):
+    def test_tasks_run_on_the_app_of_the_device(self):
+        with DeviceExecutor(create_app, UDIDS) as executor:
+            futures = executor.submit_all(lambda app, suffix: app.udid + suffix, '!')
+            self.assertEqual(DeviceExecutor.results(futures), {'alice': 'alice!', 'bob': 'bob!', 'carol': 'carol!'})
+
+    def test_devices_run_in_parallel(self):
+        with DeviceExecutor(create_app, UDIDS) as executor:
+            start = time.monotonic()
+            DeviceExecutor.results(executor.submit_all(lambda app: time.sleep(0.2)))
+            self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_tasks_of_a_device_run_in_order_on_one_thread(self):
+        executed = []
+        with DeviceExecutor(create_app, ['alice']) as executor:
+            for i in range(5):
+                executor.submit('alice', lambda app, i: executed.append((i, threading.current_thread().name)), i)
+        self.assertEqual([i for i, _ in executed], list(range(5)))
+        self.assertEqual(len({thread for _, thread in executed}), 1)
+
+    def test_app_is_created_once_and_closed(self):
+        factory = Mock(side_effect=create_app)
+        with DeviceExecutor(factory, ['alice']) as executor:
+            app = executor.submit('alice', lambda app: app).result()
+            executor.submit('alice', lambda app: None).result()
+        factory.assert_called_once_with('alice')
+        app.close.assert_called_once()
+
+    def test_failure_is_reported_per_device(self):
+        def fail_on_bob(app):
+            if app.udid == 'bob':
+                raise ValueError('no network')
+            return 'ok'
+        with DeviceExecutor(create_app, UDIDS) as executor:
+            results = DeviceExecutor.results(executor.submit_all(fail_on_bob))
+        self.assertEqual(results['alice'], 'ok')
+        self.assertIsInstance(results['bob'], ValueError)
+
+    def test_cancel_pending_tasks(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block(app):
+            started.set()
+            release.wait(1)
+        with DeviceExecutor(create_app, ['alice']) as executor:
+            running = executor.submit('alice', block)
+            pending = [executor.submit('alice', lambda app: None) for _ in range(3)]
+            started.wait(1)
+            self.assertEqual(executor.cancel(), 3)
+            release.set()
+            self.assertIsNone(running.result())
+            for future in pending:
+                with self.assertRaises(CancelledError):
+                    future.result()
+
+    def test_unknown_device(self):
+        with DeviceExecutor(create_app, UDIDS) as executor, self.assertRaises(ValueError):
+            executor.submit('dave', lambda app: None)
+
+    def test_no_tasks_after_shutdown(self):
+        executor = DeviceExecutor(create_app, UDIDS)
+        executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            executor.submit('alice', lambda app: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
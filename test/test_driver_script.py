@@ -0,0 +1,40 @@
+import json
+import unittest
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+from puma.state_graph.driver_script import ClickChainResult, compile_click_chain
+from puma.state_graph.locator import Locator
+
+
+class TestCompileClickChain(unittest.TestCase):
+    def test_steps_and_timeout_are_embedded(self):
+        locators = [Locator(AppiumBy.ID, 'com.whatsapp:id/menu'),
+                    Locator(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("Settings")')]
+        script = compile_click_chain(locators, timeout=3)
+        steps = json.dumps([['id', 'com.whatsapp:id/menu'], ['-android uiautomator', 'new UiSelector().text("Settings")']])
+        self.assertIn(f'const steps = {steps};', script)
+        self.assertIn('Date.now() + 3000', script)
+
+    def test_empty_chain(self):
+        with self.assertRaises(ValueError):
+            compile_click_chain([], timeout=3)
+
+
+class TestClickChainResult(unittest.TestCase):
+    def test_success(self):
+        result = ClickChainResult.parse({'completed': 2, 'error': None})
+        self.assertIsNone(result.failed_step)
+
+    def test_failure(self):
+        result = ClickChainResult.parse({'completed': 1, 'error': 'element not found'})
+        self.assertEqual(result.failed_step, 1)
+        self.assertEqual(result.error, 'element not found')
+
+    def test_unexpected_result(self):
+        with self.assertRaises(ValueError):
+            ClickChainResult.parse(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
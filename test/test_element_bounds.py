@@ -0,0 +1,34 @@
+import unittest
+
+from puma.state_graph.element_bounds import Bounds, BoundsCache
+
+
+class TestBounds(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(Bounds.parse('[100,200][500,300]'), Bounds(100, 200, 500, 300))
+        self.assertIsNone(Bounds.parse(''))
+        self.assertIsNone(Bounds.parse(None))
+
+    def test_from_rect(self):
+        self.assertEqual(Bounds.from_rect({'x': 100, 'y': 200, 'width': 400, 'height': 100}), Bounds(100, 200, 500, 300))
+
+    def test_point(self):
+        bounds = Bounds(100, 200, 500, 300)
+        self.assertEqual(bounds.point(), (300, 250))
+        self.assertEqual(bounds.point(0.9, 0.5), (460, 250))
+
+
+class TestBoundsCache(unittest.TestCase):
+    def test_screen_change_clears_cache(self):
+        cache = BoundsCache()
+        key = ('com.example', 'chat_state', '//*[@text="Send"]')
+        cache.update_screen(('0', '1080', '2400'))
+        cache.put(key, Bounds(0, 0, 10, 10))
+        cache.update_screen(('0', '1080', '2400'))
+        self.assertEqual(cache.get(key), Bounds(0, 0, 10, 10))
+        cache.update_screen(('1', '2400', '1080'))
+        self.assertIsNone(cache.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
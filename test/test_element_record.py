@@ -0,0 +1,60 @@
+import unittest
+
+from lxml import etree
+
+from puma.state_graph.element_bounds import Bounds
+from puma.state_graph.element_record import (ElementRecord, validate_attributes, RECORD_ATTRIBUTES, record_key,
+                                             scroll_offset, content_position)
+
+NODE = etree.fromstring('<android.widget.CheckBox text="Alice" content-desc="" resource-id="com.example:id/name" '
+                        'class="android.widget.CheckBox" checked="true" bounds="[0,100][1080,200]" />')
+
+
+class TestElementRecord(unittest.TestCase):
+    def test_from_node(self):
+        record = ElementRecord.from_node(NODE, validate_attributes(None))
+        self.assertEqual(record.text, 'Alice')
+        self.assertEqual(record.content_desc, '')
+        self.assertEqual(record.resource_id, 'com.example:id/name')
+        self.assertEqual(record.class_name, 'android.widget.CheckBox')
+        self.assertEqual(record.bounds, Bounds(0, 100, 1080, 200))
+        self.assertTrue(record.checked)
+        self.assertIsNone(record.selected)
+
+    def test_only_requested_attributes_are_extracted(self):
+        record = ElementRecord.from_node(NODE, ['text'])
+        self.assertEqual(record.text, 'Alice')
+        self.assertIsNone(record.bounds)
+
+    def test_records_are_compact_and_comparable(self):
+        self.assertFalse(hasattr(ElementRecord(), '__dict__'))
+        self.assertEqual(ElementRecord.from_node(NODE, ['text', 'bounds']), ElementRecord.from_node(NODE, ['text', 'bounds']))
+        self.assertNotEqual(ElementRecord.from_node(NODE, ['text']), ElementRecord.from_node(NODE, ['text', 'bounds']))
+        self.assertEqual(len({ElementRecord.from_node(NODE, ['text']), ElementRecord(text='Alice')}), 1)
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(ValueError):
+            validate_attributes(['text', 'colour'])
+
+    def test_all_attributes_are_fields(self):
+        self.assertEqual(len(RECORD_ATTRIBUTES), len(ElementRecord.__slots__))
+
+
+
+class TestScrollOffset(unittest.TestCase):
+    def test_offset_from_elements_on_both_screens(self):
+        records = [ElementRecord(text=name, bounds=Bounds(0, top, 1080, top + 100))
+                   for name, top in [('Bob', 0), ('Carol', 100), ('Dave', 200)]]
+        keys = [record_key(record) for record in records]
+        previous_positions = {record_key(ElementRecord(text='Bob')): [300], record_key(ElementRecord(text='Carol')): [400]}
+        offset = scroll_offset(previous_positions, keys, records, offset=200)
+        self.assertEqual(offset, 300)
+        self.assertEqual(content_position(records[2], offset), (0, 500))
+
+    def test_offset_without_overlap_is_kept(self):
+        records = [ElementRecord(text='Eve', bounds=Bounds(0, 0, 1080, 100))]
+        self.assertEqual(scroll_offset({}, [record_key(records[0])], records, offset=200), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from puma.state_graph.graph_analysis import analyze_graph, strongly_connected_components, reachable_from
+from puma.state_graph.state import SimpleState
+from test.state_helpers import create_states
+
+
+def numbered_states(count: int) -> list[SimpleState]:
+    return create_states([f'state{i}' for i in range(count)])
+
+
+class TestGraphAnalysis(unittest.TestCase):
+    def test_analyze_graph(self):
+        # 0 <-> 1 -> 2 <-> 3, 4 -> 0
+        states = numbered_states(5)
+        states[0].to(states[1], None)
+        states[1].to(states[0], None)
+        states[1].to(states[2], None)
+        states[2].to(states[3], None)
+        states[3].to(states[2], None)
+        states[4].to(states[0], None)
+
+        analysis = analyze_graph(states, states[0])
+
+        self.assertEqual(analysis.unreachable_states, [states[4]])
+        self.assertEqual(analysis.dead_end_states, [states[2], states[3]])
+        self.assertEqual(sorted(sorted(s.id for s in c) for c in analysis.components),
+                         [['state0', 'state1'], ['state2', 'state3'], ['state4']])
+        self.assertFalse(analysis.strongly_connected)
+
+    def test_strongly_connected_graph(self):
+        states = numbered_states(3)
+        states[0].to(states[1], None)
+        states[1].to(states[2], None)
+        states[2].to(states[0], None)
+        analysis = analyze_graph(states, states[0])
+        self.assertEqual(analysis.unreachable_states, [])
+        self.assertEqual(analysis.dead_end_states, [])
+        self.assertTrue(analysis.strongly_connected)
+
+    def test_large_graph_does_not_hit_recursion_limit(self):
+        # a single long cycle: deeper than the recursion limit for a recursive implementation
+        states = numbered_states(5000)
+        for state, next_state in zip(states, states[1:] + states[:1]):
+            state.to(next_state, None)
+        self.assertEqual(len(reachable_from(states[0])), 5000)
+        self.assertEqual(len(strongly_connected_components(states)), 1)
+        analysis = analyze_graph(states, states[0])
+        self.assertEqual(analysis.unreachable_states, [])
+        self.assertEqual(analysis.dead_end_states, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import threading
+import unittest
+
+from puma.utils.gtl_logging import create_gtl_logger
+
+
+class TestGtlLogging(unittest.TestCase):
+    def test_handler_is_added_once(self):
+        gtl_logger = create_gtl_logger('gtl-test-device')
+        handlers = list(gtl_logger.handlers)
+        self.assertIs(create_gtl_logger('gtl-test-device'), gtl_logger)
+        self.assertEqual(gtl_logger.handlers, handlers)
+
+    def test_concurrent_creation(self):
+        threads = [threading.Thread(target=create_gtl_logger, args=(f'gtl-test-device-{i % 2}',)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(create_gtl_logger('gtl-test-device-0').handlers), 1)
+        self.assertIs(create_gtl_logger('gtl-test-device-0').handlers[0], create_gtl_logger('gtl-test-device-1').handlers[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
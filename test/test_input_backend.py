@@ -0,0 +1,78 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from puma.state_graph.input_backend import AdbInputBackend, AdbShell, AppiumInputBackend
+
+
+class TestAppiumInputBackend(unittest.TestCase):
+    def test_events_are_sent_through_appium(self):
+        driver = MagicMock()
+        backend = AppiumInputBackend(driver)
+        backend.key_event(4)
+        backend.tap((10, 20))
+        backend.swipe((1, 2), (3, 4), 500)
+        driver.press_keycode.assert_called_once_with(4)
+        driver.tap.assert_called_once_with([(10, 20)], duration=None)
+        driver.swipe.assert_called_once_with(1, 2, 3, 4, 500)
+
+
+class TestAdbInputBackend(unittest.TestCase):
+    def setUp(self):
+        self.shell = MagicMock()
+        self.shell.run.return_value = []
+        self.backend = AdbInputBackend('emulator-5554', shell=self.shell)
+
+    def test_events_are_sent_immediately_outside_batch(self):
+        self.backend.key_event(4)
+        self.backend.tap((10.4, 20))
+        self.backend.swipe((540, 1920), (540, 480), 500)
+        self.assertEqual([c.args[0] for c in self.shell.run.call_args_list],
+                         [['input keyevent 4'], ['input tap 10 20'], ['input swipe 540 1920 540 480 500']])
+
+    def test_long_tap_is_a_swipe_without_movement(self):
+        self.backend.tap((10, 20), duration=1000)
+        self.shell.run.assert_called_once_with(['input swipe 10 20 10 20 1000'])
+
+    def test_batch_is_sent_at_once(self):
+        with self.backend.batch():
+            self.backend.key_event(66)
+            self.backend.key_event(67)
+            self.backend.tap((10, 20))
+            self.backend.key_event(4)
+            self.shell.run.assert_not_called()
+        self.shell.run.assert_called_once_with(['input keyevent 66 67', 'input tap 10 20', 'input keyevent 4'])
+
+    def test_failed_batch_is_not_sent(self):
+        with self.assertRaises(ValueError):
+            with self.backend.batch():
+                self.backend.key_event(66)
+                raise ValueError('failed')
+        self.shell.run.assert_not_called()
+
+
+@unittest.skipIf(sys.platform == 'win32', 'needs a POSIX shell')
+class TestAdbShell(unittest.TestCase):
+    def test_commands_run_in_one_persistent_shell(self):
+        # stand-in for adb that ignores its arguments and starts a local shell
+        with tempfile.TemporaryDirectory() as directory:
+            fake_adb = os.path.join(directory, 'adb')
+            with open(fake_adb, 'w') as f:
+                f.write('#!/bin/sh\nexec sh\n')
+            os.chmod(fake_adb, os.stat(fake_adb).st_mode | stat.S_IEXEC)
+            with patch('puma.state_graph.input_backend.ADB_PATH', fake_adb):
+                shell = AdbShell('emulator-5554')
+                try:
+                    self.assertEqual(shell.run(['echo hello', 'echo world']), ['hello', 'world'])
+                    process = shell._process
+                    self.assertEqual(shell.run(['true']), [])
+                    self.assertIs(shell._process, process)
+                finally:
+                    shell.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+from puma.state_graph.locator import Locator, to_locator, to_scroll_into_view_locator
+from puma.utils.xpath_utils import build_resource_id_xpath, build_content_desc_xpath, build_text_xpath_widget, \
+    build_resource_id_text_xpath_widget, build_text_xpath
+
+
+class TestToLocator(unittest.TestCase):
+    def test_resource_id(self):
+        self.assertEqual(to_locator(build_resource_id_xpath('com.whatsapp', 'send')),
+                         Locator(AppiumBy.ID, 'com.whatsapp:id/send'))
+        self.assertEqual(to_locator("//*[@resource-id='com.whatsapp:id/send']"),
+                         Locator(AppiumBy.ID, 'com.whatsapp:id/send'))
+
+    def test_resource_id_without_package(self):
+        self.assertEqual(to_locator('//*[@resource-id="send"]'),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("send")'))
+
+    def test_content_desc(self):
+        self.assertEqual(to_locator(build_content_desc_xpath('Send message')),
+                         Locator(AppiumBy.ACCESSIBILITY_ID, 'Send message'))
+
+    def test_text(self):
+        self.assertEqual(to_locator(build_text_xpath('OK')),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("OK")'))
+
+    def test_class_name_and_combined_conditions(self):
+        self.assertEqual(to_locator(build_text_xpath_widget('Button', 'OK')),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR,
+                                 'new UiSelector().className("android.widget.Button").text("OK")'))
+        self.assertEqual(to_locator(build_resource_id_text_xpath_widget('TextView', 'com.example', 'title', 'Chats')),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().className("android.widget.TextView")'
+                                                               '.resourceId("com.example:id/title").text("Chats")'))
+
+    def test_quotes_are_escaped(self):
+        self.assertEqual(to_locator('''//*[@text='Say "hi"']'''),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("Say \\"hi\\"")'))
+
+    def test_other_xpaths_fall_back_to_xpath(self):
+        for xpath in ['//*[contains(@text, "OK")]',
+                      '//*[@text="OK"]/..',
+                      '//*[@text="OK" or @text="Done"]',
+                      '//*[@text="Rock and Roll"]',
+                      '//*[@text="OK"][1]',
+                      '//*[@text=""]',
+                      '//*[@checked="true"]',
+                      '//*[@text="OK" and @text="Done"]',
+                      '//android.widget.TextView']:
+            with self.subTest(xpath=xpath):
+                self.assertEqual(to_locator(xpath), Locator(AppiumBy.XPATH, xpath))
+
+
+class TestToScrollIntoViewLocator(unittest.TestCase):
+    def test_simple_xpath(self):
+        self.assertEqual(to_scroll_into_view_locator(build_resource_id_xpath('com.whatsapp', 'exit_group'), 5),
+                         Locator(AppiumBy.ANDROID_UIAUTOMATOR,
+                                 'new UiScrollable(new UiSelector().scrollable(true).instance(0)).setMaxSearchSwipes(5)'
+                                 '.scrollIntoView(new UiSelector().resourceId("com.whatsapp:id/exit_group"))'))
+
+    def test_other_xpath(self):
+        self.assertIsNone(to_scroll_into_view_locator('//*[contains(@text, "OK")]', 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
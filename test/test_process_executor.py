@@ -0,0 +1,133 @@
+import os
+import pickle
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError, Future
+
+from puma.state_graph.process_executor import (ProcessDeviceExecutor, RemoteTraceback, WorkerCrashedError,
+                                               _ProcessWorker)
+
+UDIDS = ['alice', 'bob']
+
+
+# The app factory and the tasks are sent to the worker processes, so they are defined at module level to be picklable
+class FakeApp:
+    def __init__(self, udid: str):
+        self.udid = udid
+        self.messages = []
+
+    def send_message(self, message: str) -> int:
+        self.messages.append(message)
+        return len(self.messages)
+
+    def close(self):
+        pass
+
+
+def greet(app: FakeApp, suffix: str) -> str:
+    return app.udid + suffix
+
+
+def pid(app: FakeApp) -> int:
+    return os.getpid()
+
+
+def fail(app: FakeApp):
+    raise ValueError(f'failed on {app.udid}')
+
+
+def crash(app: FakeApp):
+    os._exit(3)
+
+
+def sleep(app: FakeApp, seconds: float):
+    time.sleep(seconds)
+
+
+def unpicklable_result(app: FakeApp):
+    return threading.Lock()
+
+
+class TestProcessDeviceExecutor(unittest.TestCase):
+    def test_tasks_run_on_the_app_of_the_device(self):
+        with ProcessDeviceExecutor(FakeApp, UDIDS) as executor:
+            futures = executor.submit_all(greet, '!')
+            self.assertEqual(ProcessDeviceExecutor.results(futures, timeout=30), {'alice': 'alice!', 'bob': 'bob!'})
+
+    def test_each_device_has_a_process_of_its_own(self):
+        with ProcessDeviceExecutor(FakeApp, UDIDS) as executor:
+            pids = ProcessDeviceExecutor.results(executor.submit_all(pid), timeout=30)
+        self.assertEqual(len(set(pids.values()) | {os.getpid()}), 3)
+
+    def test_tasks_given_by_name_keep_the_app_between_tasks(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            futures = [executor.submit('alice', 'send_message', f'message {i}') for i in range(3)]
+            self.assertEqual([future.result(timeout=30) for future in futures], [1, 2, 3])
+
+    def test_exception_of_task_is_raised_with_remote_traceback(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            future = executor.submit('alice', fail)
+            with self.assertRaises(ValueError) as context:
+                future.result(timeout=30)
+        self.assertIn('failed on alice', str(context.exception))
+        self.assertIsInstance(context.exception.__cause__, RemoteTraceback)
+        self.assertIn('in fail', str(context.exception.__cause__))
+
+    def test_crash_fails_only_the_running_task_and_restarts_the_worker(self):
+        with ProcessDeviceExecutor(FakeApp, UDIDS) as executor:
+            first_pid = executor.submit('alice', pid).result(timeout=30)
+            crashed = executor.submit('alice', crash)
+            after_crash = executor.submit('alice', pid)
+            other_device = executor.submit('bob', greet, '?')
+            with self.assertRaises(WorkerCrashedError):
+                crashed.result(timeout=30)
+            self.assertNotEqual(after_crash.result(timeout=30), first_pid)
+            self.assertEqual(other_device.result(timeout=30), 'bob?')
+            self.assertEqual(executor.restarts('alice'), 1)
+            self.assertEqual(executor.restarts('bob'), 0)
+
+    def test_unpicklable_task_fails_when_submitted(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            with self.assertRaises((pickle.PicklingError, AttributeError, TypeError)):
+                executor.submit('alice', lambda app: None)
+
+    def test_unpicklable_result_fails_the_task(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            with self.assertRaises(RuntimeError):
+                executor.submit('alice', unpicklable_result).result(timeout=30)
+            self.assertEqual(executor.submit('alice', greet, '!').result(timeout=30), 'alice!')
+
+    def test_cancel_pending_tasks(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            running = executor.submit('alice', sleep, 0.5)
+            pending = [executor.submit('alice', greet, '!') for _ in range(3)]
+            self.assertEqual(executor.cancel(), 3)
+            self.assertIsNone(running.result(timeout=30))
+        for future in pending:
+            with self.assertRaises(CancelledError):
+                future.result()
+
+    def test_submit_after_shutdown(self):
+        executor = ProcessDeviceExecutor(FakeApp, ['alice'])
+        executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            executor.submit('alice', greet, '!')
+
+    def test_shutdown_cancels_tasks_queued_without_worker_process(self):
+        worker = _ProcessWorker('alice', FakeApp)
+        future = Future()
+        # as if the tasks were queued after the worker process had died, before a new one was started
+        worker._queue.append((future, pickle.dumps((greet, ('!',), {}))))
+        worker.shutdown(wait_for_tasks=False)
+        self.assertTrue(future.cancelled())
+        self.assertEqual(worker.pending(), [])
+
+    def test_unknown_device(self):
+        with ProcessDeviceExecutor(FakeApp, ['alice']) as executor:
+            with self.assertRaises(ValueError):
+                executor.submit('bob', greet, '!')
+
+
+if __name__ == '__main__':
+    unittest.main()
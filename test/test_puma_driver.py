@@ -0,0 +1,539 @@
+import time
+import unittest
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from selenium.common.exceptions import WebDriverException, TimeoutException
+
+from puma.state_graph.puma_driver import PumaDriver, PumaClickException
+from puma.state_graph.session_registry import SessionRegistry
+from puma.state_graph.waits import PollStrategy
+
+PAGE_SOURCE = '''<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy index="0" class="hierarchy" rotation="0" width="1080" height="2400">
+  <android.widget.FrameLayout index="0" class="android.widget.FrameLayout" text="" resource-id="" bounds="[0,0][1080,2400]">
+    <android.widget.TextView index="0" class="android.widget.TextView" text="Install" resource-id="com.example:id/install" content-desc="" bounds="[100,200][500,300]" />
+    <android.widget.Button index="1" class="android.widget.Button" text="Send" resource-id="com.example:id/send" content-desc="Send message" bounds="[900,2200][1000,2300]" />
+  </android.widget.FrameLayout>
+</hierarchy>'''
+
+FAST_POLLING = PollStrategy(initial_interval=0.01, backoff_factor=1.0, max_interval=0.01)
+
+
+def create_driver(page_source: str = PAGE_SOURCE) -> tuple[PumaDriver, MagicMock, PropertyMock]:
+    """
+    Creates a PumaDriver backed by a mocked Appium driver, so no device or Appium server is needed.
+
+    :return: the PumaDriver, the mocked Appium driver and the mocked page source property
+    """
+    appium_driver = MagicMock()
+    page_source_property = PropertyMock(return_value=page_source)
+    type(appium_driver).page_source = page_source_property
+    with patch('puma.state_graph.session_registry.webdriver.Remote', return_value=appium_driver), \
+            patch('puma.state_graph.puma_driver.AdbDevice'), \
+            patch('puma.state_graph.puma_driver.create_gtl_logger'):
+        driver = PumaDriver('emulator-5554', 'com.example', session_registry=SessionRegistry())
+    return driver, appium_driver, page_source_property
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def test_consecutive_reads_share_one_snapshot(self):
+        driver, appium_driver, page_source = create_driver()
+        self.assertTrue(driver.is_present('//*[@resource-id="com.example:id/install"]'))
+        self.assertTrue(driver.is_present('//*[@text="Send"]'))
+        self.assertFalse(driver.is_present('//*[@text="Update"]'))
+        self.assertEqual(page_source.call_count, 1)
+        appium_driver.find_elements.assert_not_called()
+        self.assertEqual(driver.snapshot_cache_stats.hits, 2)
+        self.assertEqual(driver.snapshot_cache_stats.misses, 1)
+
+    def test_mutating_command_invalidates_snapshot(self):
+        driver, _, page_source = create_driver()
+        driver.is_present('//*[@text="Send"]')
+        driver.back()
+        driver.is_present('//*[@text="Send"]')
+        self.assertEqual(page_source.call_count, 2)
+        self.assertEqual(driver.snapshot_cache_stats.invalidations, 1)
+
+    def test_old_snapshot_expires(self):
+        driver, _, page_source = create_driver()
+        driver.snapshot_max_age = 0
+        driver.is_present('//*[@text="Send"]')
+        driver.is_present('//*[@text="Send"]')
+        self.assertEqual(page_source.call_count, 2)
+
+    def test_snapshot_mode_does_not_expire(self):
+        driver, _, page_source = create_driver()
+        driver.snapshot_max_age = 0
+        with driver.snapshot_mode():
+            driver.is_present('//*[@text="Send"]')
+            driver.is_present('//*[@text="Install"]')
+        self.assertEqual(page_source.call_count, 1)
+
+    def test_wait_queries_device(self):
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.find_elements.return_value = ['element']
+        self.assertTrue(driver.is_present('//*[@text="Send"]', implicit_wait=1))
+        appium_driver.find_elements.assert_called_once()
+        page_source.assert_not_called()
+
+
+    def test_stats_since_copy(self):
+        driver, _, _ = create_driver()
+        driver.is_present('//*[@text="Send"]')
+        stats = driver.copy_stats()
+        driver.is_present('//*[@text="Send"]')
+        driver.invalidate_snapshot()
+        self.assertIn('UI snapshot cache 1 hits, 0 misses (100% hit rate), 1 invalidations', driver.stats_since(stats))
+        self.assertEqual(driver.snapshot_cache_stats.hits, 1)
+        self.assertEqual(driver.snapshot_cache_stats.misses, 1)
+
+    def test_handing_out_web_elements_invalidates_snapshot(self):
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.find_elements.return_value = [MagicMock()]
+        self.assertTrue(driver.is_present('//*[@text="Send"]'))
+        # the caller can change the UI through the element, e.g. by clicking it
+        driver.get_element('//*[@text="Send"]')
+        page_source.return_value = PAGE_SOURCE.replace('Send', 'Sent')
+        self.assertFalse(driver.is_present('//*[@text="Send"]'))
+
+class TestSession(unittest.TestCase):
+    def test_recreated_session_is_used(self):
+        driver, appium_driver, _ = create_driver()
+        new_appium_driver = MagicMock()
+        driver._session.driver = new_appium_driver
+        driver.ensure_session()
+        self.assertIs(driver.driver, new_appium_driver)
+        new_appium_driver.implicitly_wait.assert_called_once_with(0)
+        driver.back()
+        new_appium_driver.press_keycode.assert_called_once_with(4)
+        appium_driver.press_keycode.assert_not_called()
+
+    def test_close_releases_session(self):
+        driver, appium_driver, _ = create_driver()
+        session = driver._session
+        with driver:
+            pass
+        self.assertEqual(session.references, 0)
+        appium_driver.quit.assert_not_called()
+        with self.assertRaises(ConnectionError):
+            driver.is_present('//*[@text="Send"]')
+
+
+class TestPresentMany(unittest.TestCase):
+    def test_all_xpaths_evaluated_on_one_snapshot(self):
+        driver, appium_driver, page_source = create_driver()
+        presence = driver.present_many(['//*[@text="Install"]', '//*[@text="Update"]', '//*[@content-desc="Send message"]'])
+        self.assertEqual(presence, {'//*[@text="Install"]': True, '//*[@text="Update"]': False,
+                                    '//*[@content-desc="Send message"]': True})
+        self.assertEqual(page_source.call_count, 1)
+        appium_driver.find_elements.assert_not_called()
+
+    def test_unsupported_xpaths_combined_in_one_device_query(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.find_elements.return_value = []
+        unsupported = ['//*[unknown-function(@text)]', '//*[other-function(@text)]']
+        presence = driver.present_many(['//*[@text="Send"]'] + unsupported)
+        self.assertEqual(presence, {'//*[@text="Send"]': True, unsupported[0]: False, unsupported[1]: False})
+        appium_driver.find_elements.assert_called_once_with(
+            by='xpath', value='(//*[unknown-function(@text)]) | (//*[other-function(@text)])')
+
+    def test_first_present_respects_order(self):
+        driver, _, page_source = create_driver()
+        self.assertEqual(driver.first_present(['//*[@text="Update"]', '//*[@text="Send"]', '//*[@text="Install"]']),
+                         '//*[@text="Send"]')
+        self.assertEqual(page_source.call_count, 1)
+
+    def test_first_present_polls_until_timeout(self):
+        driver, _, page_source = create_driver()
+        self.assertIsNone(driver.first_present(['//*[@text="Update"]'], timeout=0.2, poll_strategy=FAST_POLLING))
+        self.assertGreater(page_source.call_count, 1)
+
+class TestWaits(unittest.TestCase):
+    def test_wait_until_xpath_refreshes_snapshot(self):
+        driver, _, page_source = create_driver()
+        page_source.side_effect = [PAGE_SOURCE, PAGE_SOURCE.replace('text="Install"', 'text="Update"')]
+        self.assertTrue(driver.wait_until('//*[@text="Update"]', timeout=1, poll_strategy=FAST_POLLING))
+        self.assertEqual(page_source.call_count, 2)
+
+    def test_wait_until_stable(self):
+        driver, _, page_source = create_driver()
+        moving = PAGE_SOURCE.replace('[100,200][500,300]', '[100,100][500,200]')
+        page_source.side_effect = [moving, PAGE_SOURCE, PAGE_SOURCE]
+        self.assertTrue(driver.wait_until_stable(timeout=1, poll_strategy=FAST_POLLING))
+        self.assertEqual(page_source.call_count, 3)
+        # the stable snapshot is kept
+        driver.is_present('//*[@text="Send"]')
+        self.assertEqual(page_source.call_count, 3)
+
+    def test_wait_until_stable_times_out(self):
+        driver, _, page_source = create_driver()
+        page_source.side_effect = lambda: PAGE_SOURCE.replace('Install', str(time.monotonic()))
+        self.assertFalse(driver.wait_until_stable(timeout=0.1, poll_strategy=FAST_POLLING))
+
+
+class TestNativeLocators(unittest.TestCase):
+    def test_simple_xpaths_use_native_strategy(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.find_elements.return_value = [MagicMock()]
+        driver.click('//*[@resource-id="com.example:id/send"]')
+        appium_driver.find_elements.assert_called_once_with(by='id', value='com.example:id/send')
+
+    def test_native_locators_can_be_disabled(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.find_elements.return_value = ['element']
+        driver.use_native_locators = False
+        driver.get_element('//*[@resource-id="com.example:id/send"]')
+        appium_driver.find_elements.assert_called_once_with(by='xpath', value='//*[@resource-id="com.example:id/send"]')
+
+
+class TestLookupRoundTrips(unittest.TestCase):
+    def test_implicit_wait_only_sent_when_changed(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.find_elements.return_value = [MagicMock()]
+        driver.click('//*[@text="Send"]')
+        driver.get_elements('//*[@text="Send"]')
+        appium_driver.implicitly_wait.assert_called_once_with(0)
+
+    def test_click_looks_up_element_once(self):
+        driver, appium_driver, _ = create_driver()
+        element = MagicMock()
+        appium_driver.find_elements.return_value = [element]
+        appium_driver.reset_mock()
+        driver.click('//*[@text="Send"]')
+        # one lookup and one click, instead of setting the implicit wait twice and looking up the element twice
+        appium_driver.find_elements.assert_called_once()
+        appium_driver.find_element.assert_not_called()
+        appium_driver.implicitly_wait.assert_not_called()
+        element.click.assert_called_once()
+
+    def test_lookup_polls_until_element_appears(self):
+        driver, appium_driver, _ = create_driver()
+        element = MagicMock()
+        appium_driver.find_elements.side_effect = [[], [], [element]]
+        self.assertIs(driver.get_element('//*[@text="Send"]'), element)
+        self.assertEqual(appium_driver.find_elements.call_count, 3)
+
+    def test_missing_element_raises_after_timeout(self):
+        driver, appium_driver, _ = create_driver()
+        driver.implicit_wait = 0
+        appium_driver.find_elements.return_value = []
+        with self.assertRaises(PumaClickException):
+            driver.click('//*[@text="Missing"]')
+        self.assertEqual(appium_driver.find_elements.call_count, 3)
+
+class TestBoundsCache(unittest.TestCase):
+    SEND = '//*[@content-desc="Send message"]'
+
+    def click_twice(self, second_page_source: str = PAGE_SOURCE) -> tuple[PumaDriver, MagicMock]:
+        driver, appium_driver, page_source = create_driver()
+        page_source.side_effect = [PAGE_SOURCE, second_page_source]
+        appium_driver.find_elements.return_value = [MagicMock()]
+        driver.is_present(self.SEND)
+        driver.click(self.SEND)
+        # e.g. validating the state takes a fresh snapshot
+        driver.is_present(self.SEND)
+        appium_driver.reset_mock()
+        driver.click(self.SEND)
+        return driver, appium_driver
+
+    def test_repeated_click_taps_cached_coordinates(self):
+        driver, appium_driver = self.click_twice()
+        appium_driver.find_elements.assert_not_called()
+        appium_driver.tap.assert_called_once_with([(950, 2250)], duration=None)
+        self.assertEqual(driver.bounds_cache.stats.hits, 1)
+        driver.gtl_logger.info.assert_any_call('Tapping on coordinates (950, 2250)')
+
+    def test_no_snapshot_is_taken_for_cached_bounds(self):
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.find_elements.return_value = [MagicMock()]
+        driver.is_present(self.SEND)
+        driver.click(self.SEND)
+        appium_driver.reset_mock()
+        page_source.reset_mock()
+        driver.click(self.SEND)
+        page_source.assert_not_called()
+        appium_driver.find_elements.assert_called_once()
+
+    def test_moved_element_is_looked_up(self):
+        driver, appium_driver = self.click_twice(PAGE_SOURCE.replace('[900,2200][1000,2300]', '[900,1200][1000,1300]'))
+        appium_driver.find_elements.assert_called_once()
+        appium_driver.tap.assert_not_called()
+        self.assertEqual(driver.bounds_cache.stats.stale, 1)
+
+    def test_rotation_invalidates_cache(self):
+        driver, appium_driver = self.click_twice(PAGE_SOURCE.replace('rotation="0"', 'rotation="1"'))
+        appium_driver.find_elements.assert_called_once()
+        self.assertEqual(driver.bounds_cache.stats.hits, 0)
+
+    def test_cache_is_per_state(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.find_elements.return_value = [MagicMock()]
+        driver.is_present(self.SEND)
+        driver.click(self.SEND)
+        driver.ui_state = 'other_state'
+        driver.is_present(self.SEND)
+        appium_driver.reset_mock()
+        driver.click(self.SEND)
+        appium_driver.find_elements.assert_called_once()
+
+
+class TestInputBackend(unittest.TestCase):
+    def test_input_sent_through_appium_by_default(self):
+        driver, appium_driver, _ = create_driver()
+        driver.back()
+        appium_driver.press_keycode.assert_called_once_with(4)
+
+    def test_adb_input(self):
+        driver, appium_driver, page_source = create_driver()
+        driver.use_adb_input()
+        driver.input.shell = MagicMock()
+        driver.input.shell.run.return_value = []
+        driver.is_present('//*[@text="Send"]')
+        with driver.input_batch():
+            driver.press_backspace()
+            driver.press_backspace()
+            driver.press_enter()
+        driver.input.shell.run.assert_called_once_with(['input keyevent 67 67 66'])
+        appium_driver.press_keycode.assert_not_called()
+        driver.is_present('//*[@text="Send"]')
+        self.assertEqual(page_source.call_count, 2)
+
+
+class TestExtract(unittest.TestCase):
+    def test_records_read_from_one_snapshot(self):
+        driver, appium_driver, page_source = create_driver()
+        records = driver.extract('//*[@resource-id!=""]', ['text', 'bounds'])
+        self.assertEqual([record.text for record in records], ['Install', 'Send'])
+        self.assertEqual(records[1].bounds.point(), (950, 2250))
+        self.assertEqual(page_source.call_count, 1)
+        appium_driver.find_elements.assert_not_called()
+
+    def test_unsupported_xpath_reads_attributes_from_device(self):
+        driver, appium_driver, _ = create_driver()
+        element = MagicMock()
+        element.get_attribute.side_effect = lambda attribute: {'text': 'Send', 'checked': 'false'}[attribute]
+        appium_driver.find_elements.return_value = [element]
+        records = driver.extract('//*[unknown-function(@text)]', ['text', 'checked'])
+        self.assertEqual(records[0].text, 'Send')
+        self.assertFalse(records[0].checked)
+
+
+
+def list_page_source(*names: str) -> str:
+    rows = ''.join(f'<android.widget.TextView text="{name}" resource-id="com.example:id/name" '
+                   f'bounds="[0,{100 * i}][1080,{100 * (i + 1)}]" />' for i, name in enumerate(names))
+    return f'<hierarchy rotation="0" width="1080" height="2400"><android.widget.ListView>{rows}</android.widget.ListView></hierarchy>'
+
+
+class TestScrollCollect(unittest.TestCase):
+    NAMES = '//*[@resource-id="com.example:id/name"]'
+
+    def create_scrolling_driver(self, *screens: str) -> tuple[PumaDriver, MagicMock]:
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.get_window_size.return_value = {'width': 1080, 'height': 2400}
+        # the screen changes with every swipe, until the end of the list
+        page_source.side_effect = lambda: screens[min(appium_driver.swipe.call_count, len(screens) - 1)]
+        patcher = patch.object(driver, 'wait_until_stable')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return driver, appium_driver
+
+    def test_stops_at_end_of_list(self):
+        driver, appium_driver = self.create_scrolling_driver(list_page_source('Alice', 'Bob', 'Carol'),
+                                                             list_page_source('Bob', 'Carol', 'Dave'))
+        names = [record.text for record in driver.scroll_collect(self.NAMES, max_swipes=10)]
+        self.assertEqual(names, ['Alice', 'Bob', 'Carol', 'Dave'])
+        self.assertEqual(appium_driver.swipe.call_count, 2)
+
+    def test_identical_elements_at_different_positions_are_kept(self):
+        driver, _ = self.create_scrolling_driver(list_page_source('Mom', 'Bob', 'Carol'),
+                                                 list_page_source('Carol', 'Mom', 'Dave'))
+        names = [record.text for record in driver.scroll_collect(self.NAMES, attributes=['text'])]
+        self.assertEqual(names, ['Mom', 'Bob', 'Carol', 'Mom', 'Dave'])
+
+    def test_stops_at_max_swipes(self):
+        screens = [list_page_source(f'Contact {i}', f'Contact {i + 1}') for i in range(10)]
+        driver, appium_driver = self.create_scrolling_driver(*screens)
+        names = [record.text for record in driver.scroll_collect(self.NAMES, max_swipes=2)]
+        self.assertEqual(names, ['Contact 0', 'Contact 1', 'Contact 2', 'Contact 3'])
+        self.assertEqual(appium_driver.swipe.call_count, 2)
+
+    def test_early_exit(self):
+        driver, appium_driver = self.create_scrolling_driver(list_page_source('Alice', 'Bob'),
+                                                             list_page_source('Carol', 'Dave'))
+        records = list(driver.scroll_collect(self.NAMES, stop_when=lambda record: record.text == 'Carol'))
+        self.assertEqual([record.text for record in records], ['Alice', 'Bob', 'Carol'])
+        self.assertEqual(appium_driver.swipe.call_count, 1)
+
+    def test_generator_is_lazy(self):
+        driver, appium_driver = self.create_scrolling_driver(list_page_source('Alice'), list_page_source('Bob'))
+        self.assertEqual(next(driver.scroll_collect(self.NAMES)).text, 'Alice')
+        appium_driver.swipe.assert_not_called()
+
+    def test_swipe_to_find_records(self):
+        driver, _ = self.create_scrolling_driver(list_page_source('Alice', 'Bob'), list_page_source('Bob', 'Carol'))
+        records = driver.swipe_to_find_records(self.NAMES, num_swipes=4, attributes=['text'])
+        self.assertEqual([record.text for record in records], ['Alice', 'Bob', 'Carol'])
+
+    def test_swipe_to_find_records_without_results(self):
+        driver, _ = self.create_scrolling_driver(list_page_source())
+        with self.assertRaises(PumaClickException):
+            driver.swipe_to_find_records(self.NAMES, num_swipes=4)
+
+    def test_swipe_to_find_elements_returns_web_elements(self):
+        driver, appium_driver = self.create_scrolling_driver(list_page_source('Alice'))
+        alice, bob = MagicMock(), MagicMock()
+        appium_driver.find_elements.side_effect = [[alice], [alice, bob]]
+        self.assertEqual(driver.swipe_to_find_elements(self.NAMES, num_swipes=2), [alice, bob])
+
+
+class TestSwipeToFindElement(unittest.TestCase):
+    def test_native_scrolling_is_a_single_request(self):
+        driver, appium_driver, _ = create_driver()
+        element = MagicMock()
+        appium_driver.find_elements.return_value = [element]
+        self.assertIs(driver.swipe_to_find_element('//*[@text="Leave group"]'), element)
+        appium_driver.find_elements.assert_called_once()
+        self.assertIn('UiScrollable', appium_driver.find_elements.call_args.kwargs['value'])
+        appium_driver.swipe.assert_not_called()
+
+    def test_falls_back_to_swiping(self):
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.get_window_size.return_value = {'width': 1080, 'height': 2400}
+        element = MagicMock()
+        appium_driver.find_elements.side_effect = [[], [element]]
+        page_source.side_effect = lambda: PAGE_SOURCE.replace('Send', 'Leave group') if appium_driver.swipe.called \
+            else PAGE_SOURCE
+        with patch.object(driver, 'wait_until_stable'):
+            self.assertIs(driver.swipe_to_find_element('//*[@text="Leave group"]'), element)
+        self.assertEqual(appium_driver.swipe.call_count, 1)
+
+    def test_swipes_back_up_after_native_scrolling_reached_the_end(self):
+        driver, appium_driver, page_source = create_driver()
+        appium_driver.get_window_size.return_value = {'width': 1080, 'height': 2400}
+        element = MagicMock()
+        results = iter([[], [element]])
+
+        def find_elements(by, value):
+            result = next(results)
+            if not result:
+                # the UiScrollable scrolled to the end of the list without finding the element
+                page_source.return_value = PAGE_SOURCE.replace('Send', 'End of list')
+            return result
+
+        appium_driver.find_elements.side_effect = find_elements
+        appium_driver.swipe.side_effect = lambda *args: setattr(page_source, 'return_value',
+                                                                PAGE_SOURCE.replace('Send', 'Leave group'))
+        with patch.object(driver, 'wait_until_stable'):
+            self.assertIs(driver.swipe_to_find_element('//*[@text="Leave group"]'), element)
+        self.assertEqual(appium_driver.swipe.call_count, 1)
+        _, start_y, _, end_y, _ = appium_driver.swipe.call_args.args
+        self.assertLess(start_y, end_y)
+
+    def test_complex_xpath_is_swiped_for(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.get_window_size.return_value = {'width': 1080, 'height': 2400}
+        with patch.object(driver, 'wait_until_stable'), self.assertRaises(PumaClickException):
+            driver.swipe_to_find_element('//*[contains(@text, "Leave")]', max_swipes=2)
+        appium_driver.find_elements.assert_not_called()
+        self.assertEqual(appium_driver.swipe.call_count, 2)
+
+
+class TestClickChain(unittest.TestCase):
+    XPATHS = ['//*[@resource-id="com.example:id/install"]', '//*[@text="Send"]']
+
+    def test_chain_runs_in_one_request(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.execute_driver.return_value = MagicMock(result={'completed': 2, 'error': None})
+        driver.click_chain(self.XPATHS)
+        appium_driver.execute_driver.assert_called_once()
+        appium_driver.find_elements.assert_not_called()
+
+    def test_failing_step_is_reported(self):
+        driver, appium_driver, _ = create_driver()
+        appium_driver.execute_driver.return_value = MagicMock(result={'completed': 1, 'error': 'element not found'})
+        with self.assertRaisesRegex(PumaClickException, 'element 2 of 2 with xpath //\\*\\[@text="Send"]'):
+            driver.click_chain(self.XPATHS)
+
+    def test_falls_back_to_separate_clicks(self):
+        driver, appium_driver, _ = create_driver()
+        driver.use_bounds_cache = False
+        appium_driver.execute_driver.side_effect = WebDriverException('execute_driver_script is not enabled')
+        element = MagicMock()
+        appium_driver.find_elements.return_value = [element]
+        driver.click_chain(self.XPATHS)
+        self.assertEqual(element.click.call_count, 2)
+        self.assertFalse(driver.use_driver_scripts)
+        driver.click_chain(self.XPATHS)
+        appium_driver.execute_driver.assert_called_once()
+
+    def test_failure_after_start_is_not_clicked_again(self):
+        driver, appium_driver, _ = create_driver(PAGE_SOURCE.replace('Send', 'Sending'))
+        appium_driver.execute_driver.side_effect = TimeoutException('script timed out')
+        with self.assertRaisesRegex(PumaClickException, 'element 1 of 2 .* script timed out'):
+            driver.click_chain(self.XPATHS)
+        appium_driver.find_elements.assert_not_called()
+        self.assertTrue(driver.use_driver_scripts)
+
+
+class TestSendKeys(unittest.TestCase):
+    def create_driver_with_text_box(self) -> tuple[PumaDriver, MagicMock, MagicMock]:
+        driver, appium_driver, _ = create_driver()
+        element = MagicMock(id='element-1')
+        appium_driver.find_elements.return_value = [element]
+        return driver, appium_driver, element
+
+    def test_default_strategy_sends_keys(self):
+        driver, appium_driver, element = self.create_driver_with_text_box()
+        element.text = 'hello'
+        driver.send_keys('//*[@text="Send"]', 'hello')
+        element.send_keys.assert_called_once_with('hello')
+        self.assertEqual(driver.text_entry_stats['send_keys'].entries, 1)
+        self.assertEqual(driver.text_entry_stats['send_keys'].characters, 5)
+
+    def test_falls_back_when_text_does_not_match(self):
+        driver, appium_driver, element = self.create_driver_with_text_box()
+        type(element).text = PropertyMock(side_effect=['', 'hello'])
+        driver.send_keys('//*[@text="Send"]', 'hello', strategies=['set_value', 'send_keys'], verify=True)
+        appium_driver.execute_script.assert_called_once()
+        element.send_keys.assert_called_once_with('hello')
+        self.assertEqual(driver.text_entry_stats['set_value'].failures, 1)
+        self.assertEqual(driver.text_entry_stats['send_keys'].entries, 1)
+
+    def test_falls_back_when_strategy_fails(self):
+        driver, appium_driver, element = self.create_driver_with_text_box()
+        element.text = 'hello'
+        appium_driver.execute_script.side_effect = WebDriverException('unknown command')
+        driver.send_keys('//*[@text="Send"]', 'hello', strategies=['set_value', 'send_keys'])
+        element.send_keys.assert_called_once_with('hello')
+
+    def test_raises_when_no_strategy_works(self):
+        driver, appium_driver, element = self.create_driver_with_text_box()
+        element.send_keys.side_effect = WebDriverException('not an input field')
+        with self.assertRaises(PumaClickException):
+            driver.send_keys('//*[@text="Send"]', 'hello')
+
+    def test_raises_when_text_does_not_match(self):
+        driver, _, element = self.create_driver_with_text_box()
+        element.text = '+31 6 12345678'
+        with self.assertRaisesRegex(PumaClickException, 'contains "\\+31 6 12345678"'):
+            driver.send_keys('//*[@text="Send"]', '+31612345678', strategies=['send_keys'], verify=True)
+        self.assertEqual(driver.text_entry_stats['send_keys'].failures, 1)
+
+    def test_text_is_not_read_back_by_default(self):
+        driver, _, element = self.create_driver_with_text_box()
+        text = PropertyMock(return_value='https://www.example.com/')
+        type(element).text = text
+        driver.send_keys('//*[@text="Send"]', 'example.com', strategies=['send_keys'])
+        element.send_keys.assert_called_once_with('example.com')
+        text.assert_not_called()
+        self.assertEqual(driver.text_entry_stats['send_keys'].entries, 1)
+
+    def test_unknown_strategy(self):
+        driver, _, _ = self.create_driver_with_text_box()
+        with self.assertRaises(ValueError):
+            driver.send_keys('//*[@text="Send"]', 'hello', strategies=['telepathy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
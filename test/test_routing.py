@@ -0,0 +1,65 @@
+import random
+import unittest
+from collections import deque
+
+from puma.state_graph.routing import RoutingTable
+from puma.state_graph.state import State, Transition
+from test.state_helpers import create_states
+
+
+def shortest_path(start: State, destination: State) -> list[Transition] | None:
+    # reference implementation: a plain breadth-first search, following transitions in the order they were defined
+    visited = set()
+    queue = deque([(start, [])])
+    while queue:
+        state, path = queue.popleft()
+        if state == destination:
+            return path
+        if state in visited:
+            continue
+        visited.add(state)
+        for transition in state.transitions:
+            queue.append((transition.to_state, path + [transition]))
+    return None
+
+
+class TestRoutingTable(unittest.TestCase):
+    def test_next_hop_and_route(self):
+        home, chat, settings, profile = create_states(['home', 'chat', 'settings', 'profile'])
+        home.to(chat, None)
+        home.to(settings, None)
+        settings.to(profile, None)
+        chat.to(home, None)
+        settings.to(home, None)
+        profile.to(settings, None)
+        table = RoutingTable([home, chat, settings, profile])
+
+        self.assertIs(table.next_hop(chat, profile).to_state, home)
+        self.assertIs(table.next_hop('chat', 'profile').to_state, home)
+        self.assertEqual([t.to_state for t in table.route(chat, profile)], [home, settings, profile])
+        self.assertEqual(table.route(home, home), [])
+        self.assertIsNone(table.next_hop(home, home))
+
+    def test_unreachable_destination(self):
+        home, chat = create_states(['home', 'chat'])
+        home.to(chat, None)
+        table = RoutingTable([home, chat])
+        self.assertIsNone(table.next_hop(chat, home))
+        self.assertIsNone(table.route(chat, home))
+        self.assertEqual(list(table.iter_route(chat, home)), [])
+
+    def test_routes_equal_breadth_first_search(self):
+        rng = random.Random(42)
+        states = create_states([f'state{i}' for i in range(40)])
+        for state in states:
+            for to_state in rng.sample(states, 3):
+                if to_state is not state:
+                    state.to(to_state, None)
+        table = RoutingTable(states)
+        for start in states:
+            for destination in states:
+                self.assertEqual(table.route(start, destination), shortest_path(start, destination))
+
+
+if __name__ == '__main__':
+    unittest.main()
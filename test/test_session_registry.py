@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch, PropertyMock
+
+from selenium.common.exceptions import InvalidSessionIdException
+from urllib3.exceptions import MaxRetryError
+
+from puma.state_graph.session_registry import SessionRegistry, AppiumConnectionError
+
+SERVER = 'http://localhost:4723'
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def setUp(self):
+        patcher = patch('puma.state_graph.session_registry.webdriver.Remote', side_effect=lambda *args, **kwargs: MagicMock())
+        self.remote = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sessions_are_shared_per_device(self):
+        registry = SessionRegistry()
+        alice = registry.acquire(SERVER, 'alice', MagicMock())
+        self.assertIs(registry.acquire(SERVER, 'alice', MagicMock()), alice)
+        bob = registry.acquire(SERVER, 'bob', MagicMock())
+        self.assertIsNot(bob.driver, alice.driver)
+        self.assertEqual(alice.references, 2)
+        self.assertEqual(self.remote.call_count, 2)
+
+    def test_released_sessions_are_kept_until_idle(self):
+        registry = SessionRegistry(idle_timeout=0.05)
+        session = registry.acquire(SERVER, 'alice', MagicMock())
+        driver = session.driver
+        registry.release(session)
+        self.assertEqual(len(registry), 1)
+        time.sleep(0.1)
+        registry.evict_idle()
+        self.assertEqual(len(registry), 0)
+        driver.quit.assert_called_once()
+
+    def test_referenced_sessions_are_not_evicted(self):
+        registry = SessionRegistry(idle_timeout=0)
+        session = registry.acquire(SERVER, 'alice', MagicMock())
+        time.sleep(0.01)
+        registry.evict_idle()
+        self.assertIsNotNone(session.driver)
+        session.driver.quit.assert_not_called()
+
+    def test_least_recently_used_session_is_evicted(self):
+        registry = SessionRegistry(max_sessions=2)
+        sessions = [registry.acquire(SERVER, udid, MagicMock()) for udid in ['alice', 'bob', 'carol']]
+        self.assertEqual(len(registry), 3)
+        registry.release(sessions[1])
+        registry.release(sessions[0])
+        self.assertEqual(len(registry), 2)
+        self.assertIsNone(sessions[1].driver)
+        self.assertIsNotNone(sessions[0].driver)
+
+    def test_dead_session_is_recreated(self):
+        registry = SessionRegistry()
+        session = registry.acquire(SERVER, 'alice', MagicMock())
+        dead_driver = session.driver
+        type(dead_driver).current_package = PropertyMock(side_effect=InvalidSessionIdException('session is gone'))
+        self.assertTrue(registry.ensure_healthy(session, force=True))
+        self.assertIsNot(session.driver, dead_driver)
+        self.assertFalse(registry.ensure_healthy(session, force=True))
+
+    def test_health_is_not_probed_too_often(self):
+        registry = SessionRegistry(health_check_interval=60)
+        session = registry.acquire(SERVER, 'alice', MagicMock())
+        type(session.driver).current_package = PropertyMock(side_effect=InvalidSessionIdException('session is gone'))
+        self.assertFalse(registry.ensure_healthy(session))
+
+    def test_connection_failure_raises(self):
+        self.remote.side_effect = MaxRetryError(None, SERVER)
+        registry = SessionRegistry()
+        with self.assertRaises(AppiumConnectionError):
+            registry.acquire(SERVER, 'alice', MagicMock())
+        self.assertEqual(len(registry), 1)
+        self.remote.side_effect = lambda *args, **kwargs: MagicMock()
+        self.assertIsNotNone(registry.acquire(SERVER, 'alice', MagicMock()).driver)
+
+    def test_concurrent_acquire_creates_one_session(self):
+        def slow_remote(*args, **kwargs):
+            time.sleep(0.05)
+            return MagicMock()
+        self.remote.side_effect = slow_remote
+        registry = SessionRegistry()
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(registry.acquire(SERVER, 'alice', MagicMock())))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.remote.call_count, 1)
+        self.assertEqual(sessions[0].references, 5)
+
+    def test_warm_up_creates_sessions_in_parallel(self):
+        def slow_remote(*args, **kwargs):
+            time.sleep(0.2)
+            return MagicMock()
+        self.remote.side_effect = slow_remote
+        registry = SessionRegistry()
+        udids = [f'device-{i}' for i in range(10)]
+        start = time.monotonic()
+        errors = registry.warm_up(SERVER, {udid: MagicMock() for udid in udids})
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(errors, {})
+        self.assertEqual(len(registry), 10)
+        session = registry.acquire(SERVER, 'device-0', MagicMock())
+        self.assertEqual(session.references, 1)
+        self.assertEqual(self.remote.call_count, 10)
+
+    def test_warm_up_reports_failures(self):
+        def remote(server, options):
+            if options == 'bad':
+                raise MaxRetryError(None, server)
+            return MagicMock()
+        self.remote.side_effect = remote
+        errors = SessionRegistry().warm_up(SERVER, {'alice': 'good', 'bob': 'bad'})
+        self.assertEqual(list(errors), ['bob'])
+        self.assertIsInstance(errors['bob'], AppiumConnectionError)
+
+    def test_close(self):
+        with SessionRegistry() as registry:
+            session = registry.acquire(SERVER, 'alice', MagicMock())
+            driver = session.driver
+        driver.quit.assert_called_once()
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
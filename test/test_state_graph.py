@@ -1,7 +1,8 @@
 import unittest
+from unittest.mock import Mock, patch
 
-from puma.state_graph.puma_driver import PumaDriver
-from puma.state_graph.state import State, ContextualState
+from puma.state_graph.puma_driver import PumaDriver, PumaClickException
+from puma.state_graph.state import State, ContextualState, SimpleState
 from puma.state_graph.state_graph import StateGraphMeta, StateGraph
 
 
@@ -83,6 +84,33 @@ class TestStateGraphMeta(unittest.TestCase):
         with self.assertRaises(ValueError):
             StateGraphMeta._validate_graph(states)
 
+    def test_validate_graph_states_not_reachable_from_initial_state(self):
+        # Create an invalid state graph with a state that can only go to the initial state
+        state1 = TestState(id="State1", initial_state=True)
+        state2 = TestState(id="State2")
+        state3 = TestState(id="State3")
+        state1.to(state2, None)
+        state2.to(state1, None)
+        state3.to(state1, None)
+        states = [state1, state2, state3]
+        with self.assertRaises(ValueError) as error:
+            StateGraphMeta._validate_graph(states)
+        self.assertIn('Missing transitions: [State3]', str(error.exception))
+        self.assertIn('Missing parent states: []', str(error.exception))
+
+    def test_validate_graph_unreachable_states_error_message(self):
+        state1 = TestState(id="State1", initial_state=True)
+        state2 = TestState(id="State2")
+        state3 = TestState(id="State3")
+        state1.to(state2, None)
+        state2.to(state1, None)
+        state2.to(state3, None)
+        states = [state1, state2, state3]
+        with self.assertRaises(ValueError) as error:
+            StateGraphMeta._validate_graph(states)
+        self.assertIn('Missing transitions: []', str(error.exception))
+        self.assertIn('Missing parent states: [State3]', str(error.exception))
+
     def test_validate_graph_contextual_state_without_parent(self):
         # Create an invalid state graph with a ContextualState without a parent
         state1 = TestState(id="State1", initial_state=True)
@@ -115,6 +143,79 @@ class TestStateGraphMeta(unittest.TestCase):
             StateGraphMeta._validate_graph(states)
 
 
+class CountingState(SimpleState):
+    def __init__(self, **kwargs):
+        super().__init__(xpaths=['xpath'], **kwargs)
+        self.validations = 0
+        self.valid = True
+
+    def validate(self, driver: PumaDriver) -> bool:
+        self.validations += 1
+        return self.valid
+
+
+class DeepApplication(StateGraph):
+    conversations_state = CountingState(initial_state=True)
+    calls_state = CountingState(parent_state=conversations_state)
+    call_history_state = CountingState(parent_state=calls_state)
+    voice_call_state = CountingState(parent_state=call_history_state)
+
+    conversations_state.to(calls_state, lambda: None)
+    calls_state.to(call_history_state, lambda: None)
+    call_history_state.to(voice_call_state, lambda: None)
+
+    # don't call super.__init__ so we do not try to connect to a real device
+    def __init__(self):
+        self.current_state = self.initial_state
+        self.driver = Mock()
+        self.gtl_logger = Mock()
+        self.try_restart = True
+        # states are shared between instances, so reset them
+        for state in self.states:
+            state.validations = 0
+            state.valid = True
+            state.__dict__.pop('validate', None)
+
+
+class TestOptimisticNavigation(unittest.TestCase):
+    def test_step_by_step_navigation_validates_every_state(self):
+        application = DeepApplication()
+        application.go_to_state(application.voice_call_state)
+        self.assertIs(application.current_state, application.voice_call_state)
+        self.assertEqual(application.calls_state.validations, 1)
+        self.assertEqual(application.call_history_state.validations, 1)
+
+    def test_optimistic_navigation_validates_destination_only(self):
+        application = DeepApplication()
+        application.optimistic_navigation = True
+        application.go_to_state(application.voice_call_state)
+        self.assertIs(application.current_state, application.voice_call_state)
+        self.assertEqual(application.calls_state.validations, 0)
+        self.assertEqual(application.call_history_state.validations, 0)
+        self.assertEqual(application.voice_call_state.validations, 1)
+
+    def test_optimistic_navigation_falls_back_when_destination_invalid(self):
+        application = DeepApplication()
+        application.optimistic_navigation = True
+        application.voice_call_state.validate = Mock(side_effect=[False, True])
+        application.go_to_state(application.voice_call_state)
+        self.assertIs(application.current_state, application.voice_call_state)
+        # validated once after the optimistic navigation, and once more when validating step by step
+        self.assertEqual(application.voice_call_state.validate.call_count, 2)
+
+    def test_optimistic_navigation_falls_back_when_transition_fails(self):
+        application = DeepApplication()
+        application.optimistic_navigation = True
+        transition = application.calls_state.transitions[-1]
+        transition.ui_actions = Mock(side_effect=[PumaClickException('not found'), None], __name__='failing')
+        try:
+            application.go_to_state(application.voice_call_state)
+        finally:
+            transition.ui_actions = lambda: None
+        self.assertIs(application.current_state, application.voice_call_state)
+        self.assertEqual(application.calls_state.validations, 1)
+
+
 class TestStateGraph(unittest.TestCase):
     def test_invalid_package_name(self):
         with self.assertRaises(ValueError) as error:
@@ -125,5 +226,37 @@ class TestStateGraph(unittest.TestCase):
         self.assertEquals('The provided package name is invalid: ', str(error.exception))
 
 
+
+class LazyApplication(StateGraph):
+    connect_lazily = True
+    home_state = TestState(id="Home", initial_state=True)
+    settings_state = TestState(id="Settings")
+    home_state.to(settings_state, lambda: None)
+    settings_state.to(home_state, lambda: None)
+
+
+class TestLazyConnection(unittest.TestCase):
+    @patch('puma.state_graph.state_graph.TransitionCostModel')
+    @patch('puma.state_graph.state_graph.PumaDriver')
+    def test_connects_on_first_use(self, puma_driver, _):
+        application = LazyApplication('emulator-5554', 'com.example')
+        puma_driver.assert_not_called()
+        self.assertIs(application.driver, puma_driver.return_value)
+        self.assertIs(application.gtl_logger, puma_driver.return_value.gtl_logger)
+        self.assertEqual(application.driver.ui_state, application.home_state.id)
+        puma_driver.assert_called_once_with('emulator-5554', 'com.example', appium_server='http://localhost:4723',
+                                            desired_capabilities=None)
+
+    @patch('puma.state_graph.state_graph.TransitionCostModel')
+    @patch('puma.state_graph.state_graph.PumaDriver')
+    def test_close(self, puma_driver, _):
+        with LazyApplication('emulator-5554', 'com.example'):
+            pass
+        puma_driver.assert_not_called()
+        with LazyApplication('emulator-5554', 'com.example') as application:
+            application.connect()
+        puma_driver.return_value.close.assert_called_once()
+
+
 if __name__ == '__main__':
     unittest.main()
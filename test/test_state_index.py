@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+
+from puma.state_graph.state import SimpleState
+from puma.state_graph.state_graph import StateGraph
+from puma.state_graph.ui_snapshot import UiSnapshot
+
+PAGE_SOURCE = '''<hierarchy>
+  <android.widget.TextView text="Chats" resource-id="com.example:id/title" />
+  <android.widget.ImageButton content-desc="New chat" />
+  <android.widget.TextView text="Archived" />
+</hierarchy>'''
+
+CHATS_TITLE = '//*[@text="Chats"]'
+NEW_CHAT = '//*[@content-desc="New chat"]'
+ARCHIVED = '//*[@text="Archived"]'
+SETTINGS_TITLE = '//*[@text="Settings"]'
+SEARCH_BAR = '//android.widget.EditText'
+
+
+class MockApplication(StateGraph):
+    conversations_state = SimpleState([CHATS_TITLE, NEW_CHAT], invalid_xpaths=[SEARCH_BAR], initial_state=True)
+    archived_state = SimpleState([CHATS_TITLE, ARCHIVED], parent_state=conversations_state)
+    settings_state = SimpleState([SETTINGS_TITLE, NEW_CHAT], parent_state=conversations_state)
+    search_state = SimpleState([CHATS_TITLE, SEARCH_BAR], parent_state=conversations_state)
+
+    conversations_state.to(archived_state, lambda: None)
+    conversations_state.to(settings_state, lambda: None)
+    conversations_state.to(search_state, lambda: None)
+
+
+def create_driver(page_source: str) -> MagicMock:
+    driver = MagicMock()
+    driver.snapshot_mode.return_value.__enter__.return_value = UiSnapshot(page_source)
+    return driver
+
+
+class TestStateIndex(unittest.TestCase):
+    def test_index_built_at_class_creation(self):
+        index = MockApplication.state_index
+        self.assertEqual(index.required_by[CHATS_TITLE],
+                         [MockApplication.conversations_state, MockApplication.archived_state, MockApplication.search_state])
+        self.assertEqual(index.forbidden_by[SEARCH_BAR], [MockApplication.conversations_state])
+        self.assertEqual(len(index.xpaths), 5)
+
+    def test_each_xpath_evaluated_once_on_one_snapshot(self):
+        driver = create_driver(PAGE_SOURCE)
+        snapshot = driver.snapshot_mode.return_value.__enter__.return_value
+        snapshot.is_present = MagicMock(wraps=snapshot.is_present)
+        MockApplication.state_index.identify(driver)
+        driver.snapshot_mode.assert_called_once()
+        self.assertEqual(snapshot.is_present.call_count, 5)
+        driver.is_present.assert_not_called()
+
+    def test_ambiguous_identification(self):
+        identification = MockApplication.state_index.identify(create_driver(PAGE_SOURCE))
+        self.assertTrue(identification.ambiguous)
+        self.assertIsNone(identification.state)
+        self.assertEqual(identification.matches, [MockApplication.conversations_state, MockApplication.archived_state])
+        self.assertIn('More than one state matches the current UI', identification.describe())
+
+    def test_unique_identification(self):
+        page_source = PAGE_SOURCE.replace('text="Archived"', 'text="Other"')
+        identification = MockApplication.state_index.identify(create_driver(page_source))
+        self.assertIs(identification.state, MockApplication.conversations_state)
+
+    def test_invalid_xpath_rules_out_state(self):
+        page_source = PAGE_SOURCE.replace('<android.widget.TextView text="Archived" />', '<android.widget.EditText />')
+        identification = MockApplication.state_index.identify(create_driver(page_source))
+        self.assertIs(identification.state, MockApplication.search_state)
+        conversations_score = next(s for s in identification.scores if s.state is MockApplication.conversations_state)
+        self.assertEqual(conversations_score.forbidden_xpaths, [SEARCH_BAR])
+
+    def test_no_match_reports_closest_states(self):
+        page_source = '<hierarchy><android.widget.TextView text="Settings" /></hierarchy>'
+        identification = MockApplication.state_index.identify(create_driver(page_source))
+        self.assertEqual(identification.matches, [])
+        self.assertIs(identification.scores[0].state, MockApplication.settings_state)
+        self.assertEqual(identification.scores[0].missing_xpaths, [NEW_CHAT])
+        self.assertIn('Closest states: settings_state (50% of required XPaths present', identification.describe())
+
+
+if __name__ == '__main__':
+    unittest.main()
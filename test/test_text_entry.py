@@ -0,0 +1,42 @@
+import base64
+import unittest
+from unittest.mock import MagicMock
+
+from puma.state_graph.text_entry import adb_ime, clipboard, set_value, TextEntryUnavailableError, KEYCODE_PASTE, \
+    TextEntryStats
+
+
+class TestTextEntryStrategies(unittest.TestCase):
+    def test_set_value_is_one_request(self):
+        driver, element = MagicMock(), MagicMock(id='element-1')
+        set_value(driver, element, 'hello')
+        driver.driver.execute_script.assert_called_once_with('mobile: replaceElementValue',
+                                                             {'elementId': 'element-1', 'text': 'hello'})
+
+    def test_clipboard_pastes(self):
+        driver, element = MagicMock(), MagicMock()
+        clipboard(driver, element, 'héllo 👋')
+        driver.driver.set_clipboard_text.assert_called_once_with('héllo 👋')
+        element.clear.assert_called_once()
+        driver.input.key_event.assert_called_once_with(KEYCODE_PASTE)
+
+    def test_adb_ime_broadcasts_base64(self):
+        driver = MagicMock()
+        driver.adb_shell.run.return_value = []
+        adb_ime(driver, MagicMock(), 'héllo 👋')
+        command = driver.adb_shell.run.call_args.args[0][0]
+        self.assertIn(f"--es msg {base64.b64encode('héllo 👋'.encode()).decode()}", command)
+
+    def test_adb_ime_unavailable(self):
+        driver = MagicMock()
+        driver.adb_shell.run.return_value = ['unavailable']
+        with self.assertRaises(TextEntryUnavailableError):
+            adb_ime(driver, MagicMock(), 'hello')
+
+    def test_chars_per_second(self):
+        self.assertEqual(TextEntryStats(entries=2, characters=100, duration=0.5).chars_per_second, 200)
+        self.assertEqual(TextEntryStats().chars_per_second, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
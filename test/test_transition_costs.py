@@ -0,0 +1,113 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from puma.state_graph.routing import RoutingTable
+from puma.state_graph.transition_costs import TransitionCostModel
+from test.state_helpers import create_states
+
+
+class TestTransitionCostModel(unittest.TestCase):
+    def setUp(self):
+        # apps tab -> app page directly (slow intent), or apps tab -> profile -> app page
+        self.apps_tab, self.profile, self.app_page = create_states(['apps_tab', 'profile', 'app_page'])
+        self.apps_tab.to(self.profile, None)
+        self.apps_tab.to(self.app_page, None)
+        self.profile.to(self.app_page, None)
+        self.profile.to(self.apps_tab, None)
+        self.app_page.to(self.apps_tab, None)
+        self.states = [self.apps_tab, self.profile, self.app_page]
+        self.direct, self.via_profile = self.apps_tab.transitions[1], self.profile.transitions[0]
+        self.to_profile = self.apps_tab.transitions[0]
+
+    def test_expected_cost(self):
+        model = TransitionCostModel()
+        self.assertEqual(model.expected_cost(self.direct), 1.0)
+        model.record(self.direct, 2.0, success=True)
+        model.record(self.direct, 4.0, success=False)
+        # mean duration 3.0, smoothed success rate 2/4
+        self.assertAlmostEqual(model.expected_cost(self.direct), 6.0)
+        # unmeasured transitions get the mean cost of the measured ones
+        self.assertAlmostEqual(model.expected_cost(self.via_profile), 6.0)
+
+    def test_routing_uses_cheapest_path(self):
+        model = TransitionCostModel()
+        self.assertIs(RoutingTable(self.states, cost=model.expected_cost).next_hop(self.apps_tab, self.app_page),
+                      self.direct)
+        model.record(self.direct, 8.0, success=True)
+        model.record(self.to_profile, 0.5, success=True)
+        model.record(self.via_profile, 0.5, success=True)
+        table = RoutingTable(self.states, cost=model.expected_cost)
+        self.assertEqual(table.route(self.apps_tab, self.app_page), [self.to_profile, self.via_profile])
+
+    def test_equal_costs_give_same_routes_as_hop_count(self):
+        hops = RoutingTable(self.states)
+        costs = RoutingTable(self.states, cost=lambda t: 1.0)
+        for start in self.states:
+            for destination in self.states:
+                self.assertEqual(hops.route(start, destination), costs.route(start, destination))
+
+    def test_routing_version_only_changes_with_significant_cost_changes(self):
+        model = TransitionCostModel()
+        model.record(self.direct, 2.0, success=True)
+        self.assertEqual(model.routing_version, 1)
+        # the smoothed success rate goes from 2/3 to 5/6, so the expected cost changes by less than the threshold
+        for _ in range(3):
+            model.record(self.direct, 2.0, success=True)
+        self.assertEqual(model.routing_version, 1)
+        model.record(self.to_profile, 1.0, success=True)
+        self.assertEqual(model.routing_version, 2)
+        model.record(self.direct, 30.0, success=True)
+        self.assertEqual(model.routing_version, 3)
+        self.assertEqual(model.version, 6)
+
+    def test_costs_can_be_read_while_recording(self):
+        model = TransitionCostModel()
+        states = create_states([f'state_{i}' for i in range(200)])
+        for state, next_state in zip(states, states[1:]):
+            state.to(next_state, None)
+        transitions = [state.transitions[0] for state in states[:-1]]
+        errors = []
+
+        def read_costs():
+            try:
+                for _ in range(200):
+                    model.default_cost()
+                    model.expected_cost(transitions[-1])
+            except RuntimeError as e:
+                errors.append(e)
+
+        reader = threading.Thread(target=read_costs)
+        reader.start()
+        for transition in transitions:
+            model.record(transition, 1.0, success=True)
+        reader.join()
+        self.assertEqual(errors, [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'costs.json'
+            model = TransitionCostModel(path)
+            model.save()
+            self.assertFalse(path.exists())
+            model.record(self.direct, 2.0, success=True)
+            model.save()
+            loaded = TransitionCostModel(path)
+            self.assertEqual(loaded.stats, model.stats)
+
+    def test_for_device_shares_models(self):
+        model = TransitionCostModel.for_device('com.android.vending', 'Pixel 7')
+        self.assertIs(model, TransitionCostModel.for_device('com.android.vending', 'Pixel 7'))
+        self.assertEqual(model.path.name, 'com.android.vending_Pixel_7.json')
+
+    def test_for_device_saves_at_exit_once(self):
+        with patch('puma.state_graph.transition_costs.atexit.register') as register:
+            model = TransitionCostModel.for_device('com.android.vending', 'Pixel 8 Pro')
+            TransitionCostModel.for_device('com.android.vending', 'Pixel 8 Pro')
+        register.assert_called_once_with(model.save)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import Mock
+
+from puma.state_graph.popup_handler import PopUpHandler
+from puma.state_graph.state import SimpleState
+from puma.state_graph.ui_snapshot import UiSnapshot, UnsupportedXPathError
+
+PAGE_SOURCE = '''<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy index="0" class="hierarchy" rotation="0" width="1080" height="2400">
+  <android.widget.FrameLayout index="0" package="ch.swisscows.messenger.teleguardapp" class="android.widget.FrameLayout" text="" resource-id="" bounds="[0,0][1080,2400]">
+    <android.view.View index="0" class="android.view.View" text="" content-desc="Alice&#10;Hello there&#10;2" resource-id="" bounds="[0,200][1080,400]" />
+    <android.view.View index="1" class="android.view.View" text="" content-desc="TeleGuard ID: ABC123" resource-id="" bounds="[0,400][1080,600]" />
+    <android.widget.TextView index="2" class="android.widget.TextView" text="Bob's Chat Room" resource-id="com.example:id/title" bounds="[0,600][1080,700]" />
+  </android.widget.FrameLayout>
+</hierarchy>'''
+
+
+class TestUiSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = UiSnapshot(PAGE_SOURCE)
+
+    def test_simple_xpaths(self):
+        self.assertTrue(self.snapshot.is_present('//*[@resource-id="com.example:id/title"]'))
+        self.assertTrue(self.snapshot.is_present('//android.widget.TextView[@text="Bob\'s Chat Room"]'))
+        self.assertFalse(self.snapshot.is_present('//android.widget.Button'))
+        self.assertEqual(len(self.snapshot.find_all('//android.view.View')), 2)
+
+    def test_lower_case_shim(self):
+        self.assertTrue(self.snapshot.is_present('//android.view.View[contains(lower-case(@content-desc), "alice")]'))
+        self.assertTrue(self.snapshot.is_present('//android.view.View[starts-with(lower-case(@content-desc), "teleguard id:")]'))
+        self.assertTrue(self.snapshot.is_present('//*[lower-case(@text)=lower-case("BOB\'S CHAT ROOM")]'))
+        self.assertFalse(self.snapshot.is_present('//android.view.View[contains(lower-case(@content-desc), "carol")]'))
+
+    def test_upper_case_and_ends_with_shims(self):
+        self.assertTrue(self.snapshot.is_present('//*[upper-case(@text)="BOB\'S CHAT ROOM"]'))
+        self.assertTrue(self.snapshot.is_present('//*[ends-with(@text, "Room")]'))
+        self.assertFalse(self.snapshot.is_present('//*[ends-with(@text, "Bob")]'))
+
+    def test_matches_shim(self):
+        self.assertTrue(self.snapshot.is_present('//*[@content-desc and matches(@content-desc, "\\n\\d$")]'))
+        self.assertFalse(self.snapshot.is_present('//*[matches(@text, "^room")]'))
+        self.assertTrue(self.snapshot.is_present('//*[matches(@text, "^bob", "i")]'))
+
+    def test_union(self):
+        self.assertTrue(self.snapshot.is_present('//android.widget.Button | //android.widget.TextView'))
+
+    def test_unsupported_xpath_raises_without_fallback(self):
+        with self.assertRaises(UnsupportedXPathError):
+            self.snapshot.is_present('//*[string-join(@text, "")="x"]')
+        with self.assertRaises(UnsupportedXPathError):
+            self.snapshot.is_present('//*[')
+
+    def test_unsupported_xpath_uses_fallback(self):
+        fallback = Mock(return_value=True)
+        snapshot = UiSnapshot(PAGE_SOURCE, fallback=fallback)
+        self.assertTrue(snapshot.is_present('//*[string-join(@text, "")="x"]'))
+        fallback.assert_called_once_with('//*[string-join(@text, "")="x"]')
+
+
+class TestSnapshotValidation(unittest.TestCase):
+    def setUp(self):
+        self.driver = Mock()
+        self.driver.snapshot.return_value = UiSnapshot(PAGE_SOURCE)
+
+    def test_simple_state_validates_against_one_snapshot(self):
+        state = SimpleState(['//android.widget.TextView', '//android.view.View'],
+                            invalid_xpaths=['//android.widget.Button'])
+        self.assertTrue(state.validate(self.driver))
+        self.driver.snapshot.assert_called_once()
+        self.driver.is_present.assert_not_called()
+
+    def test_simple_state_invalid_xpath_present(self):
+        state = SimpleState(['//android.widget.TextView'], invalid_xpaths=['//android.view.View'])
+        self.assertFalse(state.validate(self.driver))
+
+    def test_popup_handler(self):
+        self.assertTrue(PopUpHandler(['//android.widget.TextView'], []).is_popup_window(self.driver))
+        self.assertFalse(PopUpHandler(['//android.widget.TextView', '//android.widget.Button'], []).is_popup_window(self.driver))
+
+
+if __name__ == '__main__':
+    unittest.main()
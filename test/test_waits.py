@@ -0,0 +1,46 @@
+import time
+import unittest
+from itertools import islice
+from unittest.mock import Mock
+
+from puma.state_graph.waits import PollStrategy, poll
+
+FAST_POLLING = PollStrategy(initial_interval=0.01, backoff_factor=1.0, max_interval=0.01)
+
+
+class TestPollStrategy(unittest.TestCase):
+    def test_exponential_backoff_is_capped(self):
+        strategy = PollStrategy(initial_interval=0.1, backoff_factor=2.0, max_interval=0.5)
+        self.assertEqual(list(islice(strategy.intervals(), 5)), [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_fixed_interval(self):
+        strategy = PollStrategy(initial_interval=0.5, backoff_factor=1.0, max_interval=0.5)
+        self.assertEqual(list(islice(strategy.intervals(), 3)), [0.5, 0.5, 0.5])
+
+
+class TestPoll(unittest.TestCase):
+    def test_true_condition_returns_without_waiting(self):
+        start = time.monotonic()
+        self.assertTrue(poll(lambda: True, timeout=5))
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_condition_checked_until_true(self):
+        condition = Mock(side_effect=[False, False, True])
+        before_retry = Mock()
+        self.assertTrue(poll(condition, timeout=5, poll_strategy=FAST_POLLING, before_retry=before_retry))
+        self.assertEqual(condition.call_count, 3)
+        self.assertEqual(before_retry.call_count, 2)
+
+    def test_timeout(self):
+        start = time.monotonic()
+        self.assertFalse(poll(lambda: False, timeout=0.1, poll_strategy=FAST_POLLING))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_zero_timeout_checks_once(self):
+        condition = Mock(return_value=False)
+        self.assertFalse(poll(condition, timeout=0))
+        condition.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
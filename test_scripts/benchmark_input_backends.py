@@ -0,0 +1,68 @@
+import unittest
+from time import perf_counter
+
+from puma.state_graph.puma_driver import PumaDriver
+
+# Fill in the udid below. Run ADB devices to see the udids.
+device_udids = {
+    "Alice": ""
+}
+
+# The number of events sent per measurement
+EVENTS = 20
+
+
+class BenchmarkInputBackends(unittest.TestCase):
+    """
+    Compares the time it takes to send key events, taps and swipes through Appium and through a persistent adb shell.
+    The benchmark can only be run manually, as you need a setup with a phone.
+    The events are harmless: arrow key presses, taps in the top-left corner and small swipes, on the home screen.
+
+    Prerequisites:
+    - All prerequisites mentioned in the README.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        if not device_udids["Alice"]:
+            print("No udid was configured for Alice. Please add at the top of the script.")
+            print("Exiting....")
+            exit(1)
+        self.driver = PumaDriver(device_udids["Alice"], 'com.android.settings')
+        self.driver.home()
+
+    @classmethod
+    def tearDownClass(self):
+        self.driver.use_adb_input(False)
+
+    def _measure(self, send_event) -> float:
+        start = perf_counter()
+        for _ in range(EVENTS):
+            send_event()
+        return (perf_counter() - start) / EVENTS * 1000
+
+    def _compare(self, name: str, send_event):
+        self.driver.use_adb_input(False)
+        appium = self._measure(send_event)
+        self.driver.use_adb_input()
+        send_event()  # start the shell outside the measurement
+        adb = self._measure(send_event)
+        with self.driver.input_batch():
+            start = perf_counter()
+            for _ in range(EVENTS):
+                send_event()
+        batched = (perf_counter() - start) / EVENTS * 1000
+        print(f'{name}: Appium {appium:.1f} ms, adb shell {adb:.1f} ms, adb shell batched {batched:.1f} ms per event')
+
+    def test_key_events(self):
+        self._compare('key event', self.driver.press_left_arrow)
+
+    def test_taps(self):
+        self._compare('tap', lambda: self.driver.tap((1, 1)))
+
+    def test_swipes(self):
+        self._compare('swipe', lambda: self.driver.input.swipe((10, 500), (20, 500), 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
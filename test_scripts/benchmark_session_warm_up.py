@@ -0,0 +1,45 @@
+import unittest
+from time import perf_counter
+
+from puma.state_graph.puma_driver import warm_up_sessions
+from puma.state_graph.session_registry import SessionRegistry
+
+# Fill in the udids below. Run ADB devices to see the udids.
+device_udids = {
+    "Alice": "",
+    "Bob": ""
+}
+
+
+class BenchmarkSessionWarmUp(unittest.TestCase):
+    """
+    Compares the time it takes to create the Appium sessions of all devices one by one and in parallel.
+    The benchmark can only be run manually, as you need a setup with phones.
+
+    Prerequisites:
+    - All prerequisites mentioned in the README.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        if not all(device_udids.values()):
+            print("Not all udids were configured. Please add them at the top of the script.")
+            print("Exiting....")
+            exit(1)
+
+    def test_warm_up(self):
+        udids = list(device_udids.values())
+        with SessionRegistry() as registry:
+            start = perf_counter()
+            for udid in udids:
+                self.assertEqual(warm_up_sessions([udid], session_registry=registry), {})
+            sequential = perf_counter() - start
+        with SessionRegistry() as registry:
+            start = perf_counter()
+            self.assertEqual(warm_up_sessions(udids, session_registry=registry), {})
+            parallel = perf_counter() - start
+        print(f'{len(udids)} sessions: one by one {sequential:.1f} s, in parallel {parallel:.1f} s')
+
+
+if __name__ == '__main__':
+    unittest.main()
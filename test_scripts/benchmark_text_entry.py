@@ -0,0 +1,56 @@
+import unittest
+
+from puma.state_graph.puma_driver import PumaDriver, PumaClickException
+from puma.state_graph.text_entry import TEXT_ENTRY_STRATEGIES
+
+# Fill in the udid below. Run ADB devices to see the udids.
+device_udids = {
+    "Alice": ""
+}
+
+# The app and text box to enter text in. Open the app on the screen with the text box before running the benchmark.
+app_package = 'com.android.chrome'
+text_box_xpath = '//android.widget.EditText'
+
+TEXTS = {
+    'short': 'Hello!',
+    'long': 'The quick brown fox jumps over the lazy dog. ' * 20,
+    'non-ascii': 'Grüße uit Den Haag! 👋🎉 Привет, 你好',
+}
+REPETITIONS = 3
+
+
+class BenchmarkTextEntry(unittest.TestCase):
+    """
+    Measures the speed in characters per second of each text entry strategy of PumaDriver.send_keys.
+    The benchmark can only be run manually, as you need a setup with a phone.
+    The adb_ime strategy needs the ADB Keyboard (https://github.com/senzhk/ADBKeyBoard) to be the current input method,
+    otherwise it is reported as failing.
+
+    Prerequisites:
+    - All prerequisites mentioned in the README.
+    """
+
+    @classmethod
+    def setUpClass(self):
+        if not device_udids["Alice"]:
+            print("No udid was configured for Alice. Please add at the top of the script.")
+            print("Exiting....")
+            exit(1)
+        self.driver = PumaDriver(device_udids["Alice"], app_package)
+
+    def test_text_entry_strategies(self):
+        for name in TEXT_ENTRY_STRATEGIES:
+            for text_name, text in TEXTS.items():
+                self.driver.text_entry_stats.clear()
+                try:
+                    for _ in range(REPETITIONS):
+                        self.driver.send_keys(text_box_xpath, text, strategies=[name])
+                except PumaClickException as e:
+                    print(f'{name} cannot be used: {e}')
+                    break
+                print(f'{name}, {text_name} text: {self.driver.text_entry_stats[name]}')
+
+
+if __name__ == '__main__':
+    unittest.main()